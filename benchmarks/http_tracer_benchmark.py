@@ -0,0 +1,120 @@
+"""Compares the per-request overhead of recording HTTP traces.
+
+"before" mimics the way requests used to be recorded - copying the headers to a dictionary, building the trace
+dataclasses and scrubbing the headers for every request. "after" is the current `HttpTracer.record`.
+
+Also measures the memory kept by a full buffer of traces whose headers include values that differ on every request
+(e.g. a request id and a date), as real headers do.
+
+Run with `python -m benchmarks.http_tracer_benchmark`
+"""
+import collections
+import time
+import timeit
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime
+from typing import List, Mapping, Tuple
+
+from pyctuator.httptrace import TraceRecord, TraceRequest, TraceResponse
+from pyctuator.httptrace.http_header_scrubber import _keys_to_scrub
+from pyctuator.httptrace.http_tracer import HttpTracer
+
+REQUESTS = 100000
+
+request_headers: List[Tuple[str, str]] = [
+    ("host", "localhost:8000"),
+    ("user-agent", "python-requests/2.28.1"),
+    ("accept-encoding", "gzip, deflate"),
+    ("accept", "*/*"),
+    ("connection", "keep-alive"),
+    ("authorization", "Bearer 123"),
+    ("x-request-id", "7d4fef3"),
+]
+
+response_headers: List[Tuple[str, str]] = [
+    ("content-type", "application/json"),
+    ("content-length", "1024"),
+    ("set-cookie", "session=abc"),
+]
+
+
+def _headers_dictionary(headers: List[Tuple[str, str]]) -> Mapping[str, List[str]]:
+    headers_dict: Mapping[str, List[str]] = defaultdict(list)
+    for (key, value) in headers:
+        headers_dict[key].append(value)
+    return headers_dict
+
+
+def _scrub_and_normalize_headers(headers: Mapping[str, List[str]]) -> Mapping[str, List[str]]:
+    return {
+        header: ["******" if _keys_to_scrub.match(header) else value for value in values]
+        for (header, values) in headers.items()
+    }
+
+
+def record_before(traces: collections.deque) -> None:
+    request_time = datetime.now()
+    response_time = datetime.now()
+    record = TraceRecord(
+        request_time,
+        None,
+        None,
+        TraceRequest("GET", "http://localhost:8000/", _headers_dictionary(request_headers)),
+        TraceResponse(200, _headers_dictionary(response_headers)),
+        int((response_time.timestamp() - request_time.timestamp()) * 1000),
+    )
+    record.request.headers = _scrub_and_normalize_headers(record.request.headers)
+    record.response.headers = _scrub_and_normalize_headers(record.response.headers)
+    traces.append(record)
+
+
+def record_after(http_tracer: HttpTracer) -> None:
+    request_time = time.time()
+    response_time = time.time()
+    http_tracer.record(
+        request_time,
+        "GET",
+        "http://localhost:8000/",
+        tuple(request_headers),
+        200,
+        tuple(response_headers),
+        int((response_time - request_time) * 1000),
+    )
+
+
+def measure_full_buffer_memory() -> int:
+    """Returns the memory kept by a full buffer of traces, with headers built per request as web-frameworks do"""
+    tracemalloc.start()
+    http_tracer = HttpTracer(capacity=REQUESTS)
+    for i in range(REQUESTS):
+        http_tracer.record(
+            time.time(),
+            "GET",
+            f"http://localhost:8000/items/{i % 100}",
+            [(name, "".join(value)) for name, value in request_headers[:-1]] + [("x-request-id", f"{i:x}")],
+            200,
+            [(name, "".join(value)) for name, value in response_headers] + [("date", f"Thu, 01 Jan 1970 {i}")],
+            5,
+        )
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current
+
+
+def main() -> None:
+    traces: collections.deque = collections.deque(maxlen=100)
+    http_tracer = HttpTracer()
+
+    before = timeit.timeit(lambda: record_before(traces), number=REQUESTS)
+    after = timeit.timeit(lambda: record_after(http_tracer), number=REQUESTS)
+    read = timeit.timeit(http_tracer.get_httptrace, number=100)
+
+    print(f"before: {before / REQUESTS * 1e6:.2f}us per request")
+    print(f"after:  {after / REQUESTS * 1e6:.2f}us per request")
+    print(f"reading {len(http_tracer.traces)} traces: {read / 100 * 1e3:.2f}ms")
+    print(f"memory of {REQUESTS} traces: {measure_full_buffer_memory() / 2 ** 20:.2f}MB")
+
+
+if __name__ == "__main__":
+    main()
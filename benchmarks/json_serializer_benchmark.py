@@ -0,0 +1,74 @@
+"""Compares the cost of serializing a thread dump and a full buffer of HTTP traces to JSON.
+
+"before" mimics the way aiohttp and Tornado used to serialize responses - `json.dumps` converting each dataclass using
+`dataclasses.asdict`, which deep copies it. "after" is the current serializer, both with orjson (if it's installed)
+and with its stdlib fallback.
+
+Run with `python -m benchmarks.json_serializer_benchmark`
+"""
+import dataclasses
+import json
+import threading
+import timeit
+from datetime import datetime
+from typing import Any, Callable, List
+
+from pyctuator.httptrace.http_tracer import HttpTracer
+from pyctuator.impl.json_serializer import dumps, _stdlib_dumps
+from pyctuator.threads.thread_dump_provider import ThreadDumpProvider
+
+THREADS = 50
+TRACES = 100
+SERIALIZATIONS = 100
+
+
+def dumps_before(value: Any) -> bytes:
+    def serialize(obj: Any) -> Any:
+        if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+            return dataclasses.asdict(obj)
+        if isinstance(obj, datetime):
+            return str(obj)
+        return None
+
+    return json.dumps(value, default=serialize).encode("utf-8")
+
+
+def build_traces() -> Any:
+    http_tracer = HttpTracer(capacity=TRACES)
+    for i in range(TRACES):
+        http_tracer.record(
+            1600000000.0 + i,
+            "GET",
+            f"http://localhost:8000/api/items/{i}",
+            (("host", "localhost:8000"), ("accept", "*/*"), ("authorization", "Bearer 123")),
+            200,
+            (("content-type", "application/json"), ("content-length", "1024")),
+            12,
+        )
+    return http_tracer.get_httptrace()
+
+
+def time_serialization(serializer: Callable[[Any], bytes], value: Any) -> float:
+    return timeit.timeit(lambda: serializer(value), number=SERIALIZATIONS)
+
+
+def main() -> None:
+    stop = threading.Event()
+    threads = [threading.Thread(target=stop.wait, daemon=True) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+
+    serializers: List[Callable[[Any], bytes]] = [dumps_before, _stdlib_dumps, dumps]
+    for name, value in [("thread dump", ThreadDumpProvider().get_thread_dump()), ("HTTP traces", build_traces())]:
+        assert json.loads(dumps(value)) == json.loads(_stdlib_dumps(value))
+        before, stdlib, after = (time_serialization(serializer, value) for serializer in serializers)
+        print(name)
+        print(f"  before:          {before / SERIALIZATIONS * 1e3:.2f}ms per serialization")
+        print(f"  after (stdlib):  {stdlib / SERIALIZATIONS * 1e3:.2f}ms per serialization")
+        print(f"  after:           {after / SERIALIZATIONS * 1e3:.2f}ms per serialization")
+
+    stop.set()
+
+
+if __name__ == "__main__":
+    main()
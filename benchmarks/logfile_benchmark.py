@@ -0,0 +1,51 @@
+"""Compares the cost of keeping log messages in the logfile buffer as the buffer grows.
+
+"before" mimics the way messages used to be kept - appending to a string and slicing it once it's full, which copies
+the entire buffer for every message. "after" is the current `LogMessageBuffer` ring buffer.
+
+Run with `python -m benchmarks.logfile_benchmark`
+"""
+import logging
+import timeit
+from functools import partial
+
+from pyctuator.logfile.logfile import LogMessageBuffer
+
+MESSAGES = 2000
+
+record = logging.LogRecord("benchmark", logging.INFO, "", 0, "Handled request GET /users/1234 in 12ms", (), None)
+
+
+class StringLogMessageBuffer(LogMessageBuffer):
+    def __init__(self, max_size: int, formatter: str) -> None:
+        super().__init__(max_size, formatter)
+        self._string_buffer = ""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        msg = self.format(record) + "\n"
+        msg_len = len(msg)
+        if len(self._string_buffer) + msg_len > self._max_size:
+            self._string_buffer = self._string_buffer[-(self._max_size - msg_len):]
+        self._string_buffer += msg
+
+
+def main() -> None:
+    for max_size in (10_000, 1_000_000, 10_000_000):
+        before_buffer = StringLogMessageBuffer(max_size, "%(message)s")
+        after_buffer = LogMessageBuffer(max_size, "%(message)s")
+
+        # Fill the buffers so every message overflows
+        before_buffer._string_buffer = "-" * max_size  # pylint: disable=protected-access
+        for _ in range(max_size // 30):
+            after_buffer.emit(record)
+
+        before = timeit.timeit(partial(before_buffer.emit, record), number=MESSAGES)
+        after = timeit.timeit(partial(after_buffer.emit, record), number=MESSAGES)
+
+        print(f"{max_size} bytes buffer")
+        print(f"  before: {before / MESSAGES * 1e6:.2f}us per message")
+        print(f"  after:  {after / MESSAGES * 1e6:.2f}us per message")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Compares the cost of building the responses of the read-mostly endpoints polled by Spring Boot Admin (the links,
+/env, /info, /loggers and /metrics) for an application with a few hundred loggers.
+
+"before" mimics the way the responses used to be built - collecting the data and serializing it on every request.
+"after" is the current `ResponseCache`, which serializes a response again only once its data changes.
+
+Run with `python -m benchmarks.response_cache_benchmark`
+"""
+import dataclasses
+import json
+import logging
+import timeit
+from datetime import datetime
+from typing import Any
+
+from pyctuator.endpoints import Endpoints
+from pyctuator.environment.os_env_variables_impl import OsEnvironmentVariableProvider
+from pyctuator.impl.pyctuator_impl import PyctuatorImpl, AppInfo, AppDetails
+from pyctuator.impl.pyctuator_router import PyctuatorRouter
+from pyctuator.pyctuator import default_logfile_format
+
+LOGGERS = 500
+REQUESTS = 200
+PATHS = ("", "/env", "/info", "/loggers", "/metrics")
+
+
+class BenchmarkRouter(PyctuatorRouter):
+    pass
+
+
+def custom_dumps(value: Any) -> str:
+    def serialize(obj: Any) -> Any:
+        if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+            return dataclasses.asdict(obj)
+        if isinstance(obj, datetime):
+            return str(obj)
+        return None
+
+    return json.dumps(value, default=serialize)
+
+
+def build_responses_before(router: PyctuatorRouter) -> None:
+    pyctuator_impl = router.pyctuator_impl
+    for data in (
+            {"_links": router.get_endpoints_links()},
+            pyctuator_impl.get_environment(),
+            pyctuator_impl.get_app_info(),
+            pyctuator_impl.logging.get_loggers(),
+            pyctuator_impl.get_metric_names(),
+    ):
+        custom_dumps(data).encode("utf-8")
+
+
+def build_responses_after(router: PyctuatorRouter) -> None:
+    for path in PATHS:
+        router.get_cached_response(path)
+
+
+def main() -> None:
+    for i in range(LOGGERS):
+        logging.getLogger(f"benchmark.module{i // 10}.logger{i}")
+
+    pyctuator_impl = PyctuatorImpl(
+        AppInfo(app=AppDetails(name="benchmark")),
+        "http://localhost/pyctuator",
+        10,
+        default_logfile_format,
+        None,
+        Endpoints.NONE,
+    )
+    pyctuator_impl.register_environment_provider(OsEnvironmentVariableProvider())
+    router = BenchmarkRouter(None, pyctuator_impl)
+
+    before = timeit.timeit(lambda: build_responses_before(router), number=REQUESTS)
+    after = timeit.timeit(lambda: build_responses_after(router), number=REQUESTS)
+
+    print(f"{len(PATHS)} endpoints, {LOGGERS} loggers")
+    print(f"  before:  {before / REQUESTS * 1e3:.2f}ms per poll")
+    print(f"  after:   {after / REQUESTS * 1e3:.2f}ms per poll")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Compares the cost of scrubbing the secrets of a large environment, as done on every request of the env endpoint.
+
+"before" mimics the way secrets used to be scrubbed - matching both key patterns against every key, and substituting
+the credentials of URLs using an uncompiled pattern. "after" is the current `SecretScrubber`, whose decisions are
+memoized per key.
+
+Run with `python -m benchmarks.scrubber_benchmark`
+"""
+import re
+import timeit
+from typing import Any, Dict
+
+from pyctuator.environment.scrubber import SecretScrubber, default_keys_to_scrub
+
+VARIABLES = 2000
+SCRUBS = 100
+
+url_keys_to_scrub = re.compile(".*url.*", re.IGNORECASE)
+
+
+def scrub_secrets_before(mapping: Dict) -> Dict:
+    def scrub(key: Any, value: Any) -> Any:
+        if default_keys_to_scrub.match(key):
+            return "******"
+
+        if url_keys_to_scrub.match(key):
+            return re.sub(r"(.*//[^:]*:).*(@.*)", r"\1******\2", str(value))
+
+        return value
+
+    return {k: scrub(k, v) for (k, v) in mapping.items()}
+
+
+def build_environment() -> Dict[str, str]:
+    environment = {}
+    for i in range(VARIABLES):
+        if i % 20 == 0:
+            environment[f"SERVICE_{i}_DATABASE_URL"] = f"postgresql://user{i}:password{i}@db{i}.internal:5432/app"
+        elif i % 20 == 1:
+            environment[f"SERVICE_{i}_API_KEY"] = f"key-{i}"
+        else:
+            environment[f"SERVICE_{i}_SETTING_WITH_A_LONGISH_NAME"] = f"value-{i}"
+    return environment
+
+
+def main() -> None:
+    environment = build_environment()
+    scrubber = SecretScrubber()
+    assert scrubber.scrub_secrets(environment) == scrub_secrets_before(environment)
+
+    before = timeit.timeit(lambda: scrub_secrets_before(environment), number=SCRUBS)
+    after = timeit.timeit(lambda: scrubber.scrub_secrets(environment), number=SCRUBS)
+    first_scrub = timeit.timeit(lambda: SecretScrubber().scrub_secrets(environment), number=SCRUBS)
+
+    print(f"{VARIABLES} environment variables")
+    print(f"  before:              {before / SCRUBS * 1e3:.2f}ms per scrub")
+    print(f"  after:               {after / SCRUBS * 1e3:.2f}ms per scrub")
+    print(f"  after, first scrub:  {first_scrub / SCRUBS * 1e3:.2f}ms per scrub")
+
+
+if __name__ == "__main__":
+    main()
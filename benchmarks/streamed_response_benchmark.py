@@ -0,0 +1,82 @@
+"""Compares the peak memory allocated while serializing a large thread dump and a full buffer of HTTP traces.
+
+"before" builds the entire dump, then serializes it at once, as /threaddump and /httptrace used to. "after" streams the
+dump in chunks (see `stream_list`), consuming each chunk as it's produced the way the routers write them. The thread
+dump is still built entirely before it's streamed, so its stacks are a snapshot, while the traces are read lazily.
+
+Run with `python -m benchmarks.streamed_response_benchmark`
+"""
+import threading
+import tracemalloc
+from typing import Callable, Iterator
+
+from pyctuator.httptrace.http_tracer import HttpTracer
+from pyctuator.impl.json_serializer import dumps, stream_list
+from pyctuator.threads.thread_dump_provider import ThreadDumpProvider
+
+THREADS = 500
+TRACES = 10000
+
+
+def recurse(depth: int, stop: threading.Event) -> None:
+    if depth:
+        recurse(depth - 1, stop)
+    else:
+        stop.wait()
+
+
+def build_http_tracer() -> HttpTracer:
+    http_tracer = HttpTracer(capacity=TRACES)
+    for i in range(TRACES):
+        http_tracer.record(
+            1600000000.0 + i,
+            "GET",
+            f"http://localhost:8000/api/items/{i}",
+            (("host", "localhost:8000"), ("accept", "*/*"), ("x-request-id", str(i))),
+            200,
+            (("content-type", "application/json"), ("content-length", "1024")),
+            12,
+        )
+    return http_tracer
+
+
+def measure_peak(serialize: Callable[[], Iterator[bytes]]) -> int:
+    tracemalloc.start()
+    size = 0
+    for chunk in serialize():
+        size += len(chunk)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert size
+    return peak
+
+
+def main() -> None:
+    stop = threading.Event()
+    threads = [threading.Thread(target=recurse, args=(30, stop), daemon=True) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+
+    thread_dump_provider = ThreadDumpProvider()
+    http_tracer = build_http_tracer()
+    for name, before, after in [
+        (
+            "thread dump",
+            lambda: iter([dumps(thread_dump_provider.get_thread_dump())]),
+            lambda: stream_list("threads", thread_dump_provider.get_thread_dump().threads),
+        ),
+        (
+            "HTTP traces",
+            lambda: iter([dumps(http_tracer.get_httptrace())]),
+            lambda: stream_list("traces", http_tracer.iter_traces()),
+        ),
+    ]:
+        print(name)
+        print(f"  before: {measure_peak(before) / 2 ** 20:.2f}MB peak")
+        print(f"  after:  {measure_peak(after) / 2 ** 20:.2f}MB peak")
+
+    stop.set()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Compares the cost of dumping the threads of a process with many threads having deep stacks.
+
+"before" mimics the way stack frames used to be built - a `Path` per frame to extract the file name, and a lookup of
+"self" in the frame's locals, which copies the locals into a dict. "after" is the current `ThreadDumpProvider`.
+
+Run with `python -m benchmarks.thread_dump_benchmark`
+"""
+import threading
+import timeit
+from pathlib import Path
+from types import FrameType
+from typing import Iterable, List, Optional
+
+from pyctuator.threads.thread_dump_provider import ThreadDumpProvider, StackFrame
+
+THREADS = 300
+DEPTH = 50
+DUMPS = 5
+
+
+class PathThreadDumpProvider(ThreadDumpProvider):
+    def build_stack_trace(self, frames: Iterable[FrameType]) -> List[StackFrame]:
+        def guess_class_name() -> Optional[str]:
+            try:
+                return str(frame.f_locals["self"].__class__.__name__)
+            except KeyError:
+                return None
+
+        stack_frames = []
+        for frame in frames:
+            stack_frames.append(StackFrame(
+                methodName=frame.f_code.co_name,
+                fileName=Path(frame.f_code.co_filename).name,
+                lineNumber=frame.f_lineno,
+                className=guess_class_name(),
+                nativeMethod=False
+            ))
+        return stack_frames
+
+
+class Worker:
+    def __init__(self, stop: threading.Event) -> None:
+        self.stop = stop
+
+    def work(self, depth: int = DEPTH) -> None:
+        if depth > 0:
+            self.work(depth - 1)
+        else:
+            self.stop.wait()
+
+
+def main() -> None:
+    stop = threading.Event()
+    threads = [threading.Thread(target=Worker(stop).work, daemon=True) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        before = timeit.timeit(PathThreadDumpProvider().get_thread_dump, number=DUMPS)
+        after = timeit.timeit(ThreadDumpProvider().get_thread_dump, number=DUMPS)
+        after_max_depth = timeit.timeit(ThreadDumpProvider(max_depth=10).get_thread_dump, number=DUMPS)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    print(f"{THREADS} threads, {DEPTH} frames deep")
+    print(f"  before:              {before / DUMPS * 1e3:.2f}ms per dump")
+    print(f"  after:               {after / DUMPS * 1e3:.2f}ms per dump")
+    print(f"  after, max_depth=10: {after_max_depth / DUMPS * 1e3:.2f}ms per dump")
+
+
+if __name__ == "__main__":
+    main()
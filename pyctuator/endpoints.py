@@ -11,3 +11,7 @@ class Endpoints(Flag):
     THREAD_DUMP = auto()
     LOGFILE = auto()
     HTTP_TRACE = auto()
+    PROMETHEUS = auto()
+    TASK_DUMP = auto()
+    PROFILE = auto()
+    TRACEMALLOC = auto()
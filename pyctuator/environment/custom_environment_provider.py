@@ -1,9 +1,9 @@
-from typing import Callable, Dict
+from typing import Callable, Dict, Optional
 
-from pyctuator.environment.environment_provider import PropertiesSource, EnvironmentProvider, PropertyValue
+from pyctuator.environment.environment_provider import PropertiesSource, EnvironmentProvider
 
 
-def _flatten(prefix: str, dict_to_flatten: Dict) -> Dict:
+def _flatten(prefix: str, dict_to_flatten: Dict, res: Optional[Dict] = None) -> Dict:
     """
     Recursively flattens a dictionary that may contain literal values (numbers and strings) and other dictionaries.
     For example, given the following dictionary: {
@@ -23,15 +23,17 @@ def _flatten(prefix: str, dict_to_flatten: Dict) -> Dict:
 
     :param prefix: when descending to a sub-dictionary, the prefix represents the keys higher in the hierarchy
     :param dict_to_flatten: a dictionary, or a sub-dictionary to be flattened
+    :param res: the flattened dictionary that's being built, the sub-dictionaries are flattened into it so each value
+     is copied once regardless of how deeply it is nested
     :return: a dictionary from a dot-separated key to a literal value
     """
-    res: Dict = {}
+    if res is None:
+        res = {}
     for key, value in dict_to_flatten.items():
-        key_with_prefix = f"{prefix}{key}."
         if isinstance(value, dict):
-            res = {**res, **_flatten(key_with_prefix, value)}
+            _flatten(f"{prefix}{key}.", value, res)
         else:
-            res[key_with_prefix[:-1]] = value
+            res[f"{prefix}{key}"] = value
     return res
 
 
@@ -42,7 +44,7 @@ class CustomEnvironmentProvider(EnvironmentProvider):
         self.env_provider = env_provider
 
     def get_properties_source(self, secret_scrubber: Callable[[Dict], Dict]) -> PropertiesSource:
-        flattened_env = _flatten("", self.env_provider())
-        scrubbed_env = secret_scrubber(flattened_env)
-        properties_dict = {key: PropertyValue(value) for (key, value) in scrubbed_env.items()}
-        return PropertiesSource(self.name, properties_dict)
+        return self.build_properties_source(self.get_raw_properties(), secret_scrubber)
+
+    def get_raw_properties(self) -> Dict:
+        return _flatten("", self.env_provider())
@@ -0,0 +1,71 @@
+import threading
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from pyctuator.environment.environment_provider import EnvironmentData, EnvironmentProvider, PropertiesSource
+
+
+@dataclass
+class _CachedPropertiesSource:
+    provider: EnvironmentProvider
+    secret_scrubber: Callable[[Dict], Dict]
+    raw_properties: Dict
+    properties_source: PropertiesSource
+
+
+class EnvironmentCache:
+    """Builds the environment from the environment providers, reusing the scrubbed properties source of each provider
+    as long as the provider's raw properties (see `EnvironmentProvider.get_raw_properties`) and the secret scrubber
+    don't change.
+
+    The environment is versioned by an ETag which changes only when the properties of a source change, allowing
+    clients that repeatedly load the environment (e.g. Spring Boot Admin) to do so using conditional requests.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._cached_sources: Dict[int, _CachedPropertiesSource] = {}
+        self._property_sources: List[PropertiesSource] = []
+        self._version = 0
+        # Distinguishes the ETags of different processes, so an ETag isn't matched by a restarted application
+        self._etag_prefix = uuid.uuid4().hex[:12]
+
+    def get_environment(
+            self,
+            providers: Sequence[EnvironmentProvider],
+            secret_scrubber: Callable[[Dict], Dict],
+    ) -> Tuple[EnvironmentData, str]:
+        """Returns the environment built from the providers, and its ETag"""
+        property_sources = [self._get_properties_source(provider, secret_scrubber) for provider in providers]
+
+        with self._lock:
+            if len(property_sources) != len(self._property_sources) or any(
+                    source is not previous_source and source != previous_source
+                    for source, previous_source in zip(property_sources, self._property_sources)
+            ):
+                self._version += 1
+            self._property_sources = property_sources
+            etag = f"\"{self._etag_prefix}-{self._version}\""
+
+        return EnvironmentData([], property_sources), etag
+
+    def _get_properties_source(
+            self,
+            provider: EnvironmentProvider,
+            secret_scrubber: Callable[[Dict], Dict],
+    ) -> PropertiesSource:
+        raw_properties = provider.get_raw_properties()
+        if raw_properties is None:
+            return provider.get_properties_source(secret_scrubber)
+
+        cached = self._cached_sources.get(id(provider))
+        if cached and cached.provider is provider and cached.secret_scrubber == secret_scrubber \
+                and cached.raw_properties == raw_properties:
+            return cached.properties_source
+
+        properties_source = provider.build_properties_source(raw_properties, secret_scrubber)
+        self._cached_sources[id(provider)] = _CachedPropertiesSource(
+            provider, secret_scrubber, raw_properties, properties_source
+        )
+        return properties_source
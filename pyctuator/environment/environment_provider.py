@@ -23,7 +23,26 @@ class EnvironmentData:
 
 
 class EnvironmentProvider(ABC):
+    # The name of the provider's properties source, used by build_properties_source
+    name: str
 
     @abstractmethod
     def get_properties_source(self, secret_scrubber: Callable[[Dict], Dict]) -> PropertiesSource:
         pass
+
+    def get_raw_properties(self) -> Optional[Dict]:
+        """Returns the flattened properties of the provider before they're scrubbed, allowing the properties source to
+        be reused while they don't change (see EnvironmentCache). Providers returning None, which is the default, are
+        rebuilt using get_properties_source whenever the environment is requested"""
+        return None
+
+    def build_properties_source(
+            self,
+            raw_properties: Dict,
+            secret_scrubber: Callable[[Dict], Dict],
+    ) -> PropertiesSource:
+        """Builds the properties source, named after the provider, from properties returned by get_raw_properties"""
+        return PropertiesSource(
+            self.name,
+            {key: PropertyValue(value) for key, value in secret_scrubber(raw_properties).items()},
+        )
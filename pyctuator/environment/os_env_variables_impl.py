@@ -1,12 +1,14 @@
 import os
 from typing import Dict, Callable
 
-from pyctuator.environment.environment_provider import PropertiesSource, PropertyValue, EnvironmentProvider
+from pyctuator.environment.environment_provider import PropertiesSource, EnvironmentProvider
 
 
 class OsEnvironmentVariableProvider(EnvironmentProvider):
+    name = "systemEnvironment"
 
     def get_properties_source(self, secret_scrubber: Callable[[Dict], Dict]) -> PropertiesSource:
-        scrubbed_env = secret_scrubber(os.environ)  # type: ignore
-        properties_dict = {key: PropertyValue(value) for (key, value) in scrubbed_env.items()}
-        return PropertiesSource("systemEnvironment", properties_dict)
+        return self.build_properties_source(self.get_raw_properties(), secret_scrubber)
+
+    def get_raw_properties(self) -> Dict:
+        return dict(os.environ)
@@ -0,0 +1,99 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from pyctuator.health.health_provider import HealthProvider, HealthStatus, Status, HealthDetails
+
+
+@dataclass
+class CachedHealthStatus(HealthStatus):
+    status: Status
+    details: HealthDetails
+    cacheAgeMillis: int
+
+
+# pylint: disable=too-many-instance-attributes
+class CachedHealthProvider(HealthProvider):
+    """Wraps a health provider so its health is only checked once per TTL, serving the last result in between.
+
+    When background refresh is enabled, the wrapped provider is checked periodically by a daemon thread, so health
+    requests never wait for the wrapped provider (except for the very first one). Otherwise, the wrapped provider is
+    checked by the first request following the expiration of the cached result.
+
+    The age of the cached result is reported in milliseconds as "cacheAgeMillis".
+    """
+
+    def __init__(self, health_provider: HealthProvider, ttl_sec: float, background_refresh: bool = False) -> None:
+        super().__init__()
+        self.health_provider = health_provider
+        self.ttl_sec = ttl_sec
+        self.background_refresh = background_refresh
+
+        self._cached: Optional[Tuple[float, HealthStatus]] = None
+        self._refresh_lock = threading.Lock()
+        self._schedule_lock = threading.Lock()
+        self._should_continue_refresh_schedule = False
+        self._refresh_timer: Optional[threading.Timer] = None
+
+        if background_refresh:
+            self.start()
+
+    def is_supported(self) -> bool:
+        return self.health_provider.is_supported()
+
+    def get_name(self) -> str:
+        return self.health_provider.get_name()
+
+    def get_health(self) -> CachedHealthStatus:
+        cached = self._cached
+        if cached is None or (not self.background_refresh and time.monotonic() - cached[0] > self.ttl_sec):
+            cached = self._refresh(cached)
+
+        checked_at, health_status = cached
+        return CachedHealthStatus(
+            health_status.status,
+            health_status.details,
+            int((time.monotonic() - checked_at) * 1000),
+        )
+
+    def start(self) -> None:
+        with self._schedule_lock:
+            self._should_continue_refresh_schedule = True
+        self._schedule_next_refresh()
+
+    def stop(self) -> None:
+        """Stops the background refresh, cancelling the pending refresh (a refresh that's already running completes
+        without being waited for)"""
+        with self._schedule_lock:
+            self._should_continue_refresh_schedule = False
+            if self._refresh_timer:
+                self._refresh_timer.cancel()
+                self._refresh_timer = None
+
+    def _refresh(self, expired: Optional[Tuple[float, HealthStatus]]) -> Tuple[float, HealthStatus]:
+        with self._refresh_lock:
+            # Another thread may have refreshed the cached health while this thread was waiting for the lock
+            if self._cached is expired:
+                self._cached = (time.monotonic(), self.health_provider.get_health())
+            assert self._cached is not None
+            return self._cached
+
+    def _schedule_next_refresh(self) -> None:
+        with self._schedule_lock:
+            if self._should_continue_refresh_schedule:
+                self._refresh_timer = threading.Timer(self.ttl_sec, self._refresh_in_background)
+                self._refresh_timer.daemon = True
+                self._refresh_timer.start()
+
+    def _refresh_in_background(self) -> None:
+        if not self._should_continue_refresh_schedule:
+            return
+
+        try:
+            self._refresh(self._cached)
+        except Exception as e:  # pylint: disable=broad-except
+            logging.warning("Failed refreshing the health of %s, %s (%s)", self.get_name(), e, type(e))
+
+        self._schedule_next_refresh()
@@ -1,6 +1,7 @@
 from dataclasses import dataclass
-from typing import Mapping
+from typing import Mapping, Optional
 
+from pyctuator.health.health_checker import HealthChecker
 from pyctuator.health.health_provider import HealthProvider, HealthStatus, Status
 
 
@@ -12,10 +13,16 @@ class CompositeHealthStatus(HealthStatus):
 
 class CompositeHealthProvider(HealthProvider):
 
-    def __init__(self, name: str, *health_providers: HealthProvider) -> None:
+    def __init__(
+            self,
+            name: str,
+            *health_providers: HealthProvider,
+            health_checker: Optional[HealthChecker] = None,
+    ) -> None:
         super().__init__()
         self.name = name
         self.health_providers = health_providers
+        self.health_checker = health_checker or HealthChecker()
 
     def is_supported(self) -> bool:
         return True
@@ -24,11 +31,7 @@ class CompositeHealthProvider(HealthProvider):
         return self.name
 
     def get_health(self) -> CompositeHealthStatus:
-        health_statuses: Mapping[str, HealthStatus] = {
-            provider.get_name(): provider.get_health()
-            for provider in self.health_providers
-            if provider.is_supported()
-        }
+        health_statuses: Mapping[str, HealthStatus] = self.health_checker.check(self.health_providers)
 
         # Health is UP if no provider is registered
         if not health_statuses:
@@ -0,0 +1,71 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Dict, Iterable, Mapping, Optional
+
+from pyctuator.health.health_provider import HealthProvider, HealthStatus, Status, HealthDetails
+
+
+@dataclass
+class HealthCheckTimeoutDetails(HealthDetails):
+    failure: str
+
+
+class HealthChecker:
+    """Collects the health of multiple health providers, one after the other"""
+
+    def check(self, health_providers: Iterable[HealthProvider]) -> Mapping[str, HealthStatus]:
+        return {
+            provider.get_name(): provider.get_health()
+            for provider in health_providers
+            if provider.is_supported()
+        }
+
+    def stop(self) -> None:
+        """Stops any background work of the health checker, which shouldn't be used once stopped"""
+
+
+class ConcurrentHealthChecker(HealthChecker):
+    """Collects the health of multiple health providers concurrently using a bounded pool of threads.
+
+    The time it takes to check the health is bound by the slowest provider rather than by the sum of all providers.
+    If a timeout is specified, providers that didn't complete within the timeout are reported as UNKNOWN instead of
+    holding up the entire response. A provider that is still busy with a previous check isn't called again, instead
+    its pending check is awaited, so slow providers cannot exhaust the pool.
+    """
+
+    def __init__(self, max_workers: int, timeout_sec: Optional[float] = None) -> None:
+        self.timeout_sec = timeout_sec
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pyctuator-health")
+        self._pending_checks: Dict[int, Future] = {}
+        self._pending_checks_lock = threading.Lock()
+
+    def check(self, health_providers: Iterable[HealthProvider]) -> Mapping[str, HealthStatus]:
+        futures = {
+            provider.get_name(): self._submit(provider)
+            for provider in health_providers
+            if provider.is_supported()
+        }
+
+        wait(futures.values(), timeout=self.timeout_sec)
+
+        return {
+            name: future.result() if future.done() else HealthStatus(
+                Status.UNKNOWN,
+                HealthCheckTimeoutDetails(f"timeout, health check did not complete within {self.timeout_sec} seconds")
+            )
+            for name, future in futures.items()
+        }
+
+    def stop(self) -> None:
+        """Cancels the checks that didn't start yet and stops the pool's threads once the running checks complete,
+        without waiting for them"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, provider: HealthProvider) -> Future:
+        with self._pending_checks_lock:
+            future = self._pending_checks.get(id(provider))
+            if future is None or future.done():
+                future = self.executor.submit(provider.get_health)
+                self._pending_checks[id(provider)] = future
+            return future
@@ -1,5 +1,7 @@
 import re
 
+from pyctuator.key_matcher import KeyMatcher
+
 _keys_to_scrub = re.compile(
     "^(.*[^A-Za-z])?key([^A-Za-z].*)?$|"
     ".*secret.*|"
@@ -11,9 +13,16 @@ _keys_to_scrub = re.compile(
     re.IGNORECASE
 )
 
+# Header names repeat across requests, so the decision whether to scrub a header is memoized per header name
+_header_matcher = KeyMatcher({"secret": _keys_to_scrub}, max_cached_keys=1024)
+
+
+def should_scrub_header(key: str) -> bool:
+    return _header_matcher.match(key) is not None
+
 
 def scrub_header_value(key: str, value: str) -> str:
-    if _keys_to_scrub.match(key):
+    if should_scrub_header(key):
         return "******"
 
     return value
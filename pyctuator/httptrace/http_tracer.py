@@ -1,25 +1,79 @@
-import collections
-from typing import List, Mapping
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Union
+
+from pyctuator.httptrace import Traces, TraceRecord, TraceRequest, TraceResponse
 from pyctuator.httptrace.http_header_scrubber import scrub_header_value
+from pyctuator.httptrace.trace_policy import TracePolicy
+from pyctuator.httptrace.trace_ring_buffer import TraceRingBuffer
 
-from pyctuator.httptrace import Traces, TraceRecord
+# Headers are recorded as-is as provided by the web-framework, either as strings or as latin-1 encoded bytes. Each
+# (name, value) pair is a tuple, or a list (as ASGI allows)
+HeaderTuples = Iterable[Sequence[Union[str, bytes]]]
 
 
 class HttpTracer:
-    def __init__(self) -> None:
-        self.traces_list: collections.deque = collections.deque(maxlen=100)
+    def __init__(self, trace_policy: Optional[TracePolicy] = None, capacity: int = 100) -> None:
+        self.trace_policy = trace_policy or TracePolicy()
+        self.traces = TraceRingBuffer(capacity)
 
     def get_httptrace(self) -> Traces:
-        return Traces(list(self.traces_list))
+        return Traces(list(self.iter_traces()))
 
-    def add_record(self, record: TraceRecord) -> None:
+    def iter_traces(self) -> Iterator[TraceRecord]:
+        """Iterates over the recorded traces, from the oldest to the newest, without copying the entire buffer"""
+        for timestamp, method, uri, request_headers, status, response_headers, time_taken in self.traces:
+            yield TraceRecord(
+                datetime.fromtimestamp(timestamp),
+                None,
+                None,
+                TraceRequest(method, uri, self._scrub_and_normalize_headers(request_headers)),
+                TraceResponse(status, self._scrub_and_normalize_headers(response_headers)),
+                time_taken,
+            )
 
-        record.request.headers = self._scrub_and_normalize_headers(
-            record.request.headers)
-        record.response.headers = self._scrub_and_normalize_headers(
-            record.response.headers)
+    # pylint: disable=too-many-arguments
+    def record(
+            self,
+            timestamp: float,
+            method: str,
+            uri: str,
+            request_headers: HeaderTuples,
+            status: int,
+            response_headers: HeaderTuples,
+            time_taken: int,
+    ) -> None:
+        """Records a request and its response, called for every request so it should do as little as possible.
 
-        self.traces_list.append(record)
+        :param timestamp: the time the request was received, in seconds since the epoch
+        :param method: the request's HTTP method
+        :param uri: the request's full URL
+        :param request_headers: the request's headers as (name, value) pairs, a name may appear multiple times
+        :param status: the response's HTTP status code
+        :param response_headers: the response's headers as (name, value) pairs, a name may appear multiple times
+        :param time_taken: the time it took to handle the request in milliseconds
+        """
+        # Failing to record a trace mustn't fail the request being traced
+        try:
+            # The pairs are copied as tuples, as frameworks may provide them as lists (e.g. ASGI's raw headers)
+            self.traces.append(
+                timestamp,
+                method,
+                uri,
+                tuple((header, value) for header, value in request_headers),
+                status,
+                tuple((header, value) for header, value in response_headers),
+                time_taken,
+            )
+        except Exception as e:  # pylint: disable=broad-except
+            logging.warning("Failed recording the trace of %s %s, %s (%s)", method, uri, e, type(e))
 
-    def _scrub_and_normalize_headers(self, headers: Mapping[str, List[str]]) -> Mapping[str, List[str]]:
-        return {header: [scrub_header_value(header, value) for value in values] for (header, values) in headers.items()}
+    def _scrub_and_normalize_headers(self, headers: HeaderTuples) -> Mapping[str, List[str]]:
+        headers_dict: Dict[str, List[str]] = {}
+        for (header, value) in headers:
+            if isinstance(header, bytes):
+                header = header.decode("latin-1")
+            if isinstance(value, bytes):
+                value = value.decode("latin-1")
+            headers_dict.setdefault(header, []).append(scrub_header_value(header, value))
+        return headers_dict
@@ -0,0 +1,58 @@
+import random
+import re
+from typing import Container, Iterable, Optional, Pattern
+
+
+def _compile_patterns(patterns: Optional[Iterable[str]]) -> Optional[Pattern[str]]:
+    patterns = list(patterns or [])
+    if not patterns:
+        return None  # Joining no patterns would result with an empty pattern, which matches every path
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+
+
+class TracePolicy:
+    """Decides which requests are recorded as HTTP traces.
+
+    A request is traced if:
+    * its path matches one of the include patterns (if any were provided)
+    * its path doesn't match any of the exclude patterns
+    * it is selected by random sampling according to the sampling rate
+    * its response's status code is one of the traced status codes (if provided)
+
+    Path patterns are regular expressions matched against the beginning of the request's path. The request related
+    checks are done before the request is handled, so requests that aren't traced don't pay for tracing at all.
+    """
+
+    def __init__(
+            self,
+            sampling_rate: float = 1.0,
+            include_paths: Optional[Iterable[str]] = None,
+            exclude_paths: Optional[Iterable[str]] = None,
+            status_codes: Optional[Container[int]] = None,
+    ) -> None:
+        """
+        :param sampling_rate: the fraction of requests to trace, between 0 (none) and 1 (all)
+        :param include_paths: if provided and not empty, only requests whose path matches one of these patterns are
+         traced
+        :param exclude_paths: requests whose path matches one of these patterns are not traced
+        :param status_codes: if provided, only requests resulting with one of these status codes are traced
+        """
+        if not 0 <= sampling_rate <= 1:
+            raise ValueError(f"Sampling rate must be between 0 and 1, got {sampling_rate}")
+
+        self.sampling_rate = sampling_rate
+        self.include_paths = _compile_patterns(include_paths)
+        self.exclude_paths = _compile_patterns(exclude_paths)
+        self.status_codes = status_codes
+
+    def should_trace_request(self, path: str) -> bool:
+        if self.include_paths is not None and not self.include_paths.match(path):
+            return False
+
+        if self.exclude_paths is not None and self.exclude_paths.match(path):
+            return False
+
+        return self.sampling_rate >= 1 or random.random() < self.sampling_rate
+
+    def should_trace_response(self, status: int) -> bool:
+        return self.status_codes is None or status in self.status_codes
@@ -0,0 +1,179 @@
+import threading
+from array import array
+from typing import Any, Dict, Generic, Hashable, Iterable, Iterator, List, Tuple, TypeVar
+
+T = TypeVar("T", bound=Hashable)
+
+# The number of traces that are read while holding the lock when iterating over the traces
+_READ_CHUNK_SIZE = 256
+
+
+class InternTable(Generic[T]):
+    """Stores each distinct value once and refers to it by a small integer id.
+
+    Values are reference counted so a value is dropped once all the traces referring to it were overwritten, and its id
+    is later reused. Not thread-safe, callers are expected to synchronize access.
+    """
+
+    def __init__(self) -> None:
+        self._ids: Dict[T, int] = {}
+        self._values: List[Any] = []
+        self._ref_counts: List[int] = []
+        self._free_ids: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def acquire(self, value: T) -> int:
+        value_id = self._ids.get(value)
+        if value_id is None:
+            if self._free_ids:
+                value_id = self._free_ids.pop()
+                self._values[value_id] = value
+                self._ref_counts[value_id] = 0
+            else:
+                value_id = len(self._values)
+                self._values.append(value)
+                self._ref_counts.append(0)
+            self._ids[value] = value_id
+
+        self._ref_counts[value_id] += 1
+        return value_id
+
+    def release(self, value_id: int) -> None:
+        self._ref_counts[value_id] -= 1
+        if self._ref_counts[value_id] == 0:
+            del self._ids[self._values[value_id]]
+            self._values[value_id] = None
+            self._free_ids.append(value_id)
+
+    def get(self, value_id: int) -> T:
+        return self._values[value_id]  # type: ignore[no-any-return]
+
+    def acquire_all(self, values: Iterable[T]) -> Tuple[int, ...]:
+        """Acquires each of the values, none of them is acquired if any of them fails (e.g. being unhashable)"""
+        value_ids: List[int] = []
+        try:
+            for value in values:
+                value_ids.append(self.acquire(value))
+        except Exception:
+            self.release_all(value_ids)
+            raise
+        return tuple(value_ids)
+
+    def release_all(self, value_ids: Iterable[int]) -> None:
+        for value_id in value_ids:
+            self.release(value_id)
+
+    def get_all(self, value_ids: Iterable[int]) -> Tuple[T, ...]:
+        return tuple(self._values[value_id] for value_id in value_ids)
+
+
+# A trace as stored in the ring buffer - timestamp, method, uri, request headers, status, response headers, time taken
+RawTrace = Tuple[float, str, str, Tuple, int, Tuple, int]
+
+
+# pylint: disable=too-many-instance-attributes
+class TraceRingBuffer:
+    """A preallocated ring buffer of HTTP traces, stored column by column.
+
+    Numeric fields (timestamps, status codes and durations) are stored in typed arrays while methods, URIs and headers
+    are interned so each distinct value is stored only once no matter how many traces refer to it. Headers are interned
+    pair by pair, as some of the values (e.g. dates and request ids) differ on nearly every request, so each trace only
+    keeps the ids of its header pairs. This keeps the memory footprint of large buffers small.
+
+    Storing a trace spans multiple columns, so writes are serialized by a lock that is held for a few array
+    assignments. Reading is done in small chunks so readers never hold the lock for long.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        if capacity <= 0:
+            raise ValueError(f"Capacity must be positive, got {capacity}")
+
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._count = 0  # The number of traces ever written, the next trace is written to slot _count % capacity
+
+        self._timestamps = array("d", bytes(8 * capacity))
+        self._statuses = array("H", bytes(2 * capacity))
+        self._times_taken = array("q", bytes(8 * capacity))
+        self._methods = array("q", bytes(8 * capacity))
+        self._uris = array("q", bytes(8 * capacity))
+        # The ids of the interned header pairs of each trace
+        self._request_headers: List[Tuple[int, ...]] = [()] * capacity
+        self._response_headers: List[Tuple[int, ...]] = [()] * capacity
+
+        self._interned_methods: InternTable[str] = InternTable()
+        self._interned_uris: InternTable[str] = InternTable()
+        self._interned_headers: InternTable[Tuple] = InternTable()
+
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
+
+    # pylint: disable=too-many-arguments
+    def append(
+            self,
+            timestamp: float,
+            method: str,
+            uri: str,
+            request_headers: Tuple,
+            status: int,
+            response_headers: Tuple,
+            time_taken: int,
+    ) -> None:
+        with self._lock:
+            slot = self._count % self.capacity
+
+            # The headers are interned first, so the buffer is left as it was if they can't be (e.g. being unhashable)
+            request_header_ids = self._interned_headers.acquire_all(request_headers)
+            try:
+                response_header_ids = self._interned_headers.acquire_all(response_headers)
+            except Exception:
+                self._interned_headers.release_all(request_header_ids)
+                raise
+
+            # Release the interned values of the trace being overwritten
+            if self._count >= self.capacity:
+                self._interned_methods.release(self._methods[slot])
+                self._interned_uris.release(self._uris[slot])
+                self._interned_headers.release_all(self._request_headers[slot])
+                self._interned_headers.release_all(self._response_headers[slot])
+
+            self._timestamps[slot] = timestamp
+            self._methods[slot] = self._interned_methods.acquire(method)
+            self._uris[slot] = self._interned_uris.acquire(uri)
+            self._request_headers[slot] = request_header_ids
+            self._statuses[slot] = status
+            self._response_headers[slot] = response_header_ids
+            self._times_taken[slot] = time_taken
+            self._count += 1
+
+    def __iter__(self) -> Iterator[RawTrace]:
+        """Iterates over the traces from the oldest to the newest.
+
+        Traces that are overwritten while iterating are skipped, traces added while iterating aren't returned.
+        """
+        with self._lock:
+            end = self._count
+
+        sequence = max(0, end - self.capacity)
+        while sequence < end:
+            chunk_end = min(sequence + _READ_CHUNK_SIZE, end)
+            with self._lock:
+                chunk = [
+                    self._read(seq % self.capacity)
+                    for seq in range(max(sequence, self._count - self.capacity), chunk_end)
+                ]
+            yield from chunk
+            sequence = chunk_end
+
+    def _read(self, slot: int) -> RawTrace:
+        return (
+            self._timestamps[slot],
+            self._interned_methods.get(self._methods[slot]),
+            self._interned_uris.get(self._uris[slot]),
+            self._interned_headers.get_all(self._request_headers[slot]),
+            self._statuses[slot],
+            self._interned_headers.get_all(self._response_headers[slot]),
+            self._times_taken[slot],
+        )
@@ -1 +1,6 @@
 SBA_V2_CONTENT_TYPE = "application/vnd.spring-boot.actuator.v2+json;charset=UTF-8"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+EVENT_STREAM_CONTENT_TYPE = "text/event-stream"
+PLAIN_TEXT_CONTENT_TYPE = "text/plain; charset=utf-8"
+# Content types of Pyctuator's responses that aren't overridden by SBA_V2_CONTENT_TYPE
+NON_SBA_CONTENT_TYPES = (PROMETHEUS_CONTENT_TYPE, EVENT_STREAM_CONTENT_TYPE, PLAIN_TEXT_CONTENT_TYPE)
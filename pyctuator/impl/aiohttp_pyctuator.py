@@ -1,111 +1,279 @@
-import dataclasses
-import json
-from collections import defaultdict
-from datetime import datetime
-from functools import partial
+import asyncio
+import time
 from http import HTTPStatus
-from typing import Any, Callable, List, Mapping
+from typing import Any, Callable, Iterator, Optional, Set, TypeVar
 
 from aiohttp import web
-from multidict import CIMultiDictProxy
 
 from pyctuator.endpoints import Endpoints
-from pyctuator.httptrace import TraceRecord, TraceRequest, TraceResponse
-from pyctuator.impl import SBA_V2_CONTENT_TYPE
+from pyctuator.impl import SBA_V2_CONTENT_TYPE, PROMETHEUS_CONTENT_TYPE, EVENT_STREAM_CONTENT_TYPE, \
+    PLAIN_TEXT_CONTENT_TYPE, NON_SBA_CONTENT_TYPES
+from pyctuator.impl.etag import is_etag_matched
+from pyctuator.impl.json_serializer import dumps
 from pyctuator.impl.pyctuator_impl import PyctuatorImpl
 from pyctuator.impl.pyctuator_router import PyctuatorRouter
+from pyctuator.logfile.log_search import LogSearchQuery
+from pyctuator.threads.sampling_profiler import PROFILE_FORMATS, render_profile
 
+N = TypeVar("N", int, float)
 
-# pylint: disable=too-many-locals,unused-argument
+
+def _parse_number(name: str, value: Optional[str], parse: Callable[[str], N]) -> Optional[N]:
+    """Parses an optional numeric parameter, responding with 400 Bad Request if it's malformed"""
+    if not value:
+        return None
+    try:
+        return parse(value)
+    except ValueError as e:
+        raise web.HTTPBadRequest(text=f"Invalid {name} {value}") from e
+
+
+# pylint: disable=too-many-locals,too-many-statements,too-many-branches,unused-argument
 class AioHttpPyctuator(PyctuatorRouter):
     def __init__(self, app: web.Application, pyctuator_impl: PyctuatorImpl, disabled_endpoints: Endpoints) -> None:
         super().__init__(app, pyctuator_impl)
 
-        custom_dumps = partial(
-            json.dumps, default=self._custom_json_serializer
-        )
+        # The tasks streaming log events, which are cancelled when the application shuts down
+        log_streams: Set[asyncio.Task] = set()
 
         async def empty_handler(request: web.Request) -> web.Response:
             return web.Response(text='')
 
+        def json_response(data: Any, status: int = HTTPStatus.OK) -> web.Response:
+            return web.Response(body=dumps(data), status=status, headers={"Content-Type": SBA_V2_CONTENT_TYPE})
+
+        async def streamed_json_response(request: web.Request, chunks: Iterator[bytes]) -> web.StreamResponse:
+            response = web.StreamResponse(headers={"Content-Type": SBA_V2_CONTENT_TYPE})
+            await response.prepare(request)
+            for chunk in chunks:
+                await response.write(chunk)
+            await response.write_eof()
+            return response
+
+        def cached_response(request: web.Request, path: str) -> web.Response:
+            response = self.get_cached_response(path)
+            if is_etag_matched(request.headers.get("If-None-Match"), response.etag):
+                return web.Response(status=HTTPStatus.NOT_MODIFIED, headers={"ETag": response.etag})
+            return web.Response(
+                body=response.body,
+                headers={"Content-Type": SBA_V2_CONTENT_TYPE, "ETag": response.etag},
+            )
+
         async def get_endpoints(request: web.Request) -> web.Response:
-            return web.json_response(self.get_endpoints_data(), dumps=custom_dumps)
+            return cached_response(request, "")
 
         async def get_environment(request: web.Request) -> web.Response:
-            return web.json_response(pyctuator_impl.get_environment(), dumps=custom_dumps)
+            return cached_response(request, "/env")
 
         async def get_info(request: web.Request) -> web.Response:
-            return web.json_response(pyctuator_impl.get_app_info(), dumps=custom_dumps)
+            return cached_response(request, "/info")
 
         async def get_health(request: web.Request) -> web.Response:
             health = pyctuator_impl.get_health()
-            return web.json_response(health, status=health.http_status(), dumps=custom_dumps)
+            return json_response(health, status=health.http_status())
 
         async def get_metric_names(request: web.Request) -> web.Response:
-            return web.json_response(pyctuator_impl.get_metric_names(), dumps=custom_dumps)
+            return cached_response(request, "/metrics")
 
         async def get_loggers(request: web.Request) -> web.Response:
-            return web.json_response(pyctuator_impl.logging.get_loggers(), dumps=custom_dumps)
+            return cached_response(request, "/loggers")
 
         async def set_logger_level(request: web.Request) -> web.Response:
             request_dict = await request.json()
-            pyctuator_impl.logging.set_logger_level(
+            pyctuator_impl.set_logger_level(
                 request.match_info["logger_name"],
                 request_dict.get("configuredLevel", None),
             )
-            return web.json_response({})
+            return json_response({})
 
         async def get_logger(request: web.Request) -> web.Response:
             logger_name = request.match_info["logger_name"]
-            return web.json_response(pyctuator_impl.logging.get_logger(logger_name), dumps=custom_dumps)
+            return json_response(pyctuator_impl.logging.get_logger(logger_name))
+
+        async def get_thread_dump(request: web.Request) -> web.StreamResponse:
+            return await streamed_json_response(request, pyctuator_impl.stream_thread_dump())
+
+        async def get_hot_threads(request: web.Request) -> web.Response:
+            return json_response(await pyctuator_impl.get_hot_threads_async(
+                _parse_number("interval", request.query.get("interval"), float),
+                _parse_number("limit", request.query.get("limit"), int),
+            ))
+
+        async def get_task_dump(request: web.Request) -> web.StreamResponse:
+            return await streamed_json_response(request, pyctuator_impl.get_task_dump())
+
+        async def track_tasks(_: web.Application) -> None:
+            pyctuator_impl.task_dump_provider.track_tasks(asyncio.get_running_loop())
+
+        async def get_profile(request: web.Request) -> web.Response:
+            seconds = _parse_number("seconds", request.query.get("seconds"), float)
+            hz = _parse_number("hz", request.query.get("hz"), float)
+            profile_format = request.query.get("format", "folded")
+            if profile_format not in PROFILE_FORMATS:
+                raise web.HTTPBadRequest(text=f"Unknown profile format {profile_format}")
+
+            profile = pyctuator_impl.profiler.start_profile(seconds, hz)
+            if not profile:
+                raise web.HTTPTooManyRequests(text="Too many profiles are being taken")
+            return web.Response(
+                text=render_profile(await asyncio.wrap_future(profile), profile_format),
+                headers={
+                    "Content-Type": PLAIN_TEXT_CONTENT_TYPE if profile_format == "folded" else SBA_V2_CONTENT_TYPE
+                },
+            )
 
-        async def get_thread_dump(request: web.Request) -> web.Response:
-            return web.json_response(pyctuator_impl.get_thread_dump(), dumps=custom_dumps)
+        async def get_tracemalloc_status(request: web.Request) -> web.Response:
+            return json_response(pyctuator_impl.allocation_tracer.get_status())
 
-        async def get_httptrace(request: web.Request) -> web.Response:
-            raw_data = pyctuator_impl.http_tracer.get_httptrace()
-            return web.json_response(raw_data, dumps=custom_dumps)
+        async def start_tracemalloc(request: web.Request) -> web.Response:
+            return json_response(pyctuator_impl.start_tracemalloc(
+                _parse_number("frames", request.query.get("frames"), int)
+            ))
 
-        async def get_metric_measurement(request: web.Request) -> web.Response:
-            return web.json_response(
-                pyctuator_impl.get_metric_measurement(request.match_info["metric_name"]),
-                dumps=custom_dumps)
+        async def stop_tracemalloc(request: web.Request) -> web.Response:
+            return json_response(pyctuator_impl.stop_tracemalloc())
 
-        async def get_logfile(request: web.Request) -> web.Response:
-            range_header = request.headers.get("range")
-            if not range_header:
-                return web.Response(
-                    body=f"{pyctuator_impl.logfile.log_messages.get_range()}"
+        async def take_tracemalloc_snapshot(request: web.Request) -> web.Response:
+            # Taking and comparing snapshots of large heaps may take seconds, so it's done off the event loop
+            snapshot_id = await asyncio.get_running_loop().run_in_executor(
+                None, pyctuator_impl.allocation_tracer.take_snapshot
+            )
+            if snapshot_id is None:
+                raise web.HTTPConflict(text="tracemalloc isn't tracing")
+            return json_response({"id": snapshot_id})
+
+        async def get_allocations(request: web.Request) -> web.Response:
+            limit = _parse_number("limit", request.query.get("limit"), int)
+            snapshot = _parse_number("snapshot", request.query.get("snapshot"), int)
+            try:
+                allocations = await asyncio.get_running_loop().run_in_executor(
+                    None,
+                    pyctuator_impl.allocation_tracer.get_allocations,
+                    request.query.get("group_by", "lineno"),
+                    limit,
+                    snapshot,
                 )
+            except ValueError as e:
+                raise web.HTTPBadRequest(text=str(e)) from e
+            if allocations is None:
+                raise web.HTTPConflict(text="tracemalloc isn't tracing")
+            return json_response(allocations)
 
-            str_res, start, end = pyctuator_impl.logfile.get_logfile(range_header)
-            response = web.Response(
+        async def get_httptrace(request: web.Request) -> web.StreamResponse:
+            return await streamed_json_response(request, pyctuator_impl.stream_httptrace())
+
+        async def get_metric_measurement(request: web.Request) -> web.Response:
+            try:
+                return json_response(pyctuator_impl.get_metric_measurement(request.match_info["metric_name"]))
+            except KeyError as e:
+                raise web.HTTPNotFound(text=e.args[0]) from e
+
+        async def get_metric_history(request: web.Request) -> web.Response:
+            points = _parse_number("points", request.query.get("points"), int)
+            try:
+                return json_response(pyctuator_impl.get_metric_history(request.match_info["metric_name"], points))
+            except KeyError as e:
+                raise web.HTTPNotFound(text=e.args[0]) from e
+
+        def partial_logfile_response(logfile_bytes: bytes, start: int, end: int) -> web.Response:
+            return web.Response(
                 status=HTTPStatus.PARTIAL_CONTENT.value,
-                body=str_res,
+                body=logfile_bytes,
                 headers={
                     "Content-Type": "text/html; charset=UTF-8",
                     "Accept-Ranges": "bytes",
                     "Content-Range": f"bytes {start}-{end}/{end}",
                 },
             )
+
+        async def get_logfile(request: web.Request) -> web.Response:
+            range_header = request.headers.get("range")
+            if not range_header:
+                return web.Response(body=pyctuator_impl.logfile.get_tail())
+
+            return partial_logfile_response(*pyctuator_impl.logfile.get_logfile(range_header))
+
+        async def search_logfile(request: web.Request) -> web.Response:
+            try:
+                return json_response(pyctuator_impl.logfile.search(LogSearchQuery.parse(request.query)))
+            except ValueError as e:
+                raise web.HTTPBadRequest(text=str(e)) from e
+
+        async def tail_logfile(request: web.Request) -> web.Response:
+            return partial_logfile_response(*await pyctuator_impl.logfile.tail_log_async(
+                _parse_number("offset", request.query.get("offset"), int),
+                _parse_number("timeout", request.query.get("timeout"), float),
+            ))
+
+        async def stream_logfile(request: web.Request) -> web.StreamResponse:
+            offset = _parse_number("offset", request.query.get("offset", request.headers.get("Last-Event-ID")), int)
+            response = web.StreamResponse(
+                headers={"Content-Type": EVENT_STREAM_CONTENT_TYPE, "Cache-Control": "no-cache"}
+            )
+            await response.prepare(request)
+            log_events = pyctuator_impl.logfile.iter_log_events(offset)
+            log_stream = asyncio.current_task()
+            assert log_stream
+            log_streams.add(log_stream)
+            try:
+                async for log_event in log_events:
+                    await response.write(log_event.encode("utf-8"))
+            finally:
+                log_streams.discard(log_stream)
+                await log_events.aclose()
+            return response
+
+        async def stop_log_streams(_: web.Application) -> None:
+            # The streams never end, so they are cancelled rather than delaying the shutdown
+            for log_stream in log_streams:
+                log_stream.cancel()
+
+        async def get_prometheus_metrics(request: web.Request) -> web.StreamResponse:
+            response = web.StreamResponse(headers={"Content-Type": PROMETHEUS_CONTENT_TYPE})
+            await response.prepare(request)
+            for text in pyctuator_impl.get_prometheus_metrics():
+                await response.write(text.encode("utf-8"))
+            await response.write_eof()
             return response
 
         @web.middleware
         async def intercept_requests_and_responses(request: web.Request, handler: Callable) -> Any:
-            request_time = datetime.now()
-            response = await handler(request)
-            response_time = datetime.now()
+            trace_policy = self.pyctuator_impl.http_tracer.trace_policy
+            should_trace = trace_policy.should_trace_request(request.url.path)
+
+            request_time = time.time() if should_trace else 0
+            start = time.perf_counter()
+
+            # A request whose handler raised is recorded as well, with the status of the raised HTTP error if any
+            response: Optional[web.StreamResponse] = None
+            try:
+                response = await handler(request)
+
+                # Set the SBA-V2 content type for responses from Pyctuator, except for the streamed Prometheus metrics
+                # and log events whose headers were already sent, and for plain text responses
+                if request.url.path.startswith(self.pyctuator_impl.pyctuator_endpoint_path_prefix) \
+                        and response.headers.get("Content-Type") not in NON_SBA_CONTENT_TYPES:
+                    response.headers["Content-Type"] = SBA_V2_CONTENT_TYPE
+                return response
+            except web.HTTPException as e:
+                response = e
+                raise
+            finally:
+                duration = time.perf_counter() - start
+                status = response.status if response is not None else HTTPStatus.INTERNAL_SERVER_ERROR.value
+
+                # Record the request's latency
+                resource = request.match_info.route.resource
+                self.pyctuator_impl.http_requests_metrics.record(
+                    request.method,
+                    resource.canonical if resource else None,
+                    status,
+                    duration,
+                )
 
-            # Set the SBA-V2 content type for responses from Pyctuator
-            if request.url.path.startswith(self.pyctuator_impl.pyctuator_endpoint_path_prefix):
-                response.headers["Content-Type"] = SBA_V2_CONTENT_TYPE
-
-            # Record the request and response
-            new_record = self._create_record(
-                request, response, request_time, response_time
-            )
-            self.pyctuator_impl.http_tracer.add_record(record=new_record)
-            return response
+                # Record the request and response
+                if should_trace and trace_policy.should_trace_response(status):
+                    self._record_request_and_response(request, status, response, request_time, duration)
 
         routes = [
             web.get("/pyctuator", get_endpoints),
@@ -127,6 +295,8 @@ class AioHttpPyctuator(PyctuatorRouter):
             routes.append(web.options("/pyctuator/metrics", empty_handler))
             routes.append(web.get("/pyctuator/metrics", get_metric_names))
             routes.append(web.get("/pyctuator/metrics/{metric_name}", get_metric_measurement))
+            if pyctuator_impl.metrics_history:
+                routes.append(web.get("/pyctuator/metrics/{metric_name}/history", get_metric_history))
 
         if Endpoints.LOGGERS not in disabled_endpoints:
             routes.append(web.options("/pyctuator/loggers", empty_handler))
@@ -139,10 +309,29 @@ class AioHttpPyctuator(PyctuatorRouter):
             routes.append(web.options("/pyctuator/threaddump", empty_handler))
             routes.append(web.get("/pyctuator/dump", get_thread_dump))
             routes.append(web.get("/pyctuator/threaddump", get_thread_dump))
+            routes.append(web.get("/pyctuator/threaddump/hot", get_hot_threads))
+
+        if Endpoints.TASK_DUMP not in disabled_endpoints:
+            routes.append(web.get("/pyctuator/taskdump", get_task_dump))
+            app.on_startup.append(track_tasks)
+
+        if Endpoints.PROFILE not in disabled_endpoints:
+            routes.append(web.get("/pyctuator/profile", get_profile))
+
+        if Endpoints.TRACEMALLOC not in disabled_endpoints:
+            routes.append(web.get("/pyctuator/tracemalloc", get_tracemalloc_status))
+            routes.append(web.post("/pyctuator/tracemalloc/start", start_tracemalloc))
+            routes.append(web.post("/pyctuator/tracemalloc/stop", stop_tracemalloc))
+            routes.append(web.post("/pyctuator/tracemalloc/snapshots", take_tracemalloc_snapshot))
+            routes.append(web.get("/pyctuator/tracemalloc/allocations", get_allocations))
 
         if Endpoints.LOGFILE not in disabled_endpoints:
             routes.append(web.options("/pyctuator/logfile", empty_handler))
             routes.append(web.get("/pyctuator/logfile", get_logfile))
+            routes.append(web.get("/pyctuator/logfile/search", search_logfile))
+            routes.append(web.get("/pyctuator/logfile/tail", tail_logfile))
+            routes.append(web.get("/pyctuator/logfile/stream", stream_logfile))
+            app.on_shutdown.append(stop_log_streams)
 
         if Endpoints.HTTP_TRACE not in disabled_endpoints:
             routes.append(web.options("/pyctuator/trace", empty_handler))
@@ -150,43 +339,27 @@ class AioHttpPyctuator(PyctuatorRouter):
             routes.append(web.get("/pyctuator/trace", get_httptrace))
             routes.append(web.get("/pyctuator/httptrace", get_httptrace))
 
+        if Endpoints.PROMETHEUS not in disabled_endpoints:
+            routes.append(web.options("/pyctuator/prometheus", empty_handler))
+            routes.append(web.get("/pyctuator/prometheus", get_prometheus_metrics))
+
         app.add_routes(routes)
         app.middlewares.append(intercept_requests_and_responses)
 
-    def _custom_json_serializer(self, value: Any) -> Any:
-        if dataclasses.is_dataclass(value):
-            return dataclasses.asdict(value)
-
-        if isinstance(value, datetime):
-            return str(value)
-        return None
-
-    def _create_headers_dictionary(self, headers: CIMultiDictProxy[str]) -> Mapping[str, List[str]]:
-        headers_dict: Mapping[str, List[str]] = defaultdict(list)
-        for (key, value) in headers.items():
-            headers_dict[key].append(value)
-        return dict(headers_dict)
-
-    def _create_record(
+    def _record_request_and_response(
             self,
             request: web.Request,
-            response: web.Response,
-            request_time: datetime,
-            response_time: datetime
-    ) -> TraceRecord:
-        new_record: TraceRecord = TraceRecord(
+            status: int,
+            response: Optional[web.StreamResponse],
+            request_time: float,
+            duration: float,
+    ) -> None:
+        self.pyctuator_impl.http_tracer.record(
             request_time,
-            None,
-            None,
-            TraceRequest(
-                request.method,
-                str(request.url),
-                self._create_headers_dictionary(request.headers),
-            ),
-            TraceResponse(
-                response.status,
-                self._create_headers_dictionary(CIMultiDictProxy(response.headers))
-            ),
-            int((response_time.timestamp() - request_time.timestamp()) * 1000),
+            request.method,
+            str(request.url),
+            tuple(request.headers.items()),
+            status,
+            tuple(response.headers.items()) if response is not None else (),
+            int(duration * 1000),
         )
-        return new_record
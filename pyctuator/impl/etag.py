@@ -0,0 +1,15 @@
+from typing import Optional
+
+
+def is_etag_matched(if_none_match: Optional[str], etag: str) -> bool:
+    """Returns whether the value of a request's If-None-Match header matches the ETag of the current representation,
+    in which case the request should be answered with 304 Not Modified. ETags are compared weakly, ignoring "W/" """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return _strip_weak(etag) in (_strip_weak(candidate.strip()) for candidate in if_none_match.split(","))
+
+
+def _strip_weak(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
@@ -1,32 +1,37 @@
-from collections import defaultdict
-from datetime import datetime
+import asyncio
+import time
 from http import HTTPStatus
-from typing import Mapping, List, Callable
+from typing import AsyncIterator, Callable
 from typing import Optional, Dict, Awaitable
 
-from fastapi import APIRouter, FastAPI, Header
+from fastapi import APIRouter, FastAPI, Header, HTTPException, Query
 from pydantic import BaseModel
-from starlette.datastructures import Headers
 from starlette.requests import Request
-from starlette.responses import Response
+from starlette.responses import Response, StreamingResponse
 
 from pyctuator.endpoints import Endpoints
 from pyctuator.environment.environment_provider import EnvironmentData
-from pyctuator.httptrace import TraceRecord, TraceRequest, TraceResponse
 from pyctuator.httptrace.http_tracer import Traces
-from pyctuator.impl import SBA_V2_CONTENT_TYPE
+from pyctuator.impl import SBA_V2_CONTENT_TYPE, PROMETHEUS_CONTENT_TYPE, EVENT_STREAM_CONTENT_TYPE, \
+    PLAIN_TEXT_CONTENT_TYPE, NON_SBA_CONTENT_TYPES
+from pyctuator.impl.etag import is_etag_matched
+from pyctuator.impl.json_serializer import dumps
 from pyctuator.impl.pyctuator_impl import PyctuatorImpl
 from pyctuator.impl.pyctuator_router import PyctuatorRouter
+from pyctuator.logfile.log_search import LogSearchQuery, LogSearchResult
 from pyctuator.logging.pyctuator_logging import LoggersData, LoggerLevels
+from pyctuator.memory.allocation_tracer import Allocations, TracemallocStatus
+from pyctuator.metrics.metrics_history import MetricHistory
 from pyctuator.metrics.metrics_provider import Metric, MetricNames
-from pyctuator.threads.thread_dump_provider import ThreadDump
+from pyctuator.threads.sampling_profiler import PROFILE_FORMATS, render_profile
+from pyctuator.threads.thread_dump_provider import HotThreads, ThreadDump
 
 
 class FastApiLoggerItem(BaseModel):
     configuredLevel: Optional[str]
 
 
-# pylint: disable=too-many-locals
+# pylint: disable=too-many-locals,too-many-branches,too-many-statements
 class FastApiPyctuator(PyctuatorRouter):
 
     # pylint: disable=unused-variable
@@ -43,9 +48,21 @@ class FastApiPyctuator(PyctuatorRouter):
         if customizer:
             customizer(router)
 
+        def json_response(data: object, status_code: int = HTTPStatus.OK) -> Response:
+            return Response(content=dumps(data), status_code=status_code, headers={"Content-Type": SBA_V2_CONTENT_TYPE})
+
+        def cached_response(request: Request, path: str) -> Response:
+            response = self.get_cached_response(path)
+            if is_etag_matched(request.headers.get("If-None-Match"), response.etag):
+                return Response(status_code=HTTPStatus.NOT_MODIFIED, headers={"ETag": response.etag})
+            return Response(
+                content=response.body,
+                headers={"Content-Type": SBA_V2_CONTENT_TYPE, "ETag": response.etag},
+            )
+
         @router.get("/", include_in_schema=include_in_openapi_schema, tags=["pyctuator"])
-        def get_endpoints() -> object:
-            return {"_links": self.get_endpoints_links()}
+        def get_endpoints(request: Request) -> object:
+            return cached_response(request, "")
 
         @router.options("/env", include_in_schema=include_in_openapi_schema)
         @router.options("/info", include_in_schema=include_in_openapi_schema)
@@ -57,6 +74,7 @@ class FastApiPyctuator(PyctuatorRouter):
         @router.options("/logfile", include_in_schema=include_in_openapi_schema)
         @router.options("/trace", include_in_schema=include_in_openapi_schema)
         @router.options("/httptrace", include_in_schema=include_in_openapi_schema)
+        @router.options("/prometheus", include_in_schema=include_in_openapi_schema)
         def options() -> None:
             """
             Spring boot admin, after registration, issues multiple OPTIONS request to the monitored application in order
@@ -67,118 +85,334 @@ class FastApiPyctuator(PyctuatorRouter):
             """
 
         if Endpoints.ENV not in disabled_endpoints:
-            @router.get("/env", include_in_schema=include_in_openapi_schema, tags=["pyctuator"])
-            def get_environment() -> EnvironmentData:
-                return pyctuator_impl.get_environment()
+            @router.get(
+                "/env",
+                include_in_schema=include_in_openapi_schema,
+                tags=["pyctuator"],
+                response_model=EnvironmentData,
+            )
+            def get_environment(request: Request) -> object:
+                return cached_response(request, "/env")
 
         if Endpoints.INFO not in disabled_endpoints:
-            @router.get("/info", include_in_schema=include_in_openapi_schema, tags=["pyctuator"])
-            def get_info() -> Dict:
-                return pyctuator_impl.get_app_info()
+            @router.get("/info", include_in_schema=include_in_openapi_schema, tags=["pyctuator"], response_model=Dict)
+            def get_info(request: Request) -> object:
+                return cached_response(request, "/info")
 
         if Endpoints.HEALTH not in disabled_endpoints:
             @router.get("/health", include_in_schema=include_in_openapi_schema, tags=["pyctuator"])
-            def get_health(response: Response) -> object:
+            def get_health() -> Response:
                 health = pyctuator_impl.get_health()
-                response.status_code = health.http_status()
-                return health
+                return json_response(health, health.http_status())
 
         if Endpoints.METRICS not in disabled_endpoints:
-            @router.get("/metrics", include_in_schema=include_in_openapi_schema, tags=["pyctuator"])
-            def get_metric_names() -> MetricNames:
-                return pyctuator_impl.get_metric_names()
+            @router.get(
+                "/metrics",
+                include_in_schema=include_in_openapi_schema,
+                tags=["pyctuator"],
+                response_model=MetricNames,
+            )
+            def get_metric_names(request: Request) -> object:
+                return cached_response(request, "/metrics")
+
+            @router.get(
+                "/metrics/{metric_name}",
+                include_in_schema=include_in_openapi_schema,
+                tags=["pyctuator"],
+                response_model=Metric,
+            )
+            def get_metric_measurement(metric_name: str) -> Response:
+                try:
+                    return json_response(pyctuator_impl.get_metric_measurement(metric_name))
+                except KeyError as e:
+                    raise HTTPException(HTTPStatus.NOT_FOUND.value, e.args[0]) from e
 
-            @router.get("/metrics/{metric_name}", include_in_schema=include_in_openapi_schema, tags=["pyctuator"])
-            def get_metric_measurement(metric_name: str) -> Metric:
-                return pyctuator_impl.get_metric_measurement(metric_name)
+            if pyctuator_impl.metrics_history:
+                @router.get(
+                    "/metrics/{metric_name}/history",
+                    include_in_schema=include_in_openapi_schema,
+                    tags=["pyctuator"],
+                    response_model=MetricHistory,
+                )
+                def get_metric_history(metric_name: str, points: Optional[int] = None) -> Response:
+                    try:
+                        return json_response(pyctuator_impl.get_metric_history(metric_name, points))
+                    except KeyError as e:
+                        raise HTTPException(HTTPStatus.NOT_FOUND.value, e.args[0]) from e
 
         # Retrieving All Loggers
         if Endpoints.LOGGERS not in disabled_endpoints:
-            @router.get("/loggers", include_in_schema=include_in_openapi_schema, tags=["pyctuator"])
-            def get_loggers() -> LoggersData:
-                return pyctuator_impl.logging.get_loggers()
+            @router.get(
+                "/loggers",
+                include_in_schema=include_in_openapi_schema,
+                tags=["pyctuator"],
+                response_model=LoggersData,
+            )
+            def get_loggers(request: Request) -> object:
+                return cached_response(request, "/loggers")
 
             @router.post("/loggers/{logger_name}", include_in_schema=include_in_openapi_schema, tags=["pyctuator"])
             def set_logger_level(item: FastApiLoggerItem, logger_name: str) -> Dict:
-                pyctuator_impl.logging.set_logger_level(logger_name, item.configuredLevel)
+                pyctuator_impl.set_logger_level(logger_name, item.configuredLevel)
                 return {}
 
-            @router.get("/loggers/{logger_name}", include_in_schema=include_in_openapi_schema, tags=["pyctuator"])
-            def get_logger(logger_name: str) -> LoggerLevels:
-                return pyctuator_impl.logging.get_logger(logger_name)
+            @router.get(
+                "/loggers/{logger_name}",
+                include_in_schema=include_in_openapi_schema,
+                tags=["pyctuator"],
+                response_model=LoggerLevels,
+            )
+            def get_logger(logger_name: str) -> Response:
+                return json_response(pyctuator_impl.logging.get_logger(logger_name))
 
         if Endpoints.THREAD_DUMP not in disabled_endpoints:
-            @router.get("/dump", include_in_schema=include_in_openapi_schema, tags=["pyctuator"])
-            @router.get("/threaddump", include_in_schema=include_in_openapi_schema, tags=["pyctuator"])
-            def get_thread_dump() -> ThreadDump:
-                return pyctuator_impl.get_thread_dump()
+            @router.get(
+                "/dump",
+                include_in_schema=include_in_openapi_schema,
+                tags=["pyctuator"],
+                response_model=ThreadDump,
+            )
+            @router.get(
+                "/threaddump",
+                include_in_schema=include_in_openapi_schema,
+                tags=["pyctuator"],
+                response_model=ThreadDump,
+            )
+            def get_thread_dump() -> Response:
+                # Starlette iterates the chunks in a thread, so the threads are dumped off the event loop
+                return StreamingResponse(
+                    pyctuator_impl.stream_thread_dump(),
+                    headers={"Content-Type": SBA_V2_CONTENT_TYPE},
+                )
 
-        if Endpoints.LOGFILE not in disabled_endpoints:
-            @router.get("/logfile", include_in_schema=include_in_openapi_schema, tags=["pyctuator"])
-            def get_logfile(range_header: str = Header(default=None,
-                                                       alias="range")) -> Response:  # pylint: disable=redefined-builtin
-                if not range_header:
-                    return Response(content=pyctuator_impl.logfile.log_messages.get_range())
+            @router.get(
+                "/threaddump/hot",
+                include_in_schema=include_in_openapi_schema,
+                tags=["pyctuator"],
+                response_model=HotThreads,
+            )
+            async def get_hot_threads(interval: Optional[float] = None, limit: Optional[int] = None) -> Response:
+                return json_response(await pyctuator_impl.get_hot_threads_async(interval, limit))
+
+        if Endpoints.TASK_DUMP not in disabled_endpoints:
+            @router.get("/taskdump", include_in_schema=include_in_openapi_schema, tags=["pyctuator"])
+            async def get_task_dump() -> Response:
+                async def stream_task_dump() -> AsyncIterator[bytes]:
+                    # Iterated by the event loop's thread, unlike a sync iterator that Starlette iterates in a thread
+                    for chunk in pyctuator_impl.get_task_dump():
+                        yield chunk
+
+                return StreamingResponse(stream_task_dump(), headers={"Content-Type": SBA_V2_CONTENT_TYPE})
+
+            async def track_tasks() -> None:
+                pyctuator_impl.task_dump_provider.track_tasks(asyncio.get_running_loop())
+
+            app.add_event_handler("startup", track_tasks)
+
+        if Endpoints.PROFILE not in disabled_endpoints:
+            @router.get("/profile", include_in_schema=include_in_openapi_schema, tags=["pyctuator"])
+            async def get_profile(
+                    seconds: Optional[float] = None,
+                    hz: Optional[float] = None,
+                    profile_format: str = Query(default="folded", alias="format"),
+            ) -> Response:
+                if profile_format not in PROFILE_FORMATS:
+                    raise HTTPException(HTTPStatus.BAD_REQUEST.value, f"Unknown profile format {profile_format}")
+
+                profile = pyctuator_impl.profiler.start_profile(seconds, hz)
+                if not profile:
+                    raise HTTPException(HTTPStatus.TOO_MANY_REQUESTS.value, "Too many profiles are being taken")
+                return Response(
+                    content=render_profile(await asyncio.wrap_future(profile), profile_format),
+                    headers={
+                        "Content-Type": PLAIN_TEXT_CONTENT_TYPE if profile_format == "folded" else SBA_V2_CONTENT_TYPE
+                    },
+                )
+
+        if Endpoints.TRACEMALLOC not in disabled_endpoints:
+            @router.get(
+                "/tracemalloc",
+                include_in_schema=include_in_openapi_schema,
+                tags=["pyctuator"],
+                response_model=TracemallocStatus,
+            )
+            def get_tracemalloc_status() -> Response:
+                return json_response(pyctuator_impl.allocation_tracer.get_status())
+
+            @router.post(
+                "/tracemalloc/start",
+                include_in_schema=include_in_openapi_schema,
+                tags=["pyctuator"],
+                response_model=TracemallocStatus,
+            )
+            def start_tracemalloc(frames: Optional[int] = None) -> Response:
+                return json_response(pyctuator_impl.start_tracemalloc(frames))
 
-                str_res, start, end = pyctuator_impl.logfile.get_logfile(range_header)
+            @router.post(
+                "/tracemalloc/stop",
+                include_in_schema=include_in_openapi_schema,
+                tags=["pyctuator"],
+                response_model=TracemallocStatus,
+            )
+            def stop_tracemalloc() -> Response:
+                return json_response(pyctuator_impl.stop_tracemalloc())
 
-                my_res = Response(
+            @router.post("/tracemalloc/snapshots", include_in_schema=include_in_openapi_schema, tags=["pyctuator"])
+            def take_tracemalloc_snapshot() -> Dict:
+                snapshot_id = pyctuator_impl.allocation_tracer.take_snapshot()
+                if snapshot_id is None:
+                    raise HTTPException(HTTPStatus.CONFLICT.value, "tracemalloc isn't tracing")
+                return {"id": snapshot_id}
+
+            @router.get(
+                "/tracemalloc/allocations",
+                include_in_schema=include_in_openapi_schema,
+                tags=["pyctuator"],
+                response_model=Allocations,
+            )
+            def get_allocations(
+                    group_by: str = "lineno",
+                    limit: Optional[int] = None,
+                    snapshot: Optional[int] = None,
+            ) -> Response:
+                try:
+                    allocations = pyctuator_impl.allocation_tracer.get_allocations(group_by, limit, snapshot)
+                except ValueError as e:
+                    raise HTTPException(HTTPStatus.BAD_REQUEST.value, str(e)) from e
+                if allocations is None:
+                    raise HTTPException(HTTPStatus.CONFLICT.value, "tracemalloc isn't tracing")
+                return json_response(allocations)
+
+        if Endpoints.LOGFILE not in disabled_endpoints:
+            def partial_logfile_response(logfile_bytes: bytes, start: int, end: int) -> Response:
+                return Response(
                     status_code=HTTPStatus.PARTIAL_CONTENT.value,
-                    content=str_res,
+                    content=logfile_bytes,
                     headers={
                         "Content-Type": "text/html; charset=UTF-8",
                         "Accept-Ranges": "bytes",
                         "Content-Range": f"bytes {start}-{end}/{end}",
                     })
 
-                return my_res
+            @router.get("/logfile", include_in_schema=include_in_openapi_schema, tags=["pyctuator"])
+            def get_logfile(range_header: str = Header(default=None,
+                                                       alias="range")) -> Response:  # pylint: disable=redefined-builtin
+                if not range_header:
+                    return Response(content=pyctuator_impl.logfile.get_tail())
+
+                return partial_logfile_response(*pyctuator_impl.logfile.get_logfile(range_header))
+
+            @router.get(
+                "/logfile/search",
+                include_in_schema=include_in_openapi_schema,
+                tags=["pyctuator"],
+                response_model=LogSearchResult,
+            )
+            def search_logfile(request: Request) -> Response:
+                try:
+                    return json_response(pyctuator_impl.logfile.search(LogSearchQuery.parse(request.query_params)))
+                except ValueError as e:
+                    raise HTTPException(HTTPStatus.BAD_REQUEST.value, str(e)) from e
+
+            @router.get("/logfile/tail", include_in_schema=include_in_openapi_schema, tags=["pyctuator"])
+            async def tail_logfile(offset: Optional[int] = None, timeout: Optional[float] = None) -> Response:
+                return partial_logfile_response(*await pyctuator_impl.logfile.tail_log_async(offset, timeout))
+
+            @router.get("/logfile/stream", include_in_schema=include_in_openapi_schema, tags=["pyctuator"])
+            async def stream_logfile(
+                    offset: Optional[int] = None,
+                    last_event_id: Optional[int] = Header(default=None, alias="last-event-id"),
+            ) -> Response:
+                # Not using media_type as Starlette would append a charset to the content-type
+                return StreamingResponse(
+                    pyctuator_impl.logfile.iter_log_events(last_event_id if offset is None else offset),
+                    headers={"Content-Type": EVENT_STREAM_CONTENT_TYPE, "Cache-Control": "no-cache"},
+                )
 
         if Endpoints.HTTP_TRACE not in disabled_endpoints:
-            @router.get("/trace", include_in_schema=include_in_openapi_schema, tags=["pyctuator"])
-            @router.get("/httptrace", include_in_schema=include_in_openapi_schema, tags=["pyctuator"])
-            def get_httptrace() -> Traces:
-                return pyctuator_impl.http_tracer.get_httptrace()
+            @router.get(
+                "/trace",
+                include_in_schema=include_in_openapi_schema,
+                tags=["pyctuator"],
+                response_model=Traces,
+            )
+            @router.get(
+                "/httptrace",
+                include_in_schema=include_in_openapi_schema,
+                tags=["pyctuator"],
+                response_model=Traces,
+            )
+            def get_httptrace() -> Response:
+                return StreamingResponse(
+                    pyctuator_impl.stream_httptrace(),
+                    headers={"Content-Type": SBA_V2_CONTENT_TYPE},
+                )
+
+        if Endpoints.PROMETHEUS not in disabled_endpoints:
+            @router.get("/prometheus", include_in_schema=include_in_openapi_schema, tags=["pyctuator"])
+            def get_prometheus_metrics() -> Response:
+                # Not using media_type as Starlette would append another charset to the content-type
+                return StreamingResponse(
+                    pyctuator_impl.get_prometheus_metrics(),
+                    headers={"Content-Type": PROMETHEUS_CONTENT_TYPE},
+                )
 
         @app.middleware("http")
         async def intercept_requests_and_responses(
                 request: Request,
                 call_next: Callable[[Request], Awaitable[Response]]
         ) -> Response:
-            request_time = datetime.now()
-            response: Response = await call_next(request)
-            response_time = datetime.now()
+            trace_policy = self.pyctuator_impl.http_tracer.trace_policy
+            should_trace = trace_policy.should_trace_request(request.url.path)
 
-            # Set the SBA-V2 content type for responses from Pyctuator
-            if request.url.path.startswith(self.pyctuator_impl.pyctuator_endpoint_path_prefix):
-                response.headers["Content-Type"] = SBA_V2_CONTENT_TYPE
+            request_time = time.time() if should_trace else 0
+            start = time.perf_counter()
 
-            # Record the request and response
-            new_record = self._create_record(request, response, request_time, response_time)
-            self.pyctuator_impl.http_tracer.add_record(record=new_record)
+            # A request whose handler raised is recorded as well, as an internal server error
+            response: Optional[Response] = None
+            try:
+                response = await call_next(request)
 
-            return response
+                # Set the SBA-V2 content type for responses from Pyctuator, except for the streamed Prometheus metrics
+                # and log events, and for plain text responses
+                if request.url.path.startswith(self.pyctuator_impl.pyctuator_endpoint_path_prefix) \
+                        and response.headers.get("Content-Type") not in NON_SBA_CONTENT_TYPES:
+                    response.headers["Content-Type"] = SBA_V2_CONTENT_TYPE
+                return response
+            finally:
+                duration = time.perf_counter() - start
+                status = response.status_code if response is not None else HTTPStatus.INTERNAL_SERVER_ERROR.value
 
-        app.include_router(router, prefix=pyctuator_impl.pyctuator_endpoint_path_prefix)
+                # Record the request's latency, the matched route is in the scope once the request was handled
+                route = request.scope.get("route")
+                self.pyctuator_impl.http_requests_metrics.record(
+                    request.method,
+                    route.path if route else None,
+                    status,
+                    duration,
+                )
+
+                # Record the request and response
+                if should_trace and trace_policy.should_trace_response(status):
+                    self._record_request_and_response(request, status, response, request_time, duration)
 
-    def _create_headers_dictionary(self, headers: Headers) -> Mapping[str, List[str]]:
-        headers_dict: Mapping[str, List[str]] = defaultdict(list)
-        for (key, value) in headers.items():
-            headers_dict[key].append(value)
-        return headers_dict
+        app.include_router(router, prefix=pyctuator_impl.pyctuator_endpoint_path_prefix)
 
-    def _create_record(
+    def _record_request_and_response(
             self,
             request: Request,
-            response: Response,
-            request_time: datetime,
-            response_time: datetime,
-    ) -> TraceRecord:
-        new_record: TraceRecord = TraceRecord(
+            status: int,
+            response: Optional[Response],
+            request_time: float,
+            duration: float,
+    ) -> None:
+        # Starlette keeps the headers as latin-1 encoded bytes, decoding them is deferred until traces are requested
+        self.pyctuator_impl.http_tracer.record(
             request_time,
-            None,
-            None,
-            TraceRequest(request.method, str(request.url), self._create_headers_dictionary(request.headers)),
-            TraceResponse(response.status_code, self._create_headers_dictionary(response.headers)),
-            int((response_time.timestamp() - request_time.timestamp()) * 1000),
+            request.method,
+            str(request.url),
+            request.headers.raw,
+            status,
+            response.headers.raw if response is not None else (),
+            int(duration * 1000),
         )
-        return new_record
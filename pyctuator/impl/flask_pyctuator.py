@@ -1,42 +1,39 @@
 import json
-from collections import defaultdict
-from datetime import datetime, date
+import time
 from http import HTTPStatus
-from typing import Dict, Tuple, Any, Mapping, List
+from typing import Callable, Dict, Optional, Tuple, Any, TypeVar
 
-from flask import Flask, Blueprint, request, jsonify, after_this_request
+from flask import Flask, Blueprint, abort, request, after_this_request
 from flask import Response, make_response
-from flask.json.provider import DefaultJSONProvider
-# from flask.json import JSONEncoder
-from werkzeug.datastructures import Headers
 
 from pyctuator.endpoints import Endpoints
-from pyctuator.httptrace import TraceRecord, TraceRequest, TraceResponse
-from pyctuator.impl import SBA_V2_CONTENT_TYPE
+from pyctuator.impl import SBA_V2_CONTENT_TYPE, PROMETHEUS_CONTENT_TYPE, PLAIN_TEXT_CONTENT_TYPE, \
+    NON_SBA_CONTENT_TYPES
+from pyctuator.impl.etag import is_etag_matched
+from pyctuator.impl.json_serializer import dumps
 from pyctuator.impl.pyctuator_impl import PyctuatorImpl
 from pyctuator.impl.pyctuator_router import PyctuatorRouter
+from pyctuator.logfile.log_search import LogSearchQuery
+from pyctuator.threads.sampling_profiler import PROFILE_FORMATS, render_profile
 
+N = TypeVar("N", int, float)
 
-class IsoTimeJSONProvider(DefaultJSONProvider):
-    """ Override Flask's JSON encoding of datetime to assure ISO format is used.
 
-    By default, when Flask is rendering a response to JSON, it is formatting datetime, date and time according to
-    RFC-822 which is different from the ISO format used by SBA.
-
-    As of 2.2.*, changing the datetime and date JSON encoding is done globally,
-    see https://stackoverflow.com/a/74618781/2692895 (which is an updated reply to
-    https://stackoverflow.com/questions/43663552/keep-a-datetime-date-in-yyyy-mm-dd-format-when-using-flasks-jsonify)
-    """
-
-    def default(self, o: Any) -> Any:
-        if isinstance(o, (date, datetime)):
-            return o.isoformat()
-        return super().default(o)
+def _get_number_arg(name: str, parse: Callable[[str], N]) -> Optional[N]:
+    """Parses an optional numeric query argument, responding with 400 Bad Request if it's malformed (rather than
+    ignoring it, as `request.args.get` with a type does)"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return parse(value)
+    except ValueError:
+        abort(HTTPStatus.BAD_REQUEST, f"Invalid {name} {value}")
 
 
 class FlaskPyctuator(PyctuatorRouter):
 
-    # pylint: disable=too-many-locals, unused-variable
+    # pylint: disable=too-many-locals, too-many-statements, unused-variable
     def __init__(
             self,
             app: Flask,
@@ -47,118 +44,226 @@ class FlaskPyctuator(PyctuatorRouter):
 
         path_prefix: str = pyctuator_impl.pyctuator_endpoint_path_prefix
         flask_blueprint: Blueprint = Blueprint("flask_blueprint", "pyctuator", )
-        app.json = IsoTimeJSONProvider(app)
 
         @app.before_request
         def intercept_requests_and_responses() -> None:
-            request_time = datetime.now()
+            trace_policy = self.pyctuator_impl.http_tracer.trace_policy
+            should_trace = trace_policy.should_trace_request(request.path)
+
+            request_time = time.time() if should_trace else 0
+            start = time.perf_counter()
 
             @after_this_request
             def after_response(response: Response) -> Response:
-                response_time = datetime.now()
+                duration = time.perf_counter() - start
 
-                # Set the SBA-V2 content type for responses from Pyctuator
-                if request.path.startswith(self.pyctuator_impl.pyctuator_endpoint_path_prefix):
+                # Set the SBA-V2 content type for responses from Pyctuator, except for metrics rendered for Prometheus
+                # and plain text responses
+                if request.path.startswith(self.pyctuator_impl.pyctuator_endpoint_path_prefix) \
+                        and response.headers.get("Content-Type") not in NON_SBA_CONTENT_TYPES:
                     response.headers["Content-Type"] = SBA_V2_CONTENT_TYPE
 
+                # Record the request's latency
+                self.pyctuator_impl.http_requests_metrics.record(
+                    request.method,
+                    request.url_rule.rule if request.url_rule else None,
+                    response.status_code,
+                    duration,
+                )
+
                 # Record the request and response
-                self.record_request_and_response(response, request_time, response_time)
+                if should_trace and trace_policy.should_trace_response(response.status_code):
+                    self.record_request_and_response(response, request_time, duration)
                 return response
 
+        def json_response(data: Any) -> Response:
+            return Response(dumps(data), headers={"Content-Type": SBA_V2_CONTENT_TYPE})
+
+        def cached_response(path: str) -> Response:
+            response = self.get_cached_response(path)
+            if is_etag_matched(request.headers.get("If-None-Match"), response.etag):
+                return Response(status=HTTPStatus.NOT_MODIFIED, headers={"ETag": response.etag})
+            return Response(response.body, headers={"Content-Type": SBA_V2_CONTENT_TYPE, "ETag": response.etag})
+
         @flask_blueprint.route("/")
         def get_endpoints() -> Any:
-            return jsonify(self.get_endpoints_data())
+            return cached_response("")
 
         if Endpoints.ENV not in disabled_endpoints:
             @flask_blueprint.route("/env")
             def get_environment() -> Any:
-                return jsonify(pyctuator_impl.get_environment())
+                return cached_response("/env")
 
         if Endpoints.INFO not in disabled_endpoints:
             @flask_blueprint.route("/info")
             def get_info() -> Any:
-                return jsonify(pyctuator_impl.get_app_info())
+                return cached_response("/info")
 
         if Endpoints.HEALTH not in disabled_endpoints:
             @flask_blueprint.route("/health")
             def get_health() -> Any:
                 health = pyctuator_impl.get_health()
-                return jsonify(health), health.http_status()
+                return json_response(health), health.http_status()
 
         if Endpoints.METRICS not in disabled_endpoints:
             @flask_blueprint.route("/metrics")
             def get_metric_names() -> Any:
-                return jsonify(pyctuator_impl.get_metric_names())
+                return cached_response("/metrics")
 
             @flask_blueprint.route("/metrics/<metric_name>")
             def get_metric_measurement(metric_name: str) -> Any:
-                return jsonify(pyctuator_impl.get_metric_measurement(metric_name))
+                try:
+                    return json_response(pyctuator_impl.get_metric_measurement(metric_name))
+                except KeyError as e:
+                    return e.args[0], HTTPStatus.NOT_FOUND
+
+            if pyctuator_impl.metrics_history:
+                @flask_blueprint.route("/metrics/<metric_name>/history")
+                def get_metric_history(metric_name: str) -> Any:
+                    points = _get_number_arg("points", int)
+                    try:
+                        return json_response(pyctuator_impl.get_metric_history(metric_name, points))
+                    except KeyError as e:
+                        return e.args[0], HTTPStatus.NOT_FOUND
 
         # Retrieving All Loggers
         if Endpoints.LOGGERS not in disabled_endpoints:
             @flask_blueprint.route("/loggers")
             def get_loggers() -> Any:
-                return jsonify(pyctuator_impl.logging.get_loggers())
+                return cached_response("/loggers")
 
             @flask_blueprint.route("/loggers/<logger_name>", methods=['POST'])
             def set_logger_level(logger_name: str) -> Dict:
                 request_dict = json.loads(request.data)
-                pyctuator_impl.logging.set_logger_level(logger_name, request_dict.get("configuredLevel", None))
+                pyctuator_impl.set_logger_level(logger_name, request_dict.get("configuredLevel", None))
                 return {}
 
             @flask_blueprint.route("/loggers/<logger_name>")
             def get_logger(logger_name: str) -> Any:
-                return jsonify(pyctuator_impl.logging.get_logger(logger_name))
+                return json_response(pyctuator_impl.logging.get_logger(logger_name))
 
         if Endpoints.THREAD_DUMP not in disabled_endpoints:
             @flask_blueprint.route("/threaddump")
             @flask_blueprint.route("/dump")
             def get_thread_dump() -> Any:
-                return jsonify(pyctuator_impl.get_thread_dump())
+                return Response(pyctuator_impl.stream_thread_dump(), content_type=SBA_V2_CONTENT_TYPE)
+
+            @flask_blueprint.route("/threaddump/hot")
+            def get_hot_threads() -> Any:
+                return json_response(pyctuator_impl.get_hot_threads(
+                    _get_number_arg("interval", float),
+                    _get_number_arg("limit", int),
+                ))
+
+        if Endpoints.PROFILE not in disabled_endpoints:
+            @flask_blueprint.route("/profile")
+            def get_profile() -> Any:
+                profile_format = request.args.get("format", "folded")
+                if profile_format not in PROFILE_FORMATS:
+                    return f"Unknown profile format {profile_format}", HTTPStatus.BAD_REQUEST
+
+                profile = pyctuator_impl.profiler.start_profile(
+                    _get_number_arg("seconds", float),
+                    _get_number_arg("hz", float),
+                )
+                if not profile:
+                    return "Too many profiles are being taken", HTTPStatus.TOO_MANY_REQUESTS
+                return Response(
+                    render_profile(profile.result(), profile_format),
+                    content_type=PLAIN_TEXT_CONTENT_TYPE if profile_format == "folded" else SBA_V2_CONTENT_TYPE,
+                )
+
+        if Endpoints.TRACEMALLOC not in disabled_endpoints:
+            @flask_blueprint.route("/tracemalloc")
+            def get_tracemalloc_status() -> Any:
+                return json_response(pyctuator_impl.allocation_tracer.get_status())
+
+            @flask_blueprint.route("/tracemalloc/start", methods=["POST"])
+            def start_tracemalloc() -> Any:
+                return json_response(pyctuator_impl.start_tracemalloc(_get_number_arg("frames", int)))
+
+            @flask_blueprint.route("/tracemalloc/stop", methods=["POST"])
+            def stop_tracemalloc() -> Any:
+                return json_response(pyctuator_impl.stop_tracemalloc())
+
+            @flask_blueprint.route("/tracemalloc/snapshots", methods=["POST"])
+            def take_tracemalloc_snapshot() -> Any:
+                snapshot_id = pyctuator_impl.allocation_tracer.take_snapshot()
+                if snapshot_id is None:
+                    return "tracemalloc isn't tracing", HTTPStatus.CONFLICT
+                return json_response({"id": snapshot_id})
+
+            @flask_blueprint.route("/tracemalloc/allocations")
+            def get_allocations() -> Any:
+                try:
+                    allocations = pyctuator_impl.allocation_tracer.get_allocations(
+                        request.args.get("group_by", "lineno"),
+                        _get_number_arg("limit", int),
+                        _get_number_arg("snapshot", int),
+                    )
+                except ValueError as e:
+                    return str(e), HTTPStatus.BAD_REQUEST
+                if allocations is None:
+                    return "tracemalloc isn't tracing", HTTPStatus.CONFLICT
+                return json_response(allocations)
 
         if Endpoints.LOGFILE not in disabled_endpoints:
+            def partial_logfile_response(logfile_bytes: bytes, start: int, end: int) -> Tuple[Response, int]:
+                resp: Response = make_response(logfile_bytes)
+                resp.headers["Content-Type"] = "text/html; charset=UTF-8"
+                resp.headers["Accept-Ranges"] = "bytes"
+                resp.headers["Content-Range"] = f"bytes {start}-{end}/{end}"
+
+                return resp, HTTPStatus.PARTIAL_CONTENT
+
             @flask_blueprint.route("/logfile")
             def get_logfile() -> Tuple[Response, int]:
                 range_header = request.environ.get('HTTP_RANGE')
                 if not range_header:
-                    response: Response = make_response(pyctuator_impl.logfile.log_messages.get_range())
+                    response: Response = make_response(pyctuator_impl.logfile.get_tail())
                     return response, HTTPStatus.OK
 
-                str_res, start, end = pyctuator_impl.logfile.get_logfile(range_header)
+                return partial_logfile_response(*pyctuator_impl.logfile.get_logfile(range_header))
 
-                resp: Response = make_response(str_res)
-                resp.headers["Content-Type"] = "text/html; charset=UTF-8"
-                resp.headers["Accept-Ranges"] = "bytes"
-                resp.headers["Content-Range"] = f"bytes {start}-{end}/{end}"
+            @flask_blueprint.route("/logfile/search")
+            def search_logfile() -> Any:
+                try:
+                    return json_response(pyctuator_impl.logfile.search(LogSearchQuery.parse(request.args)))
+                except ValueError as e:
+                    return str(e), HTTPStatus.BAD_REQUEST
 
-                return resp, HTTPStatus.PARTIAL_CONTENT
+            @flask_blueprint.route("/logfile/tail")
+            def tail_logfile() -> Tuple[Response, int]:
+                return partial_logfile_response(*pyctuator_impl.logfile.tail_log(
+                    _get_number_arg("offset", int),
+                    _get_number_arg("timeout", float),
+                ))
 
         if Endpoints.HTTP_TRACE not in disabled_endpoints:
             @flask_blueprint.route("/trace")
             @flask_blueprint.route("/httptrace")
             def get_httptrace() -> Any:
-                return jsonify(pyctuator_impl.http_tracer.get_httptrace())
+                return Response(pyctuator_impl.stream_httptrace(), content_type=SBA_V2_CONTENT_TYPE)
 
-        app.register_blueprint(flask_blueprint, url_prefix=path_prefix)
+        if Endpoints.PROMETHEUS not in disabled_endpoints:
+            @flask_blueprint.route("/prometheus")
+            def get_prometheus_metrics() -> Any:
+                return Response(pyctuator_impl.get_prometheus_metrics(), content_type=PROMETHEUS_CONTENT_TYPE)
 
-    def _create_headers_dictionary_flask(self, headers: Headers) -> Mapping[str, List[str]]:
-        headers_dict: Mapping[str, List[str]] = defaultdict(list)
-        for (key, value) in headers.items():
-            headers_dict[key].append(value)
-        return dict(headers_dict)
+        app.register_blueprint(flask_blueprint, url_prefix=path_prefix)
 
     def record_request_and_response(
             self,
             response: Response,
-            request_time: datetime,
-            response_time: datetime,
+            request_time: float,
+            duration: float,
     ) -> None:
-        new_record = TraceRecord(
+        self.pyctuator_impl.http_tracer.record(
             request_time,
-            None,
-            None,
-            TraceRequest(request.method, str(request.url), self._create_headers_dictionary_flask(request.headers)),
-            TraceResponse(response.status_code, self._create_headers_dictionary_flask(response.headers)),
-            int((response_time.timestamp() - request_time.timestamp()) * 1000),
+            request.method,
+            str(request.url),
+            list(request.headers.items()),
+            response.status_code,
+            list(response.headers.items()),
+            int(duration * 1000),
         )
-        self.pyctuator_impl.http_tracer.add_record(record=new_record)
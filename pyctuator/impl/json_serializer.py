@@ -0,0 +1,90 @@
+# pylint: disable=import-outside-toplevel
+import dataclasses
+import importlib.util
+import json
+from datetime import date, datetime, time
+from enum import Enum
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Tuple
+
+# The number of items serialized into each chunk of a streamed list (see `stream_list`)
+ITEMS_PER_CHUNK = 100
+
+# The names of the fields serialized for each dataclass, fields whose names start with an underscore aren't serialized
+_dataclass_field_names: Dict[type, Tuple[str, ...]] = {}
+
+
+def _get_field_names(dataclass_type: type) -> Tuple[str, ...]:
+    field_names = _dataclass_field_names.get(dataclass_type)
+    if field_names is None:
+        field_names = tuple(
+            field.name for field in dataclasses.fields(dataclass_type) if not field.name.startswith("_")
+        )
+        _dataclass_field_names[dataclass_type] = field_names
+    return field_names
+
+
+def _default(value: Any) -> Any:
+    """Converts values that aren't natively serializable to values that are, the nested values are converted as they're
+    serialized so nothing is copied deeply. Raises a TypeError for values that can't be converted, as
+    `json.JSONEncoder.default` does"""
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return {name: getattr(value, name) for name in _get_field_names(type(value))}
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+_stdlib_encoder = json.JSONEncoder(default=_default, ensure_ascii=False, check_circular=False, separators=(",", ":"))
+
+
+def _stdlib_dumps(value: Any) -> bytes:
+    return _stdlib_encoder.encode(value).encode("utf-8")
+
+
+if importlib.util.find_spec("orjson"):
+    # orjson is optional and must only be imported if it is installed
+    import orjson
+
+    def _orjson_dumps(value: Any) -> bytes:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+    _dumps = _orjson_dumps
+else:
+    _dumps = _stdlib_dumps
+
+
+def dumps(value: Any) -> bytes:
+    """Serializes a value, typically a dataclass, to UTF-8 encoded JSON, using orjson if it's installed.
+
+    Dataclasses are serialized field by field rather than being converted to dictionaries first (see
+    `dataclasses.asdict`), omitting fields whose names start with an underscore as orjson does. Dates and times are
+    serialized in ISO format.
+    """
+    return _dumps(value)
+
+
+def stream_list(name: str, items: Iterable[Any], items_per_chunk: int = ITEMS_PER_CHUNK) -> Iterator[bytes]:
+    """Serializes an object whose only field is a list of items (e.g. the threads of a thread dump) to JSON in chunks of
+    items, so large lists are streamed rather than serialized at once.
+
+    The items are pulled from the iterable only as the chunks are consumed, so when the items are produced by a
+    generator, only a single chunk of them is ever held in memory.
+    """
+    yield b"{" + dumps(name) + b":["
+    chunk: List[bytes] = []
+    is_first_chunk = True
+    for item in items:
+        chunk.append(dumps(item))
+        if len(chunk) == items_per_chunk:
+            yield (b"" if is_first_chunk else b",") + b",".join(chunk)
+            chunk.clear()
+            is_first_chunk = False
+    if chunk:
+        yield (b"" if is_first_chunk else b",") + b",".join(chunk)
+    yield b"]}"
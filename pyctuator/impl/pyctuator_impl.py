@@ -1,18 +1,30 @@
+import asyncio
 import dataclasses
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Dict, Mapping, Optional, Callable
+from typing import List, Dict, Iterator, Mapping, Optional, Callable, Tuple
 from urllib.parse import urlparse
 
 from pyctuator.endpoints import Endpoints
+from pyctuator.environment.environment_cache import EnvironmentCache
 from pyctuator.environment.environment_provider import EnvironmentData, EnvironmentProvider
 from pyctuator.environment.scrubber import SecretScrubber
+from pyctuator.health.health_checker import HealthChecker
 from pyctuator.health.health_provider import HealthStatus, HealthSummary, Status, HealthProvider
 from pyctuator.httptrace.http_tracer import HttpTracer
+from pyctuator.httptrace.trace_policy import TracePolicy
+from pyctuator.impl.json_serializer import stream_list
+from pyctuator.impl.response_cache import ResponseCache
 from pyctuator.logfile.logfile import PyctuatorLogfile  # type: ignore
 from pyctuator.logging.pyctuator_logging import PyctuatorLogging
+from pyctuator.memory.allocation_tracer import AllocationTracer, TracemallocStatus
+from pyctuator.metrics.http_requests_metrics_impl import HttpRequestsMetricsProvider
+from pyctuator.metrics.metrics_history import MetricsHistory, MetricHistory
 from pyctuator.metrics.metrics_provider import Metric, MetricNames, MetricsProvider
-from pyctuator.threads.thread_dump_provider import ThreadDump, ThreadDumpProvider
+from pyctuator.metrics.prometheus_exposition import render_prometheus_metrics
+from pyctuator.threads.sampling_profiler import SamplingProfiler
+from pyctuator.threads.task_dump_provider import TaskDumpProvider
+from pyctuator.threads.thread_dump_provider import HotThreads, ThreadDump, ThreadDumpProvider
 
 
 @dataclass
@@ -50,7 +62,7 @@ class AppInfo:
 
 
 class PyctuatorImpl:
-    # pylint: disable=too-many-instance-attributes
+    # pylint: disable=too-many-instance-attributes,too-many-locals,too-many-public-methods
     def __init__(
             self,
             app_info: AppInfo,
@@ -58,20 +70,43 @@ class PyctuatorImpl:
             logfile_max_size: int,
             logfile_formatter: str,
             additional_app_info: Optional[dict],
-            disabled_endpoints: Endpoints
+            disabled_endpoints: Endpoints,
+            health_checker: Optional[HealthChecker] = None,
+            trace_policy: Optional[TracePolicy] = None,
+            httptrace_capacity: int = 100,
+            metrics_history_interval_sec: Optional[float] = None,
+            metrics_history_size: int = 360,
+            logfile_queue_size: int = 0,
+            logfile_path: Optional[str] = None,
+            thread_dump_max_depth: Optional[int] = None,
+            max_concurrent_profiles: int = 1,
     ):
         self.app_info = app_info
         self.pyctuator_endpoint_url = pyctuator_endpoint_url
         self.additional_app_info = additional_app_info
         self.disabled_endpoints = disabled_endpoints
+        self.response_cache = ResponseCache()
+        self.health_checker = health_checker or HealthChecker()
 
         self.metrics_providers: List[MetricsProvider] = []
+        self._metrics_index: Optional[Dict[str, MetricsProvider]] = None
+        self._metric_names: Optional[MetricNames] = None
         self.health_providers: List[HealthProvider] = []
         self.environment_providers: List[EnvironmentProvider] = []
+        self.environment_cache = EnvironmentCache()
         self.logging = PyctuatorLogging()
-        self.thread_dump_provider = ThreadDumpProvider()
-        self.logfile = PyctuatorLogfile(max_size=logfile_max_size, formatter=logfile_formatter)
-        self.http_tracer = HttpTracer()
+        self.thread_dump_provider = ThreadDumpProvider(thread_dump_max_depth)
+        self.task_dump_provider = TaskDumpProvider(self.thread_dump_provider)
+        self.profiler = SamplingProfiler(self.thread_dump_provider, max_concurrent_profiles)
+        self.allocation_tracer = AllocationTracer()
+        self.logfile = PyctuatorLogfile(
+            max_size=logfile_max_size, formatter=logfile_formatter, queue_size=logfile_queue_size, path=logfile_path
+        )
+        self.http_tracer = HttpTracer(trace_policy, httptrace_capacity)
+        self.http_requests_metrics = HttpRequestsMetricsProvider()
+        self.metrics_history = MetricsHistory(
+            self.metrics_providers, metrics_history_interval_sec, metrics_history_size
+        ) if metrics_history_interval_sec else None
 
         self.secret_scrubber: Callable[[Dict], Dict] = SecretScrubber().scrub_secrets
 
@@ -82,36 +117,47 @@ class PyctuatorImpl:
 
     def register_metrics_provider(self, provider: MetricsProvider) -> None:
         self.metrics_providers.append(provider)
+        self.invalidate_metrics_index()
+
+    def invalidate_metrics_index(self) -> None:
+        """Should be called when the names of the metrics supported by a registered provider are changed, so the metric
+        names are collected from the providers again"""
+        self._metrics_index = None
+        self._metric_names = None
+        self.response_cache.invalidate("/metrics")
 
     def register_health_providers(self, provider: HealthProvider) -> None:
         self.health_providers.append(provider)
 
     def register_environment_provider(self, provider: EnvironmentProvider) -> None:
         self.environment_providers.append(provider)
+        self.response_cache.invalidate("/env")
 
     def set_secret_scrubber(self, secret_scrubber: Callable[[Dict], Dict]) -> None:
         self.secret_scrubber = secret_scrubber
+        self.response_cache.invalidate("/env")
 
     def get_environment(self) -> EnvironmentData:
-        active_profiles: List[str] = []
-        env_data = EnvironmentData(
-            active_profiles,
-            [source.get_properties_source(self.secret_scrubber) for source in self.environment_providers]
-        )
-        return env_data
+        return self.get_environment_with_etag()[0]
+
+    def get_environment_with_etag(self) -> Tuple[EnvironmentData, str]:
+        """Returns the environment and its ETag, which only changes when the environment does"""
+        return self.environment_cache.get_environment(self.environment_providers, self.secret_scrubber)
 
     def set_git_info(self, git_info: GitInfo) -> None:
         self.app_info.git = git_info
+        self.response_cache.invalidate("/info")
 
     def set_build_info(self, build_info: BuildInfo) -> None:
         self.app_info.build = build_info
+        self.response_cache.invalidate("/info")
+
+    def set_logger_level(self, logger_name: str, logger_level: Optional[str]) -> None:
+        self.logging.set_logger_level(logger_name, logger_level)
+        self.response_cache.invalidate("/loggers")
 
     def get_health(self) -> HealthSummary:
-        health_statuses: Mapping[str, HealthStatus] = {
-            provider.get_name(): provider.get_health()
-            for provider in self.health_providers
-            if provider.is_supported()
-        }
+        health_statuses: Mapping[str, HealthStatus] = self.health_checker.check(self.health_providers)
 
         # Health is UP if no provider is registered
         if not health_statuses:
@@ -131,21 +177,64 @@ class PyctuatorImpl:
         return HealthSummary(Status.UNKNOWN, health_statuses)
 
     def get_metric_names(self) -> MetricNames:
-        metric_names = []
-        for provider in self.metrics_providers:
-            for metric_name in provider.get_supported_metric_names():
-                metric_names.append(metric_name)
-        return MetricNames(metric_names)
+        metric_names = self._metric_names
+        if metric_names is None:
+            metric_names = self._metric_names = MetricNames(list(self._get_metrics_index().keys()))
+        return metric_names
 
     def get_metric_measurement(self, metric_name: str) -> Metric:
-        for provider in self.metrics_providers:
-            if metric_name.startswith(provider.get_prefix()):
-                return provider.get_metric(metric_name)
-        raise KeyError(f"Unknown metric {metric_name}")
+        provider = self._get_metrics_index().get(metric_name)
+        if provider is None:
+            raise KeyError(f"Unknown metric {metric_name}")
+        return provider.get_metric(metric_name)
+
+    def get_metric_history(self, metric_name: str, points: Optional[int] = None) -> MetricHistory:
+        if not self.metrics_history:
+            raise KeyError("Metrics history is disabled")
+        return self.metrics_history.get_history(metric_name, points)
+
+    def _get_metrics_index(self) -> Dict[str, MetricsProvider]:
+        """Returns the provider of each of the supported metrics, built once and kept until invalidated"""
+        metrics_index = self._metrics_index
+        if metrics_index is None:
+            metrics_index = {}
+            for provider in self.metrics_providers:
+                for metric_name in provider.get_supported_metric_names():
+                    metrics_index.setdefault(metric_name, provider)
+            self._metrics_index = metrics_index
+        return metrics_index
+
+    def get_prometheus_metrics(self) -> Iterator[str]:
+        return render_prometheus_metrics(self.metrics_providers)
 
     def get_thread_dump(self) -> ThreadDump:
         return self.thread_dump_provider.get_thread_dump()
 
+    def stream_thread_dump(self) -> Iterator[bytes]:
+        """Streams the thread dump as JSON chunks. The threads' stack traces are all extracted when this is called, so
+        the dump is a snapshot no matter how long streaming it takes, and only its serialization is streamed"""
+        return stream_list("threads", self.thread_dump_provider.get_thread_dump().threads)
+
+    def stream_httptrace(self) -> Iterator[bytes]:
+        """Streams the recorded HTTP traces as JSON chunks, reading the traces from the buffer as they're serialized"""
+        return stream_list("traces", self.http_tracer.iter_traces())
+
+    def get_hot_threads(self, interval: Optional[float] = None, limit: Optional[int] = None) -> HotThreads:
+        return self.thread_dump_provider.get_hot_threads(interval, limit)
+
+    async def get_hot_threads_async(self, interval: Optional[float] = None, limit: Optional[int] = None) -> HotThreads:
+        return await self.thread_dump_provider.get_hot_threads_async(interval, limit)
+
+    def start_tracemalloc(self, traceback_frames: Optional[int] = None) -> TracemallocStatus:
+        return self.allocation_tracer.start(traceback_frames)
+
+    def stop_tracemalloc(self) -> TracemallocStatus:
+        return self.allocation_tracer.stop()
+
+    def get_task_dump(self) -> Iterator[bytes]:
+        """Streams the dump of the running event loop's tasks as JSON chunks, must be consumed by the loop's thread"""
+        return stream_list("tasks", self.task_dump_provider.iter_tasks(asyncio.get_running_loop()))
+
     def get_app_info(self) -> Dict:
         app_info_dict = {k: v for (k, v) in dataclasses.asdict(self.app_info).items() if v}
 
@@ -4,6 +4,7 @@ from typing import Any, Optional, Mapping
 
 from pyctuator.endpoints import Endpoints
 from pyctuator.impl.pyctuator_impl import PyctuatorImpl
+from pyctuator.impl.response_cache import CachedResponse
 
 
 @dataclass
@@ -12,11 +13,6 @@ class LinkHref:
     templated: bool
 
 
-@dataclass
-class EndpointsData:
-    _links: Mapping[str, LinkHref]
-
-
 class PyctuatorRouter(ABC):
 
     def __init__(
@@ -27,8 +23,29 @@ class PyctuatorRouter(ABC):
         self.app = app
         self.pyctuator_impl = pyctuator_impl
 
-    def get_endpoints_data(self) -> EndpointsData:
-        return EndpointsData(self.get_endpoints_links())
+    def get_cached_response(self, path: str) -> CachedResponse:
+        """Returns the serialized response of one of the read-mostly endpoints - the endpoints' links (""), /env, /info,
+        /loggers and /metrics, which is only serialized again once its data changes"""
+        pyctuator_impl = self.pyctuator_impl
+        response_cache = pyctuator_impl.response_cache
+
+        if path == "/env":
+            # The environment may change at any time, it's serialized again whenever its ETag changes
+            environment, environment_etag = pyctuator_impl.get_environment_with_etag()
+            return response_cache.get_response(path, lambda: environment, environment_etag)
+
+        if path == "/loggers":
+            return response_cache.get_response(
+                path, pyctuator_impl.logging.get_loggers, pyctuator_impl.logging.get_loggers_version()
+            )
+
+        builders = {
+            # A dictionary rather than a dataclass, as the serializer omits fields starting with an underscore
+            "": lambda: {"_links": self.get_endpoints_links()},
+            "/info": pyctuator_impl.get_app_info,
+            "/metrics": pyctuator_impl.get_metric_names,
+        }
+        return response_cache.get_response(path, builders[path])
 
     def get_endpoints_links(self) -> Mapping[str, LinkHref]:
         def link_href(endpoint: Endpoints, path: str) -> Optional[LinkHref]:
@@ -46,6 +63,7 @@ class PyctuatorRouter(ABC):
             "threaddump": link_href(Endpoints.THREAD_DUMP, "/threaddump"),
             "logfile": link_href(Endpoints.LOGFILE, "/logfile"),
             "httptrace": link_href(Endpoints.HTTP_TRACE, "/httptrace"),
+            "prometheus": link_href(Endpoints.PROMETHEUS, "/prometheus"),
         }
 
         return {endpoint: link_href for (endpoint, link_href) in endpoints.items() if link_href is not None}
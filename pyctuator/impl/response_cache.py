@@ -0,0 +1,56 @@
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from pyctuator.impl.json_serializer import dumps
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+
+
+class ResponseCache:
+    """Caches the serialized responses of read-mostly endpoints (e.g. /info), each with an ETag derived from its body.
+
+    A response is cached per path, and is serialized again only after the path is invalidated (see `invalidate`) or
+    when the version of the response, if it has one, changes. A version is some cheap fingerprint of the response's
+    data, for data that may change without pyctuator being aware of it.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._responses: Dict[str, Tuple[Hashable, CachedResponse]] = {}
+        self._generations: Dict[str, int] = {}
+
+    def get_response(
+            self,
+            path: str,
+            build: Callable[[], Any],
+            version: Hashable = None,
+    ) -> CachedResponse:
+        """Returns the cached response of the path, if it has the given version, otherwise serializes the data returned
+        by build and caches it"""
+        with self._lock:
+            cached = self._responses.get(path)
+            generation = self._generations.get(path, 0)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        body = dumps(build())
+        response = CachedResponse(body, f"\"{hashlib.blake2b(body, digest_size=16).hexdigest()}\"")
+
+        with self._lock:
+            # A response built from data that has been changed since it was read mustn't be cached
+            if self._generations.get(path, 0) == generation:
+                self._responses[path] = (version, response)
+        return response
+
+    def invalidate(self, *paths: str) -> None:
+        """Drops the cached responses of the paths, should be called whenever the data of their responses changes"""
+        with self._lock:
+            for path in paths:
+                self._responses.pop(path, None)
+                self._generations[path] = self._generations.get(path, 0) + 1
@@ -1,91 +1,127 @@
-import dataclasses
+import asyncio
 import json
-from datetime import datetime, timedelta
-from functools import partial
+import time
 from http import HTTPStatus
-from typing import Any, Optional, Callable, Mapping, List
+from typing import Callable, Optional, Dict, Iterator, List, Pattern, Tuple, TypeVar
 
 from tornado.httputil import HTTPHeaders
-from tornado.web import Application, RequestHandler
+from tornado.ioloop import IOLoop
+from tornado.iostream import StreamClosedError
+from tornado.routing import PathMatches, RuleRouter
+from tornado.web import Application, HTTPError, RequestHandler
 
 from pyctuator.endpoints import Endpoints
-from pyctuator.httptrace import TraceRecord, TraceRequest, TraceResponse
-from pyctuator.impl import SBA_V2_CONTENT_TYPE
+from pyctuator.impl import SBA_V2_CONTENT_TYPE, PROMETHEUS_CONTENT_TYPE, EVENT_STREAM_CONTENT_TYPE, \
+    PLAIN_TEXT_CONTENT_TYPE
+from pyctuator.impl.json_serializer import dumps
 from pyctuator.impl.pyctuator_impl import PyctuatorImpl
 from pyctuator.impl.pyctuator_router import PyctuatorRouter
+from pyctuator.logfile.log_search import LogSearchQuery
+from pyctuator.threads.sampling_profiler import PROFILE_FORMATS, render_profile
+
+N = TypeVar("N", int, float)
 
 
 # pylint: disable=abstract-method
 class AbstractPyctuatorHandler(RequestHandler):
     pyctuator_router: Optional[PyctuatorRouter] = None
-    dumps: Optional[Callable[[Any], str]] = None
 
     def initialize(self) -> None:
         self.pyctuator_router = self.application.settings.get("pyctuator_router")
-        self.dumps = self.application.settings.get("custom_dumps")
         self.set_header("Content-Type", SBA_V2_CONTENT_TYPE)
 
     def options(self) -> None:
         assert self.pyctuator_router is not None
-        assert self.dumps is not None
         self.write("")
 
+    def get_number_argument(self, name: str, parse: Callable[[str], N], default: Optional[str] = None) -> Optional[N]:
+        """Parses an optional numeric query argument, responding with 400 Bad Request if it's malformed"""
+        value = self.get_query_argument(name, default)
+        if not value:
+            return None
+        try:
+            return parse(value)
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST.value, reason=f"Invalid {name}") from e
+
+    def write_cached_response(self, path: str) -> None:
+        assert self.pyctuator_router is not None
+        response = self.pyctuator_router.get_cached_response(path)
+        self.set_header("ETag", response.etag)
+        if self.check_etag_header():
+            self.set_status(HTTPStatus.NOT_MODIFIED)
+            return
+        self.write(response.body)
+
+    async def write_streamed_response(self, chunks: Iterator[bytes]) -> None:
+        for chunk in chunks:
+            self.write(chunk)
+            await self.flush()
+
 
 class PyctuatorHandler(AbstractPyctuatorHandler):
     def get(self) -> None:
-        assert self.pyctuator_router is not None
-        assert self.dumps is not None
-        self.write(self.dumps(self.pyctuator_router.get_endpoints_data()))
+        self.write_cached_response("")
 
 
 # GET /env
 class EnvHandler(AbstractPyctuatorHandler):
     def get(self) -> None:
-        assert self.pyctuator_router is not None
-        assert self.dumps is not None
-        self.write(self.dumps(self.pyctuator_router.pyctuator_impl.get_environment()))
+        self.write_cached_response("/env")
 
 
 # GET /info
 class InfoHandler(AbstractPyctuatorHandler):
     def get(self) -> None:
-        assert self.pyctuator_router is not None
-        assert self.dumps is not None
-        self.write(self.dumps(self.pyctuator_router.pyctuator_impl.get_app_info()))
+        self.write_cached_response("/info")
 
 
 # GET /health
 class HealthHandler(AbstractPyctuatorHandler):
     def get(self) -> None:
         assert self.pyctuator_router is not None
-        assert self.dumps is not None
         health = self.pyctuator_router.pyctuator_impl.get_health()
         self.set_status(health.http_status())
-        self.write(self.dumps(health))
+        self.write(dumps(health))
 
 
 # GET /metrics
 class MetricsHandler(AbstractPyctuatorHandler):
     def get(self) -> None:
-        assert self.pyctuator_router is not None
-        assert self.dumps is not None
-        self.write(self.dumps(self.pyctuator_router.pyctuator_impl.get_metric_names()))
+        self.write_cached_response("/metrics")
 
 
 # GET "/metrics/{metric_name}"
 class MetricsNameHandler(AbstractPyctuatorHandler):
     def get(self, metric_name: str) -> None:
         assert self.pyctuator_router is not None
-        assert self.dumps is not None
-        self.write(self.dumps(self.pyctuator_router.pyctuator_impl.get_metric_measurement(metric_name)))
+        try:
+            metric = self.pyctuator_router.pyctuator_impl.get_metric_measurement(metric_name)
+        except KeyError as e:
+            self.set_status(HTTPStatus.NOT_FOUND.value)
+            self.write(e.args[0])
+            return
+        self.write(dumps(metric))
+
+
+# GET "/metrics/{metric_name}/history"
+class MetricsHistoryHandler(AbstractPyctuatorHandler):
+    def get(self, metric_name: str) -> None:
+        assert self.pyctuator_router is not None
+        points = self.get_number_argument("points", int)
+        try:
+            history = self.pyctuator_router.pyctuator_impl.get_metric_history(metric_name, points)
+        except KeyError as e:
+            self.set_status(HTTPStatus.NOT_FOUND.value)
+            self.write(e.args[0])
+            return
+        self.write(dumps(history))
 
 
 # GET /loggers
 class LoggersHandler(AbstractPyctuatorHandler):
     def get(self) -> None:
-        assert self.pyctuator_router is not None
-        assert self.dumps is not None
-        self.write(self.dumps(self.pyctuator_router.pyctuator_impl.logging.get_loggers()))
+        self.write_cached_response("/loggers")
 
 
 # GET /loggers/{logger_name}
@@ -93,64 +129,212 @@ class LoggersHandler(AbstractPyctuatorHandler):
 class LoggersNameHandler(AbstractPyctuatorHandler):
     def get(self, logger_name: str) -> None:
         assert self.pyctuator_router is not None
-        assert self.dumps is not None
-        self.write(self.dumps(self.pyctuator_router.pyctuator_impl.logging.get_logger(logger_name)))
+        self.write(dumps(self.pyctuator_router.pyctuator_impl.logging.get_logger(logger_name)))
 
     def post(self, logger_name: str) -> None:
         assert self.pyctuator_router is not None
-        assert self.dumps is not None
         body_str = self.request.body.decode("utf-8")
         body = json.loads(body_str)
-        self.pyctuator_router.pyctuator_impl.logging.set_logger_level(logger_name, body.get("configuredLevel", None))
+        self.pyctuator_router.pyctuator_impl.set_logger_level(logger_name, body.get("configuredLevel", None))
         self.write("")
 
 
 # GET /threaddump
 class ThreadDumpHandler(AbstractPyctuatorHandler):
+    async def get(self) -> None:
+        assert self.pyctuator_router is not None
+        await self.write_streamed_response(self.pyctuator_router.pyctuator_impl.stream_thread_dump())
+
+
+# GET /threaddump/hot
+class HotThreadsHandler(AbstractPyctuatorHandler):
+    async def get(self) -> None:
+        assert self.pyctuator_router is not None
+        self.write(dumps(await self.pyctuator_router.pyctuator_impl.get_hot_threads_async(
+            self.get_number_argument("interval", float),
+            self.get_number_argument("limit", int),
+        )))
+
+
+# GET /taskdump
+class TaskDumpHandler(AbstractPyctuatorHandler):
+    async def get(self) -> None:
+        assert self.pyctuator_router is not None
+        await self.write_streamed_response(self.pyctuator_router.pyctuator_impl.get_task_dump())
+
+
+# GET /profile
+class ProfileHandler(AbstractPyctuatorHandler):
+    async def get(self) -> None:
+        assert self.pyctuator_router is not None
+        seconds = self.get_number_argument("seconds", float)
+        hz = self.get_number_argument("hz", float)
+        profile_format = self.get_query_argument("format", "folded")
+        if profile_format not in PROFILE_FORMATS:
+            self.set_status(HTTPStatus.BAD_REQUEST.value)
+            self.write(f"Unknown profile format {profile_format}")
+            return
+
+        profile = self.pyctuator_router.pyctuator_impl.profiler.start_profile(seconds, hz)
+        if not profile:
+            self.set_status(HTTPStatus.TOO_MANY_REQUESTS.value)
+            self.write("Too many profiles are being taken")
+            return
+        if profile_format == "folded":
+            self.set_header("Content-Type", PLAIN_TEXT_CONTENT_TYPE)
+        self.write(render_profile(await asyncio.wrap_future(profile), profile_format))
+
+
+# GET /tracemalloc
+class TracemallocStatusHandler(AbstractPyctuatorHandler):
     def get(self) -> None:
         assert self.pyctuator_router is not None
-        assert self.dumps is not None
-        self.write(self.dumps(self.pyctuator_router.pyctuator_impl.get_thread_dump()))
+        self.write(dumps(self.pyctuator_router.pyctuator_impl.allocation_tracer.get_status()))
+
+
+# POST /tracemalloc/start
+class TracemallocStartHandler(AbstractPyctuatorHandler):
+    def post(self) -> None:
+        assert self.pyctuator_router is not None
+        frames = self.get_number_argument("frames", int)
+        self.write(dumps(self.pyctuator_router.pyctuator_impl.start_tracemalloc(frames)))
+
+
+# POST /tracemalloc/stop
+class TracemallocStopHandler(AbstractPyctuatorHandler):
+    def post(self) -> None:
+        assert self.pyctuator_router is not None
+        self.write(dumps(self.pyctuator_router.pyctuator_impl.stop_tracemalloc()))
+
+
+# POST /tracemalloc/snapshots
+class TracemallocSnapshotsHandler(AbstractPyctuatorHandler):
+    async def post(self) -> None:
+        assert self.pyctuator_router is not None
+        # Taking and comparing snapshots of large heaps may take seconds, so it's done off the IO loop
+        snapshot_id = await IOLoop.current().run_in_executor(
+            None, self.pyctuator_router.pyctuator_impl.allocation_tracer.take_snapshot
+        )
+        if snapshot_id is None:
+            self.set_status(HTTPStatus.CONFLICT.value)
+            self.write("tracemalloc isn't tracing")
+            return
+        self.write(dumps({"id": snapshot_id}))
+
+
+# GET /tracemalloc/allocations
+class AllocationsHandler(AbstractPyctuatorHandler):
+    async def get(self) -> None:
+        assert self.pyctuator_router is not None
+        limit = self.get_number_argument("limit", int)
+        snapshot = self.get_number_argument("snapshot", int)
+        try:
+            allocations = await IOLoop.current().run_in_executor(
+                None,
+                self.pyctuator_router.pyctuator_impl.allocation_tracer.get_allocations,
+                self.get_query_argument("group_by", "lineno"),
+                limit,
+                snapshot,
+            )
+        except ValueError as e:
+            self.set_status(HTTPStatus.BAD_REQUEST.value)
+            self.write(str(e))
+            return
+        if allocations is None:
+            self.set_status(HTTPStatus.CONFLICT.value)
+            self.write("tracemalloc isn't tracing")
+            return
+        self.write(dumps(allocations))
+
+
+class AbstractLogFileHandler(AbstractPyctuatorHandler):
+    def write_partial_logfile(self, logfile_bytes: bytes, start: int, end: int) -> None:
+        self.set_status(HTTPStatus.PARTIAL_CONTENT.value)
+        self.add_header("Content-Type", "text/html; charset=UTF-8")
+        self.add_header("Accept-Ranges", "bytes")
+        self.add_header("Content-Range", f"bytes {start}-{end}/{end}")
+        self.write(logfile_bytes)
 
 
 # GET /logfile
-class LogFileHandler(AbstractPyctuatorHandler):
+class LogFileHandler(AbstractLogFileHandler):
     def get(self) -> None:
         assert self.pyctuator_router is not None
-        assert self.dumps is not None
 
         range_header = self.request.headers.get("range")
         if not range_header:
-            self.write(f"{self.pyctuator_router.pyctuator_impl.logfile.log_messages.get_range()}")
+            self.write(self.pyctuator_router.pyctuator_impl.logfile.get_tail())
 
         else:
-            str_res, start, end = self.pyctuator_router.pyctuator_impl.logfile.get_logfile(range_header)
-            self.set_status(HTTPStatus.PARTIAL_CONTENT.value)
-            self.add_header("Content-Type", "text/html; charset=UTF-8")
-            self.add_header("Accept-Ranges", "bytes")
-            self.add_header("Content-Range", f"bytes {start}-{end}/{end}")
-            self.write(str_res)
+            self.write_partial_logfile(*self.pyctuator_router.pyctuator_impl.logfile.get_logfile(range_header))
+
+
+# GET /logfile/search
+class LogFileSearchHandler(AbstractPyctuatorHandler):
+    def get(self) -> None:
+        assert self.pyctuator_router is not None
+        try:
+            query = LogSearchQuery.parse({name: self.get_query_argument(name) for name in self.request.query_arguments})
+            result = self.pyctuator_router.pyctuator_impl.logfile.search(query)
+        except ValueError as e:
+            self.set_status(HTTPStatus.BAD_REQUEST.value)
+            self.write(str(e))
+            return
+        self.write(dumps(result))
+
+
+# GET /logfile/tail
+class LogFileTailHandler(AbstractLogFileHandler):
+    async def get(self) -> None:
+        assert self.pyctuator_router is not None
+        self.write_partial_logfile(*await self.pyctuator_router.pyctuator_impl.logfile.tail_log_async(
+            self.get_number_argument("offset", int),
+            self.get_number_argument("timeout", float),
+        ))
+
+
+# GET /logfile/stream
+class LogFileStreamHandler(AbstractPyctuatorHandler):
+    async def get(self) -> None:
+        assert self.pyctuator_router is not None
+        offset = self.get_number_argument("offset", int, self.request.headers.get("Last-Event-ID"))
+        self.set_header("Content-Type", EVENT_STREAM_CONTENT_TYPE)
+        self.set_header("Cache-Control", "no-cache")
+        log_events = self.pyctuator_router.pyctuator_impl.logfile.iter_log_events(offset)
+        try:
+            async for log_event in log_events:
+                self.write(log_event)
+                await self.flush()
+        except StreamClosedError:
+            pass  # The client disconnected
+        finally:
+            await log_events.aclose()
 
 
 # GET /httptrace
 class HttpTraceHandler(AbstractPyctuatorHandler):
+    async def get(self) -> None:
+        assert self.pyctuator_router is not None
+        await self.write_streamed_response(self.pyctuator_router.pyctuator_impl.stream_httptrace())
+
+
+# GET /prometheus
+class PrometheusHandler(AbstractPyctuatorHandler):
     def get(self) -> None:
         assert self.pyctuator_router is not None
-        assert self.dumps is not None
-        self.write(self.dumps(self.pyctuator_router.pyctuator_impl.http_tracer.get_httptrace()))
+        self.set_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+        for text in self.pyctuator_router.pyctuator_impl.get_prometheus_metrics():
+            self.write(text)
 
 
-# pylint: disable=too-many-locals,unused-argument
+# pylint: disable=too-many-locals,too-many-branches,too-many-statements,unused-argument
 class TornadoHttpPyctuator(PyctuatorRouter):
     def __init__(self, app: Application, pyctuator_impl: PyctuatorImpl, disabled_endpoints: Endpoints) -> None:
         super().__init__(app, pyctuator_impl)
 
-        custom_dumps = partial(
-            json.dumps, default=self._custom_json_serializer
-        )
-
         app.settings.setdefault("pyctuator_router", self)
-        app.settings.setdefault("custom_dumps", custom_dumps)
+
+        self.handler_path_patterns: Dict[type, List[Pattern[str]]] = {}
 
         # Register a log-function that records request and response in traces and than delegates to the original func
         self.delegate_log_function = app.settings.get("log_function")
@@ -169,6 +353,9 @@ class TornadoHttpPyctuator(PyctuatorRouter):
 
         if Endpoints.METRICS not in disabled_endpoints:
             handlers.append((r"/pyctuator/metrics", MetricsHandler))
+            # Must precede the metric-name handler which matches any path under /pyctuator/metrics/
+            if pyctuator_impl.metrics_history:
+                handlers.append((r"/pyctuator/metrics/(?P<metric_name>[^/]*)/history$", MetricsHistoryHandler))
             handlers.append((r"/pyctuator/metrics/(?P<metric_name>.*$)", MetricsNameHandler))
 
         if Endpoints.LOGGERS not in disabled_endpoints:
@@ -178,48 +365,95 @@ class TornadoHttpPyctuator(PyctuatorRouter):
         if Endpoints.THREAD_DUMP not in disabled_endpoints:
             handlers.append((r"/pyctuator/dump", ThreadDumpHandler))
             handlers.append((r"/pyctuator/threaddump", ThreadDumpHandler))
+            handlers.append((r"/pyctuator/threaddump/hot", HotThreadsHandler))
+
+        if Endpoints.TASK_DUMP not in disabled_endpoints:
+            handlers.append((r"/pyctuator/taskdump", TaskDumpHandler))
+            # Tornado has no startup hook, tasks are tracked if the loop is already running or once they are dumped
+            try:
+                pyctuator_impl.task_dump_provider.track_tasks(asyncio.get_running_loop())
+            except RuntimeError:
+                pass
+
+        if Endpoints.PROFILE not in disabled_endpoints:
+            handlers.append((r"/pyctuator/profile", ProfileHandler))
+
+        if Endpoints.TRACEMALLOC not in disabled_endpoints:
+            handlers.append((r"/pyctuator/tracemalloc", TracemallocStatusHandler))
+            handlers.append((r"/pyctuator/tracemalloc/start", TracemallocStartHandler))
+            handlers.append((r"/pyctuator/tracemalloc/stop", TracemallocStopHandler))
+            handlers.append((r"/pyctuator/tracemalloc/snapshots", TracemallocSnapshotsHandler))
+            handlers.append((r"/pyctuator/tracemalloc/allocations", AllocationsHandler))
 
         if Endpoints.LOGFILE not in disabled_endpoints:
             handlers.append((r"/pyctuator/logfile", LogFileHandler))
+            handlers.append((r"/pyctuator/logfile/search", LogFileSearchHandler))
+            handlers.append((r"/pyctuator/logfile/tail", LogFileTailHandler))
+            handlers.append((r"/pyctuator/logfile/stream", LogFileStreamHandler))
 
         if Endpoints.HTTP_TRACE not in disabled_endpoints:
             handlers.append((r"/pyctuator/trace", HttpTraceHandler))
             handlers.append((r"/pyctuator/httptrace", HttpTraceHandler))
 
+        if Endpoints.PROMETHEUS not in disabled_endpoints:
+            handlers.append((r"/pyctuator/prometheus", PrometheusHandler))
+
         app.add_handlers(".*$", handlers)
 
     def _intercept_request_and_response(self, handler: RequestHandler) -> None:
-        # Record the request and response
-        record = TraceRecord(
-            timestamp=datetime.now() - timedelta(seconds=handler.request.request_time()),
-            principal=None,
-            session=None,
-            request=TraceRequest(
-                method=handler.request.method or "",
-                uri=handler.request.full_url(),
-                headers=get_headers(handler.request.headers)
-            ),
-            response=TraceResponse(
-                status=handler.get_status(),
-                headers=get_headers(handler._headers)  # pylint: disable=protected-access
-            ),
-            timeTaken=int(handler.request.request_time() * 1000),
+        # Record the request's latency
+        self.pyctuator_impl.http_requests_metrics.record(
+            handler.request.method or "",
+            self._get_uri_template(handler),
+            handler.get_status(),
+            handler.request.request_time(),
         )
-        self.pyctuator_impl.http_tracer.add_record(record)
+
+        # Record the request and response
+        trace_policy = self.pyctuator_impl.http_tracer.trace_policy
+        if trace_policy.should_trace_request(handler.request.path) \
+                and trace_policy.should_trace_response(handler.get_status()):
+            request_time = handler.request.request_time()
+            self.pyctuator_impl.http_tracer.record(
+                time.time() - request_time,
+                handler.request.method or "",
+                handler.request.full_url(),
+                get_headers(handler.request.headers),
+                handler.get_status(),
+                get_headers(handler._headers),  # pylint: disable=protected-access
+                int(request_time * 1000),
+            )
 
         if self.delegate_log_function:
             self.delegate_log_function(handler)
 
-    def _custom_json_serializer(self, value: Any) -> Any:
-        if dataclasses.is_dataclass(value):
-            return dataclasses.asdict(value)
+    def _get_uri_template(self, handler: RequestHandler) -> Optional[str]:
+        """ Tornado doesn't keep the rule that matched the request, so the path patterns routing to the handler's class
+        are looked up once per class, and the one matching the request's path is used as the URI template """
+        handler_class = type(handler)
+        patterns = self.handler_path_patterns.get(handler_class)
+        if patterns is None:
+            patterns = self.handler_path_patterns[handler_class] = \
+                _find_path_patterns(handler.application.default_router, handler_class)
+
+        return next(
+            (pattern.pattern.removesuffix("$") for pattern in patterns if pattern.match(handler.request.path)),
+            None
+        )
+
 
-        if isinstance(value, datetime):
-            return str(value)
-        return None
+def get_headers(headers: HTTPHeaders) -> Tuple[Tuple[str, str], ...]:
+    """ Tornado's HTTPHeaders normalizes header names (e.g. "Content-Type"), this function returns the headers as
+    (name, value) pairs having lower-case names, a name appears multiple times if multiple values were used.
+    See documentation of `tornado.httputil.HTTPHeaders` """
+    return tuple((header.lower(), value) for (header, value) in headers.get_all())
 
 
-def get_headers(headers: HTTPHeaders) -> Mapping[str, List[str]]:
-    """ Tornado's HTTPHeaders contains multiple entries of the same header name if multiple values were used, this
-    function groups headers by header name. See documentation of `tornado.httputil.HTTPHeaders` """
-    return {header.lower(): headers.get_list(header) for header in headers.keys()}
+def _find_path_patterns(router: RuleRouter, handler_class: type) -> List[Pattern[str]]:
+    patterns: List[Pattern[str]] = []
+    for rule in router.rules:
+        if isinstance(rule.target, RuleRouter):
+            patterns.extend(_find_path_patterns(rule.target, handler_class))
+        elif rule.target is handler_class and isinstance(rule.matcher, PathMatches):
+            patterns.append(rule.matcher.regex)
+    return patterns
@@ -0,0 +1,75 @@
+import functools
+import re
+from typing import Iterable, List, Mapping, Optional, Pattern
+
+# The flags that can be scoped to a part of a regex, using the inline "(?flags:...)" syntax
+_INLINE_FLAGS = {
+    re.IGNORECASE: "i",
+    re.MULTILINE: "m",
+    re.DOTALL: "s",
+    re.VERBOSE: "x",
+    re.ASCII: "a",
+}
+
+
+class KeyMatcher:
+    """Matches keys (e.g. the names of environment variables or of HTTP headers) against named patterns, used for
+    deciding which values should be scrubbed.
+
+    The patterns are combined into a single regex having a group per pattern, so each key is matched once no matter
+    how many patterns there are. As the same keys are matched over and over (e.g. on every request), the match of each
+    key is memoized, up to max_cached_keys keys.
+    """
+
+    def __init__(self, patterns: Mapping[str, Pattern[str]], max_cached_keys: int = 4096) -> None:
+        """
+        :param patterns: the patterns by their names, the name of the first matching pattern is returned for each key.
+         A pattern matches a key if it matches at the key's beginning, as with `Pattern.match`
+        :param max_cached_keys: the maximal number of keys whose match is memoized
+        """
+        self.patterns = dict(patterns)
+        self._group_names = {f"pattern{index}": name for index, name in enumerate(self.patterns)}
+        self._combined_pattern = _combine_patterns(self.patterns.values())
+        self._cached_match = functools.lru_cache(maxsize=max_cached_keys)(self._match)
+
+    def match(self, key: str) -> Optional[str]:
+        """Returns the name of the first pattern matching the key, or None if no pattern matches it"""
+        return self._cached_match(key)
+
+    def match_all(self, keys: Iterable[str]) -> List[Optional[str]]:
+        """Returns the name of the first pattern matching each of the keys"""
+        cached_match = self._cached_match
+        return [cached_match(key) for key in keys]
+
+    def _match(self, key: str) -> Optional[str]:
+        if self._combined_pattern:
+            key_match = self._combined_pattern.match(key)
+            return self._group_names[key_match.lastgroup] if key_match and key_match.lastgroup else None
+
+        for name, pattern in self.patterns.items():
+            if pattern.match(key):
+                return name
+        return None
+
+
+def _combine_patterns(patterns: Iterable[Pattern[str]]) -> Optional[Pattern[str]]:
+    """Combines the patterns into a single regex whose alternatives are the patterns, in order, each in a named group
+    with the pattern's flags scoped to it. Returns None if the patterns can't be combined, in which case they're matched
+    one by one"""
+    alternatives: List[str] = []
+    for index, pattern in enumerate(patterns):
+        if re.search(r"\\[1-9]|\(\?P=", pattern.pattern):
+            return None  # Back-references would refer to the wrong groups once the patterns are combined
+
+        flags = "".join(letter for flag, letter in _INLINE_FLAGS.items() if pattern.flags & flag)
+        # A comment at the end of a verbose pattern would hide the closing parenthesis, unless it's on the next line
+        end_of_pattern = "\n" if pattern.flags & re.VERBOSE else ""
+        alternatives.append(
+            f"(?P<pattern{index}>(?{flags}:{pattern.pattern}{end_of_pattern}))" if flags
+            else f"(?P<pattern{index}>{pattern.pattern})"
+        )
+
+    try:
+        return re.compile("|".join(alternatives))
+    except re.error:
+        return None
@@ -0,0 +1,110 @@
+import os
+import threading
+from typing import BinaryIO, Optional, Tuple
+
+
+class _OpenLogFile:
+    def __init__(self, path: str, base: int) -> None:
+        self.file: BinaryIO = open(path, "rb")  # pylint: disable=consider-using-with
+        self.inode = os.fstat(self.file.fileno()).st_ino
+        self.base = base  # The absolute position of the file's first byte
+        self.size = 0
+
+    def read(self, start: int, end: int) -> bytes:
+        """Reads the bytes between the start and end positions within the file, fewer bytes are returned if the file
+        was truncated since its size was checked"""
+        if end <= start:
+            return b""
+        if hasattr(os, "pread"):
+            return os.pread(self.file.fileno(), end - start, start)
+
+        # Windows has no pread, the file's position is only used by reads which are serialized by LogFileReader's lock
+        self.file.seek(start)
+        return self.file.read(end - start)
+
+
+class LogFileReader:
+    """Reads ranges of a log file on disk, such as the file of a `logging.handlers.RotatingFileHandler`.
+
+    Positions are absolute byte offsets that keep growing across rotations - when the file is rotated (i.e. replaced by
+    a new file), the positions of the new file continue from the end of the previous file. The previous file is kept
+    open so its tail can still be read after it was rotated. If the file is truncated in place, its previous content is
+    no longer available and the positions continue from where the truncated content ended.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._current: Optional[_OpenLogFile] = None
+        self._previous: Optional[_OpenLogFile] = None
+
+    def read(self, start: Optional[int] = None, end: Optional[int] = None) -> Tuple[bytes, int]:
+        """Reads the bytes between the absolute start and end positions, limited to the bytes that are available.
+
+        A single read doesn't span across a rotation, so fewer bytes may be returned if the range starts in the
+        previous file.
+
+        :return: the bytes and the absolute position of the first byte returned
+        """
+        with self._lock:
+            self._refresh()
+            if not self._current:
+                return b"", 0
+
+            offset, total = self._get_offset(), self._current.base + self._current.size
+            start = offset if start is None else min(max(start, offset), total)
+            end = total if end is None else min(max(end, start), total)
+
+            log_file = self._previous if self._previous and start < self._current.base else self._current
+            end = min(end, log_file.base + log_file.size)
+            return log_file.read(start - log_file.base, end - log_file.base), start
+
+    def get_offset(self) -> int:
+        with self._lock:
+            self._refresh()
+            return self._get_offset()
+
+    def get_end(self) -> int:
+        with self._lock:
+            self._refresh()
+            return self._current.base + self._current.size if self._current else 0
+
+    def close(self) -> None:
+        with self._lock:
+            for log_file in (self._previous, self._current):
+                if log_file:
+                    log_file.file.close()
+            self._previous = self._current = None
+
+    def _get_offset(self) -> int:
+        log_file = self._previous or self._current
+        return log_file.base if log_file else 0
+
+    def _refresh(self) -> None:
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            # The file may be missing momentarily while being rotated
+            inode = None
+
+        if not self._current:
+            if inode is None:
+                return
+            self._current = _OpenLogFile(self.path, 0)
+
+        elif inode is not None and inode != self._current.inode:
+            # The file was rotated, keep the previous file open so its tail can still be read
+            self._current.size = os.fstat(self._current.file.fileno()).st_size
+            if self._previous:
+                self._previous.file.close()
+            self._previous = self._current
+            self._current = _OpenLogFile(self.path, self._previous.base + self._previous.size)
+
+        size = os.fstat(self._current.file.fileno()).st_size
+        if size < self._current.size:
+            # The file was truncated in place, so the positions continue from the end of the truncated content
+            if self._previous:
+                self._previous.file.close()
+                self._previous = None
+            self._current.base += self._current.size
+        self._current.size = size
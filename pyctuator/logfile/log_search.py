@@ -0,0 +1,185 @@
+import logging
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Mapping, NamedTuple, Optional, Pattern, Sequence, Tuple
+
+
+class LogRecordIndexEntry(NamedTuple):
+    start: int  # The absolute position of the record's first byte in the log
+    end: int  # The absolute position following the record's last byte
+    levelno: int
+    levelname: str
+    logger: str
+    created: float  # The record's creation time, in seconds since the epoch
+
+
+# The number of bytes read at a time when searching a log that isn't indexed
+SEARCH_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class LogRecordMatch:
+    start: int
+    end: int
+    level: Optional[str]  # The level, logger and timestamp are unknown when the log is read from a file
+    logger: Optional[str]
+    timestamp: Optional[datetime]
+    message: str
+
+
+@dataclass
+class LogSearchResult:
+    matches: List[LogRecordMatch]
+    truncated: bool  # Whether older records may have matched as well, they aren't searched once the limit is reached
+
+
+@dataclass
+class LogSearchQuery:
+    level: Optional[int] = None  # The minimal level of the records
+    logger: Optional[str] = None  # The name of the logger, or of one of its ancestors
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    regex: Optional[Pattern[str]] = None  # Searched in the formatted records
+    limit: int = 100  # The maximal number of records returned, the most recent records are returned
+
+    @staticmethod
+    def parse(params: Mapping[str, str]) -> "LogSearchQuery":
+        """Parses the query from a request's query parameters - "level" is a level name (e.g. "WARN"), "since" and
+        "until" are ISO 8601 timestamps and "regex" is a regular expression.
+
+        :raise ValueError: if any of the parameters is invalid
+        """
+        query = LogSearchQuery()
+        if params.get("level"):
+            level = logging.getLevelName(params["level"].upper())
+            if not isinstance(level, int):
+                raise ValueError(f"Unknown log level {params['level']}")
+            query.level = level
+        if params.get("logger"):
+            query.logger = params["logger"]
+        if params.get("since"):
+            query.since = datetime.fromisoformat(params["since"])
+        if params.get("until"):
+            query.until = datetime.fromisoformat(params["until"])
+        if params.get("regex"):
+            try:
+                query.regex = re.compile(params["regex"])
+            except re.error as e:
+                raise ValueError(f"Invalid regex {params['regex']}, {e}") from e
+        if params.get("limit"):
+            query.limit = int(params["limit"])
+        return query
+
+
+def search_log_records(
+        index: Sequence[LogRecordIndexEntry],
+        query: LogSearchQuery,
+        read: Callable[[int, int], Tuple[bytes, int]],
+) -> LogSearchResult:
+    """Searches the log records, from the most recent to the oldest, using the index to filter by metadata so only the
+    records that pass the filters are read (and matched against the regex, if any).
+
+    :param index: the index entries of the log records, ordered by their position in the log
+    :param query: the search's filters
+    :param read: reads the bytes between two positions, returning the bytes and the position of the first byte
+    """
+    since = query.since.timestamp() if query.since else None
+    until = query.until.timestamp() if query.until else None
+    logger_prefix = query.logger + "." if query.logger else None
+
+    matches: List[LogRecordMatch] = []
+    truncated = False
+    for entry in reversed(index):
+        if (query.level is not None and entry.levelno < query.level) \
+                or (since is not None and entry.created < since) \
+                or (until is not None and entry.created > until) \
+                or (logger_prefix and entry.logger != query.logger and not entry.logger.startswith(logger_prefix)):
+            continue
+
+        if len(matches) >= query.limit:
+            truncated = True
+            break
+
+        record_bytes, start = read(entry.start, entry.end)
+        if start != entry.start:
+            continue  # The record was overwritten since the index was copied
+        message = record_bytes.decode("utf-8", "replace").rstrip("\n")
+        if query.regex and not query.regex.search(message):
+            continue
+
+        matches.append(LogRecordMatch(
+            entry.start, entry.end, entry.levelname, entry.logger, datetime.fromtimestamp(entry.created), message
+        ))
+
+    matches.reverse()
+    return LogSearchResult(matches, truncated)
+
+
+def search_log_lines(
+        query: LogSearchQuery,
+        read: Callable[[int, int], Tuple[bytes, int]],
+        offset: int,
+        end: int,
+        chunk_size: int = SEARCH_CHUNK_SIZE,
+) -> LogSearchResult:
+    """Searches the lines of a log that isn't indexed (e.g. a log file), from the most recent to the oldest, by reading
+    the log backwards in chunks of chunk_size bytes. As the lines have no metadata, only the regex and limit of the
+    query apply.
+
+    :param query: the search's filters
+    :param read: reads the bytes between two positions, returning the bytes and the position of the first byte
+    :param offset: the position of the log's first byte
+    :param end: the position following the log's last byte
+    :raise ValueError: if the query filters by level, logger or time
+    """
+    if query.level is not None or query.logger or query.since or query.until:
+        raise ValueError("Only the regex and limit filters are supported when the log is read from a file")
+
+    matches: List[LogRecordMatch] = []
+    remainder = b""  # The beginning of the line that was cut by the start of the previous chunk
+    position = end
+    while position > offset:
+        chunk_start = max(offset, position - chunk_size)
+        chunk = _read_range(read, chunk_start, position)
+        if chunk is None:
+            break  # The log was truncated or rotated away since the search started
+        data = chunk + remainder
+
+        # Unless the chunk is at the log's start, its first line may have started in the preceding chunk
+        lines_start = 0
+        if chunk_start > offset:
+            first_line_end = data.find(b"\n")
+            lines_start = first_line_end + 1 if first_line_end >= 0 else len(data)
+        line_end = len(data)
+        while line_end > lines_start:
+            line_start = max(lines_start, data.rfind(b"\n", lines_start, line_end - 1) + 1)
+            message = data[line_start:line_end].decode("utf-8", "replace").rstrip("\n")
+            if not query.regex or query.regex.search(message):
+                if len(matches) >= query.limit:
+                    matches.reverse()
+                    return LogSearchResult(matches, True)
+                matches.append(LogRecordMatch(
+                    chunk_start + line_start, chunk_start + line_end, None, None, None, message
+                ))
+            line_end = line_start
+
+        remainder = data[:lines_start]
+        position = chunk_start
+
+    matches.reverse()
+    return LogSearchResult(matches, False)
+
+
+def _read_range(read: Callable[[int, int], Tuple[bytes, int]], start: int, end: int) -> Optional[bytes]:
+    """Reads all the bytes between two positions, using several reads if needed (e.g. a range that spans a rotation of
+    a log file), returns None if some of the bytes are no longer available"""
+    parts = []
+    position = start
+    while position < end:
+        part, part_start = read(position, end)
+        if not part or part_start != position:
+            return None
+        parts.append(part)
+        position += len(part)
+    return b"".join(parts)
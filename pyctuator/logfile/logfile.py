@@ -1,44 +1,200 @@
+import asyncio
 import logging
+import logging.handlers
+import queue
 import re
-from typing import Optional, Tuple
+import threading
+import time
+from collections import deque
+from typing import AsyncGenerator, Callable, Deque, List, Optional, Tuple, Union
+
+from pyctuator.logfile.log_file_reader import LogFileReader
+from pyctuator.logfile.log_search import LogRecordIndexEntry, LogSearchQuery, LogSearchResult, search_log_records, \
+    search_log_lines
 
 logfile_request_range_pattern = re.compile("bytes=(\\d*)-(\\d*)")
 
+# The maximal time a tail request waits for new log messages
+MAX_TAIL_TIMEOUT_SEC = 30.0
+
+# How often a log file on disk is checked for new bytes while waiting, as there's no notification when it's written
+LOG_FILE_POLL_INTERVAL_SEC = 0.5
+
+# How often a comment is sent to idle log event streams, so disconnected clients are detected
+LOG_EVENTS_KEEP_ALIVE_SEC = 15.0
+
 
 class LogMessageBuffer(logging.Handler):
+    """Keeps the most recent log messages, UTF-8 encoded, in a preallocated ring buffer of max_size bytes.
+
+    Positions are absolute byte offsets counted from the first message ever logged, so the buffer holds the bytes from
+    the offset (the position of the oldest byte that wasn't overwritten yet) up to the number of bytes ever written.
+
+    The position and metadata of each record in the buffer are kept in an index, so records can be searched without
+    scanning the formatted messages.
+    """
+
     def __init__(self, max_size: int, formatter: str) -> None:
         super().__init__()
         self.setFormatter(logging.Formatter(formatter))
         self._max_size = max_size
-        self._buffer: str = ""
-        self._offset: int = 0
+        self._buffer = memoryview(bytearray(max_size))
+        self._written: int = 0
+        self._index: Deque[LogRecordIndexEntry] = deque()
+
+        # Called after each message is appended, by the thread that appended it and without holding the handler's lock.
+        # The tuple is replaced rather than modified, so it can be iterated while listeners are added and removed by
+        # other threads
+        self._append_listeners: Tuple[Callable[[], None], ...] = ()
+        self._append_listeners_lock = threading.Lock()
 
     def emit(self, record: logging.LogRecord) -> None:
-        msg = self.format(record) + "\n"
+        msg = (self.format(record) + "\n").encode("utf-8")
         msg_len = len(msg)
-        if len(self._buffer) + msg_len > self._max_size:
-            self._buffer = self._buffer[-(self._max_size - msg_len):]
-            self._offset += msg_len
-        self._buffer += msg
 
-    def get_range(self, start: Optional[int] = None, end: Optional[int] = None) -> str:
-        start = start - self._offset if start else 0
-        return self._buffer[start:end or len(self._buffer) - 1]
+        # A message larger than the buffer would overwrite itself, only its end is kept
+        if msg_len > self._max_size:
+            msg = msg[-self._max_size:]
+
+        # Called while holding the handler's lock, see logging.Handler.handle
+        position = (self._written + msg_len - len(msg)) % self._max_size
+        first_part_len = min(len(msg), self._max_size - position)
+        self._buffer[position:position + first_part_len] = msg[:first_part_len]
+        self._buffer[:len(msg) - first_part_len] = msg[first_part_len:]
+        self._index.append(LogRecordIndexEntry(
+            self._written, self._written + msg_len, record.levelno, record.levelname, record.name, record.created
+        ))
+        self._written += msg_len
+
+        # Drop the records that were overwritten, even partially
+        offset = self.get_offset()
+        while self._index and self._index[0].start < offset:
+            self._index.popleft()
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # The listeners are called once the message was emitted and the handler's lock was released, so they don't
+        # delay other threads that are logging
+        handled = super().handle(record)
+        if handled:
+            for listener in self._append_listeners:
+                listener()
+        return handled
+
+    def get_range(self, start: Optional[int] = None, end: Optional[int] = None) -> bytes:
+        return self.read(start, end)[0]
+
+    def read(self, start: Optional[int] = None, end: Optional[int] = None) -> Tuple[bytes, int]:
+        """Reads the bytes between the absolute start and end positions, limited to the bytes that are still kept.
+
+        :return: the bytes and the absolute position of the first byte returned
+        """
+        self.acquire()
+        try:
+            offset = self.get_offset()
+            start = offset if start is None else min(max(start, offset), self._written)
+            end = self._written if end is None else min(max(end, start), self._written)
+
+            start_position = start % self._max_size
+            end_position = start_position + end - start
+            if end_position <= self._max_size:
+                return self._buffer[start_position:end_position].tobytes(), start
+
+            return self._buffer[start_position:].tobytes() + self._buffer[:end_position - self._max_size], start
+        finally:
+            self.release()
 
     def get_offset(self) -> int:
-        return self._offset
+        return max(0, self._written - self._max_size)
+
+    def get_end(self) -> int:
+        return self._written
+
+    def get_index(self) -> List[LogRecordIndexEntry]:
+        self.acquire()
+        try:
+            return list(self._index)
+        finally:
+            self.release()
+
+    def add_append_listener(self, listener: Callable[[], None]) -> None:
+        with self._append_listeners_lock:
+            self._append_listeners = self._append_listeners + (listener,)
+
+    def remove_append_listener(self, listener: Callable[[], None]) -> None:
+        with self._append_listeners_lock:
+            listeners = list(self._append_listeners)
+            listeners.remove(listener)
+            self._append_listeners = tuple(listeners)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues log records as-is, to be formatted by the listener's handlers rather than by the logging thread.
+
+    The queue is bounded, records that are logged while the queue is full are dropped and counted.
+    """
 
-    def get_offset_tuple(self, start: Optional[int], end: Optional[int]) -> Tuple[int, int]:
-        res_start = self._offset + (start or 0)
-        res_end = self._offset + (end or len(self._buffer))
-        return res_start, res_end
+    def __init__(self, records_queue: queue.Queue) -> None:
+        super().__init__(records_queue)
+        self.records_queue = records_queue
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Unlike QueueHandler, the record isn't formatted as it's handled by a listener in the same process
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.records_queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
 
 
 class PyctuatorLogfile:
-    def __init__(self, max_size: int, formatter: str) -> None:
+    def __init__(self, max_size: int, formatter: str, queue_size: int = 0, path: Optional[str] = None) -> None:
+        """
+        :param max_size: the number of bytes of recent log messages that are kept, and the maximal number of bytes
+         returned per request
+        :param formatter: the format of the log messages
+        :param queue_size: if positive, log records are queued (up to this many) and appended to the log by a
+         background listener, so logging threads don't format the records nor contend on the log's lock
+        :param path: if provided, the log is read from this file (e.g. the file of a RotatingFileHandler) instead of
+         keeping the log messages in memory
+        """
+        self.max_size = max_size
         self.log_messages = LogMessageBuffer(max_size=max_size, formatter=formatter)
+        self.log_file = LogFileReader(path) if path else None
+        self.log_source: Union[LogMessageBuffer, LogFileReader] = self.log_file or self.log_messages
+
+        self.queue_handler: Optional[DroppingQueueHandler] = None
+        self.queue_listener: Optional[logging.handlers.QueueListener] = None
+        if queue_size > 0:
+            records_queue: queue.Queue = queue.Queue(queue_size)
+            self.queue_handler = DroppingQueueHandler(records_queue)
+            self.queue_listener = logging.handlers.QueueListener(records_queue, self.log_messages)
+        self._is_listening = False
+
+    def get_handler(self) -> Optional[logging.Handler]:
+        """Returns the handler that should be added to the logger whose messages are kept, None if the log is read from
+        a file"""
+        if self.log_file:
+            return None
+        return self.queue_handler or self.log_messages
+
+    def start(self) -> None:
+        if self.queue_listener and not self._is_listening:
+            self.queue_listener.start()
+            self._is_listening = True
+
+    def stop(self) -> None:
+        """Stops the queue listener, if any, once all the queued records were appended to the log, and closes the log
+        file if the log is read from a file"""
+        if self.queue_listener and self._is_listening:
+            self.queue_listener.stop()
+            self._is_listening = False
+        if self.log_file:
+            self.log_file.close()
 
-    def get_logfile(self, range_substring: str) -> Tuple[str, int, int]:
+    def get_logfile(self, range_substring: str) -> Tuple[bytes, int, int]:
         logging.debug("Received logfile request with range header: %s", range_substring)
 
         start = None
@@ -49,14 +205,168 @@ class PyctuatorLogfile:
             start = int(start_str) if start_str.strip() else None
             end = int(end_str) if end_str.strip() else None
 
-        str_res = self.log_messages.get_range(start, end)
-        end = len(str_res) if (start is None) and end else end  # Handle 0-307200 initial range edge-case
+        # A suffix range (e.g. SBA's initial "bytes=-307200") requests the last bytes of the log
+        if start is None and end is not None:
+            start = max(0, self.log_source.get_end() - end)
+            end = None
 
-        res_start, res_end = self.log_messages.get_offset_tuple(start, end)
+        res, res_start, res_end = self.read_log(start, end)
 
-        logging.debug(f"Returning logfile response with range header: bytes=%d-%d/%d", res_start, res_end, res_end)
+        logging.debug("Returning logfile response with range header: bytes=%d-%d/%d", res_start, res_end, res_end)
 
-        return str_res, res_start, res_end
+        return res, res_start, res_end
+
+    def read_log(self, start: Optional[int] = None, end: Optional[int] = None) -> Tuple[bytes, int, int]:
+        """Reads the log between the absolute start and end positions, limited to max_size bytes - the rest can be read
+        by following reads.
+
+        :return: the bytes, and the absolute positions of the first byte and of the byte after the last byte returned
+        """
+        start = max(start or 0, self.log_source.get_offset())
+        if end is None or end - start > self.max_size:
+            end = start + self.max_size
+
+        res, res_start = self.log_source.read(start, end)
+        return res, res_start, res_start + len(res)
+
+    def get_tail(self) -> bytes:
+        """Returns the last max_size bytes of the log"""
+        return self.log_source.read(max(0, self.log_source.get_end() - self.max_size))[0]
+
+    def search(self, query: LogSearchQuery) -> LogSearchResult:
+        """Searches the log messages kept in memory using their index, or the lines of the log file if the log is read
+        from a file (which isn't indexed, so only the regex and limit of the query apply).
+
+        :raise ValueError: if the log is read from a file and the query filters by level, logger or time
+        """
+        if self.log_file:
+            return search_log_lines(query, self.log_file.read, self.log_file.get_offset(), self.log_file.get_end())
+        return search_log_records(self.log_messages.get_index(), query, self.log_messages.read)
 
     def get_log_buffer_offset(self) -> int:
-        return self.log_messages.get_offset()
+        return self.log_source.get_offset()
+
+    def get_log_end(self) -> int:
+        return self.log_source.get_end()
+
+    def tail_log(self, offset: Optional[int] = None, timeout: Optional[float] = None) -> Tuple[bytes, int, int]:
+        """Long-polls the log - waits until the log grows past the offset or until the timeout expires, and then reads
+        the log from the offset (see `read_log`).
+
+        :param offset: the absolute position to read from, if None or past the end of the log (e.g. a position from
+         before the application was restarted) only new log messages are read
+        :param timeout: the maximal number of seconds to wait, limited to (and defaults to) MAX_TAIL_TIMEOUT_SEC
+        """
+        offset = self._get_tail_offset(offset)
+
+        appended = threading.Event()
+        deadline = time.monotonic() + self._get_tail_timeout(timeout)
+        self.log_messages.add_append_listener(appended.set)
+        try:
+            remaining = deadline - time.monotonic()
+            while self.get_log_end() <= offset and remaining > 0:
+                appended.wait(self._get_wait_interval(remaining))
+                appended.clear()
+                remaining = deadline - time.monotonic()
+        finally:
+            self.log_messages.remove_append_listener(appended.set)
+
+        return self.read_log(offset)
+
+    async def tail_log_async(
+            self,
+            offset: Optional[int] = None,
+            timeout: Optional[float] = None,
+    ) -> Tuple[bytes, int, int]:
+        """Same as `tail_log`, but waits without blocking the event loop"""
+        offset = self._get_tail_offset(offset)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._get_tail_timeout(timeout)
+        with _AsyncAppendListener(self.log_messages, loop) as appended:
+            remaining = deadline - loop.time()
+            while self.get_log_end() <= offset and remaining > 0:
+                await appended.wait(self._get_wait_interval(remaining))
+                remaining = deadline - loop.time()
+
+        return self.read_log(offset)
+
+    async def iter_log_events(self, offset: Optional[int] = None) -> AsyncGenerator[str, None]:
+        """Streams the log as server-sent events, each carrying the log messages appended since the previous event.
+
+        The id of each event is the position following its log messages, so a reconnecting client can resume from its
+        Last-Event-ID. While there are no new log messages, a comment is sent every LOG_EVENTS_KEEP_ALIVE_SEC.
+
+        :param offset: the absolute position to stream from, if None or past the end of the log only new log messages
+         are streamed
+        """
+        offset = self._get_tail_offset(offset)
+
+        loop = asyncio.get_running_loop()
+        keep_alive_time = loop.time() + LOG_EVENTS_KEEP_ALIVE_SEC
+        with _AsyncAppendListener(self.log_messages, loop) as appended:
+            while True:
+                if self.get_log_end() > offset:
+                    log_bytes, _, offset = self.read_log(offset)
+                    data = "".join(f"data: {line}\n" for line in log_bytes.decode("utf-8", "replace").splitlines())
+                    yield f"id: {offset}\n{data}\n"
+                    keep_alive_time = loop.time() + LOG_EVENTS_KEEP_ALIVE_SEC
+                elif loop.time() >= keep_alive_time:
+                    yield ": keep-alive\n\n"
+                    keep_alive_time = loop.time() + LOG_EVENTS_KEEP_ALIVE_SEC
+                else:
+                    await appended.wait(self._get_wait_interval(keep_alive_time - loop.time()))
+
+    def _get_tail_offset(self, offset: Optional[int]) -> int:
+        end = self.get_log_end()
+        return end if offset is None else min(offset, end)
+
+    def _get_tail_timeout(self, timeout: Optional[float]) -> float:
+        return MAX_TAIL_TIMEOUT_SEC if timeout is None else max(0.0, min(timeout, MAX_TAIL_TIMEOUT_SEC))
+
+    def _get_wait_interval(self, timeout: float) -> float:
+        return min(timeout, LOG_FILE_POLL_INTERVAL_SEC) if self.log_file else timeout
+
+
+class _AsyncAppendListener:
+    """Wakes up a coroutine when messages are appended to the log, by the thread that appended them.
+
+    Wake-ups are coalesced - while a wake-up is scheduled on the loop, appending more messages doesn't schedule another,
+    so a busy logger costs each waiting coroutine's loop a single callback rather than one per message.
+    """
+
+    def __init__(self, log_messages: LogMessageBuffer, loop: asyncio.AbstractEventLoop) -> None:
+        self.log_messages = log_messages
+        self.loop = loop
+        self.appended = asyncio.Event()
+        self._wake_up_pending = False
+
+    def __enter__(self) -> "_AsyncAppendListener":
+        self.log_messages.add_append_listener(self._on_append)
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.log_messages.remove_append_listener(self._on_append)
+
+    async def wait(self, timeout: float) -> None:
+        """Waits until messages are appended or until the timeout expires"""
+        try:
+            await asyncio.wait_for(self.appended.wait(), timeout)
+            self.appended.clear()
+        except asyncio.TimeoutError:
+            pass
+
+    def _on_append(self) -> None:
+        # Threads appending concurrently may both schedule a wake-up, which is harmless. A message appended while a
+        # wake-up is pending is read by the woken coroutine, as the wake-up runs after the message was appended
+        if self._wake_up_pending:
+            return
+        self._wake_up_pending = True
+        try:
+            self.loop.call_soon_threadsafe(self._wake_up)
+        except RuntimeError:
+            self._wake_up_pending = False  # The event loop was closed
+
+    def _wake_up(self) -> None:
+        self._wake_up_pending = False
+        self.appended.set()
@@ -1,6 +1,6 @@
 import logging
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Dict, Hashable, List, Optional
 
 
 @dataclass
@@ -71,6 +71,15 @@ class PyctuatorLogging:
 
         return LoggersData(levels=level_names, loggers=loggers, groups={})
 
+    def get_loggers_version(self) -> Hashable:
+        """Returns a fingerprint of the loggers and their levels, which changes when a logger is added or its level is
+        changed, even if it wasn't done using pyctuator"""
+        # The root logger isn't kept in the logger dictionary, so its level is added explicitly
+        return logging.root.level, tuple(
+            (logger_name, getattr(logger, "level", None))
+            for logger_name, logger in list(logging.root.manager.loggerDict.items())  # type: ignore
+        )
+
     def get_logger(self, logger_name: str) -> LoggerLevels:
         logger = logging.getLogger(logger_name)
         level = _python_to_admin_log_level(logger.level)
@@ -0,0 +1,171 @@
+import threading
+import tracemalloc
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Union
+
+# The number of frames stored in the traceback of each allocation, more frames make tracing slower and use more memory
+DEFAULT_TRACEBACK_FRAMES = 10
+MAX_TRACEBACK_FRAMES = 100
+
+# The maximal number of snapshots kept for comparing later snapshots to them, the oldest snapshot is dropped first
+MAX_SNAPSHOTS = 5
+
+DEFAULT_ALLOCATIONS_LIMIT = 20
+
+GROUP_BY_OPTIONS = ("lineno", "filename", "traceback")
+
+# Allocations done by tracemalloc itself and by the import machinery are of no interest
+_IGNORED_ALLOCATIONS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+@dataclass
+class TracemallocStatus:
+    tracing: bool
+    tracebackFrames: int  # The number of frames stored in the traceback of each allocation
+    currentBytes: int  # The size of the memory blocks currently allocated
+    peakBytes: int  # The peak size of the allocated memory blocks since tracing started
+    overheadBytes: int  # The memory used by tracemalloc to store the traces
+    snapshots: List[int]  # The ids of the kept snapshots
+
+
+@dataclass
+class AllocationFrame:
+    fileName: str
+    lineNumber: int
+
+
+@dataclass
+class AllocationSite:
+    traceback: List[AllocationFrame]  # From the most recent frame, only the allocating frame unless grouped by it
+    sizeBytes: int
+    count: int
+    sizeDiffBytes: Optional[int]  # When compared to a snapshot, the growth of the size since the snapshot
+    countDiff: Optional[int]
+
+
+@dataclass
+class Allocations:
+    groupBy: str
+    snapshot: Optional[int]  # The id of the snapshot the allocations are compared to, if any
+    totalBytes: int
+    sites: List[AllocationSite]
+
+
+class AllocationTracer:
+    """Traces the memory allocations of the application using tracemalloc, which is started and stopped on demand as
+    it slows down allocations and uses memory for storing their traces.
+
+    Snapshots of the traced allocations can be kept, so the allocations can later be compared to them in order to find
+    which allocation sites are growing.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._snapshots: "OrderedDict[int, tracemalloc.Snapshot]" = OrderedDict()
+        self._next_snapshot_id = 1
+
+    def start(self, traceback_frames: Optional[int] = None) -> TracemallocStatus:
+        """Starts tracing, if not already tracing, storing up to traceback_frames frames (limited to
+        MAX_TRACEBACK_FRAMES) per allocation"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(
+                DEFAULT_TRACEBACK_FRAMES if traceback_frames is None
+                else max(1, min(traceback_frames, MAX_TRACEBACK_FRAMES))
+            )
+        return self.get_status()
+
+    def stop(self) -> TracemallocStatus:
+        """Stops tracing, dropping the traces and the kept snapshots"""
+        with self._lock:
+            self._snapshots.clear()
+        tracemalloc.stop()
+        return self.get_status()
+
+    def get_status(self) -> TracemallocStatus:
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            snapshot_ids = list(self._snapshots)
+        return TracemallocStatus(
+            tracing=tracing,
+            tracebackFrames=tracemalloc.get_traceback_limit() if tracing else 0,
+            currentBytes=current,
+            peakBytes=peak,
+            overheadBytes=tracemalloc.get_tracemalloc_memory(),
+            snapshots=snapshot_ids,
+        )
+
+    def take_snapshot(self) -> Optional[int]:
+        """Keeps a snapshot of the traced allocations, returns its id or None if not tracing"""
+        if not tracemalloc.is_tracing():
+            return None
+
+        snapshot = _take_snapshot()
+        with self._lock:
+            snapshot_id = self._next_snapshot_id
+            self._next_snapshot_id += 1
+            self._snapshots[snapshot_id] = snapshot
+            while len(self._snapshots) > MAX_SNAPSHOTS:
+                self._snapshots.popitem(last=False)
+        return snapshot_id
+
+    def get_allocations(
+            self,
+            group_by: str = "lineno",
+            limit: Optional[int] = None,
+            snapshot_id: Optional[int] = None,
+    ) -> Optional[Allocations]:
+        """Returns the allocation sites that allocated the most memory, or None if not tracing.
+
+        :param group_by: one of GROUP_BY_OPTIONS, whether the allocations are grouped by the line or file that allocated
+         them or by their traceback
+        :param limit: the maximal number of allocation sites returned, DEFAULT_ALLOCATIONS_LIMIT by default
+        :param snapshot_id: if provided, the allocations are compared to the kept snapshot having this id, and the
+         allocation sites that grew the most are returned
+        :raise ValueError: if group_by is invalid or if there's no kept snapshot having the id
+        """
+        if group_by not in GROUP_BY_OPTIONS:
+            raise ValueError(f"Unknown grouping {group_by}, expected one of {', '.join(GROUP_BY_OPTIONS)}")
+
+        previous_snapshot = None
+        if snapshot_id is not None:
+            with self._lock:
+                previous_snapshot = self._snapshots.get(snapshot_id)
+            if previous_snapshot is None:
+                raise ValueError(f"Unknown snapshot {snapshot_id}")
+
+        if not tracemalloc.is_tracing():
+            return None
+
+        snapshot = _take_snapshot()
+        statistics: Union[List[tracemalloc.Statistic], List[tracemalloc.StatisticDiff]] = \
+            snapshot.compare_to(previous_snapshot, group_by) if previous_snapshot else snapshot.statistics(group_by)
+        limit = DEFAULT_ALLOCATIONS_LIMIT if limit is None else max(0, limit)
+
+        return Allocations(
+            groupBy=group_by,
+            snapshot=snapshot_id,
+            totalBytes=sum(statistic.size for statistic in statistics),
+            sites=[_build_allocation_site(statistic) for statistic in statistics[:limit]],
+        )
+
+
+def _take_snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(_IGNORED_ALLOCATIONS)
+
+
+def _build_allocation_site(statistic: Union[tracemalloc.Statistic, tracemalloc.StatisticDiff]) -> AllocationSite:
+    return AllocationSite(
+        # The frames of tracemalloc's tracebacks are ordered from the oldest frame
+        traceback=[AllocationFrame(frame.filename, frame.lineno) for frame in reversed(statistic.traceback)],
+        sizeBytes=statistic.size,
+        count=statistic.count,
+        sizeDiffBytes=statistic.size_diff if isinstance(statistic, tracemalloc.StatisticDiff) else None,
+        countDiff=statistic.count_diff if isinstance(statistic, tracemalloc.StatisticDiff) else None,
+    )
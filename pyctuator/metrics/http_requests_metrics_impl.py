@@ -0,0 +1,180 @@
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from pyctuator.metrics.metrics_provider import MetricsProvider, Metric, Measurement, MetricTag, MetricSample
+from pyctuator.metrics.metrics_provider import MetricSamples
+
+PREFIX = "http.server.requests"
+DESCRIPTION = "Duration of HTTP server request handling"
+
+# Upper bounds, in seconds, of the latency histogram's buckets, the last bucket counts all the slower requests
+HISTOGRAM_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# The "le" (less or equal) tag values of the histogram's buckets
+_BUCKET_TAGS = tuple(("le", repr(float(bucket))) for bucket in HISTOGRAM_BUCKETS) + (("le", "+Inf"),)
+
+# The tags of a request - method, uri (template), status and outcome
+RequestTags = Tuple[str, str, str, str]
+
+
+class RequestsTimer:
+    __slots__ = ("count", "total_time", "max", "buckets")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_time = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+
+    def record(self, duration: float) -> None:
+        self.count += 1
+        self.total_time += duration
+        if duration > self.max:
+            self.max = duration
+        self.buckets[bisect_left(HISTOGRAM_BUCKETS, duration)] += 1
+
+    def merge(self, other: "RequestsTimer") -> None:
+        self.count += other.count
+        self.total_time += other.total_time
+        self.max = max(self.max, other.max)
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+
+
+_OUTCOMES = {
+    1: "INFORMATIONAL",
+    2: "SUCCESS",
+    3: "REDIRECTION",
+    4: "CLIENT_ERROR",
+    5: "SERVER_ERROR",
+}
+
+
+def _outcome(status: int) -> str:
+    return _OUTCOMES.get(status // 100, "UNKNOWN")
+
+
+def _uri_tag(uri_template: Optional[str], status: int) -> str:
+    """Similarly to Spring, requests that weren't matched to a route are tagged by the reason rather than by their path
+    which would have resulted with unbounded number of tag values"""
+    if uri_template:
+        return uri_template
+    if status == 404:
+        return "NOT_FOUND"
+    if 300 <= status < 400:
+        return "REDIRECTION"
+    return "UNKNOWN"
+
+
+class HttpRequestsMetricsProvider(MetricsProvider):
+    """Provides the "http.server.requests" metric - the count, total time and max latency of handled requests.
+
+    Requests are recorded by the web-framework integration and tagged by method, uri template, status and outcome, in
+    addition, a latency histogram is kept for each set of tags.
+
+    Recording a request must be cheap and must not contend with other threads handling requests, so each thread keeps
+    its own timers, which are merged only when the metric is requested.
+    """
+
+    def __init__(self) -> None:
+        self._thread_local = threading.local()
+        self._threads_timers: List[Tuple[threading.Thread, Dict[RequestTags, RequestsTimer]]] = []
+        self._threads_timers_lock = threading.Lock()
+
+        # Timers of threads that are no longer alive (e.g. when using a thread per request) are merged here
+        self._retired_timers: Dict[RequestTags, RequestsTimer] = {}
+
+    def get_prefix(self) -> str:
+        return PREFIX
+
+    def get_supported_metric_names(self) -> List[str]:
+        return [PREFIX]
+
+    def get_metric(self, metric_name: str) -> Metric:
+        total = RequestsTimer()
+        tag_values: Tuple[Set[str], Set[str], Set[str], Set[str]] = (set(), set(), set(), set())
+        for tags, timer in self.iter_timers():
+            total.merge(timer)
+            for tag_value, values in zip(tags, tag_values):
+                values.add(tag_value)
+
+        return Metric(
+            metric_name,
+            DESCRIPTION,
+            "seconds",
+            [
+                Measurement("COUNT", total.count),
+                Measurement("TOTAL_TIME", total.total_time),
+                Measurement("MAX", total.max),
+            ],
+            [
+                MetricTag(tag, sorted(values))
+                for tag, values in zip(("method", "uri", "status", "outcome"), tag_values)
+            ]
+        )
+
+    def iter_samples(self) -> Iterator[MetricSamples]:
+        """Samples the count, total time and max latency of each set of tags, along with its latency histogram"""
+        samples: List[MetricSample] = []
+        for (method, uri, status, outcome), timer in self.iter_timers():
+            tags = (("method", method), ("uri", uri), ("status", status), ("outcome", outcome))
+            cumulative_count = 0
+            for bucket_tag, bucket_count in zip(_BUCKET_TAGS, timer.buckets):
+                cumulative_count += bucket_count
+                samples.append(("BUCKET", tags + (bucket_tag,), cumulative_count))
+            samples.append(("COUNT", tags, timer.count))
+            samples.append(("TOTAL_TIME", tags, timer.total_time))
+            samples.append(("MAX", tags, timer.max))
+
+        yield PREFIX, DESCRIPTION, "seconds", samples
+
+    def record(self, method: str, uri_template: Optional[str], status: int, duration: float) -> None:
+        """Records a handled request, called for every request by the web-framework integration.
+
+        :param method: the request's HTTP method
+        :param uri_template: the route template that matched the request (e.g. "/users/{user_id}"), None if the request
+         wasn't matched to any route
+        :param status: the response's HTTP status code
+        :param duration: the time it took to handle the request in seconds
+        """
+        try:
+            timers = self._thread_local.timers
+        except AttributeError:
+            timers = self._thread_local.timers = {}
+            with self._threads_timers_lock:
+                self._retire_dead_threads_timers()
+                self._threads_timers.append((threading.current_thread(), timers))
+
+        tags = (method, _uri_tag(uri_template, status), str(status), _outcome(status))
+        timer = timers.get(tags)
+        if timer is None:
+            timer = timers[tags] = RequestsTimer()
+        timer.record(duration)
+
+    def iter_timers(self) -> Iterator[Tuple[RequestTags, RequestsTimer]]:
+        """Iterates over the timers of all the recorded tag combinations, merging the timers of all threads"""
+        merged: Dict[RequestTags, RequestsTimer] = {}
+        with self._threads_timers_lock:
+            self._retire_dead_threads_timers()
+            _merge_timers(merged, self._retired_timers)
+            threads_timers = [timers for _, timers in self._threads_timers]
+
+        for timers in threads_timers:
+            _merge_timers(merged, timers)
+
+        yield from merged.items()
+
+    def _retire_dead_threads_timers(self) -> None:
+        alive_threads_timers = []
+        for thread, timers in self._threads_timers:
+            if thread.is_alive():
+                alive_threads_timers.append((thread, timers))
+            else:
+                _merge_timers(self._retired_timers, timers)
+        self._threads_timers = alive_threads_timers
+
+
+def _merge_timers(target: Dict[RequestTags, RequestsTimer], timers: Dict[RequestTags, RequestsTimer]) -> None:
+    # Copying the items is atomic, so it is safe even while the owning thread is adding new tag combinations
+    for tags, timer in list(timers.items()):
+        target.setdefault(tags, RequestsTimer()).merge(timer)
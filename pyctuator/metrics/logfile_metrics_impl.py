@@ -0,0 +1,38 @@
+from typing import List
+
+from pyctuator.logfile.logfile import DroppingQueueHandler  # type: ignore
+from pyctuator.metrics.metrics_provider import MetricsProvider, Metric, Measurement
+
+PREFIX = "logfile."
+QUEUE_DROPPED = PREFIX + "queue.dropped"
+QUEUE_SIZE = PREFIX + "queue.size"
+
+
+class LogfileQueueMetricsProvider(MetricsProvider):
+    """Provides the metrics of the logfile's queue - the number of queued records and the number of dropped records"""
+
+    def __init__(self, queue_handler: DroppingQueueHandler) -> None:
+        self.queue_handler = queue_handler
+
+    def get_prefix(self) -> str:
+        return PREFIX
+
+    def get_supported_metric_names(self) -> List[str]:
+        return [QUEUE_DROPPED, QUEUE_SIZE]
+
+    def get_metric(self, metric_name: str) -> Metric:
+        if metric_name == QUEUE_DROPPED:
+            return Metric(
+                metric_name,
+                "Log records that were dropped because the logfile's queue was full",
+                "records",
+                [Measurement("COUNT", self.queue_handler.dropped)],
+                [],
+            )
+        return Metric(
+            metric_name,
+            "Log records waiting in the logfile's queue",
+            "records",
+            [Measurement("VALUE", self.queue_handler.records_queue.qsize())],
+            [],
+        )
@@ -1,33 +1,53 @@
-# pylint: disable=import-outside-toplevel
-import importlib.util
-from typing import List
+import tracemalloc
+from typing import Iterator, List, Optional
 
-from pyctuator.metrics.metrics_provider import MetricsProvider, Metric, Measurement
+from pyctuator.metrics.metrics_provider import MetricsProvider, Metric, Measurement, MetricSamples
+from pyctuator.metrics.process_sampler import ProcessSampler
 
 PREFIX = "memory."
 
+# Measured only while tracemalloc is tracing
+TRACEMALLOC_CURRENT = PREFIX + "tracemalloc.current"
+TRACEMALLOC_PEAK = PREFIX + "tracemalloc.peak"
+
 
 class MemoryMetricsProvider(MetricsProvider):
-    def __init__(self) -> None:
-        if importlib.util.find_spec("psutil"):
-            # psutil is optional and must only be imported if it is installed
-            import psutil
-            self.process = psutil.Process()
-        else:
-            self.process = None
+    def __init__(self, process_sampler: Optional[ProcessSampler] = None) -> None:
+        self.process_sampler = process_sampler or ProcessSampler()
+
+        # The memory info fields are fixed for the platform, so the metric names are determined once. The tracemalloc
+        # metrics are always listed, as tracing may be started or stopped at any time (not necessarily by Pyctuator)
+        sample = self.process_sampler.get_sample()
+        self.metric_names = [PREFIX + field for field in sample.memory_info._fields] if sample else []
+        self.metric_names += [TRACEMALLOC_CURRENT, TRACEMALLOC_PEAK]
 
     def get_prefix(self) -> str:
         return PREFIX
 
     def get_supported_metric_names(self) -> List[str]:
-        if not self.process:
-            return []
-        keys: List[str] = list(self.process.memory_info()._asdict().keys())
-        return list(map(lambda metric: PREFIX + metric, list(keys)))
+        return self.metric_names
 
     def get_metric(self, metric_name: str) -> Metric:
         measurements: List[Measurement] = []
-        if self.process:
+        if metric_name in (TRACEMALLOC_CURRENT, TRACEMALLOC_PEAK):
+            if tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                measurements = [Measurement("VALUE", current if metric_name == TRACEMALLOC_CURRENT else peak)]
+            return Metric(metric_name, None, "bytes", measurements, [])
+
+        sample = self.process_sampler.get_sample()
+        if sample:
             name = metric_name[len(PREFIX):]
-            measurements = [Measurement("VALUE", getattr(self.process.memory_info(), name))]
+            measurements = [Measurement("VALUE", getattr(sample.memory_info, name))]
         return Metric(metric_name, None, "bytes", measurements, [])
+
+    def iter_samples(self) -> Iterator[MetricSamples]:
+        sample = self.process_sampler.get_sample()
+        if sample:
+            for name, value in sample.memory_info._asdict().items():
+                yield PREFIX + name, None, "bytes", [("VALUE", (), value)]
+
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            yield TRACEMALLOC_CURRENT, None, "bytes", [("VALUE", (), current)]
+            yield TRACEMALLOC_PEAK, None, "bytes", [("VALUE", (), peak)]
@@ -0,0 +1,147 @@
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+from pyctuator.metrics.metrics_provider import MetricsProvider, Measurement
+
+# Statistics that accumulate over time, their latest value represents a range of samples
+_CUMULATIVE_STATISTICS = {"COUNT", "TOTAL", "TOTAL_TIME"}
+
+# A sample of a metric as it is kept in the history - the sample's time and the (statistic, value) pairs
+_HistorySample = Tuple[float, Tuple[Tuple[str, float], ...]]
+
+
+@dataclass
+class MetricHistoryPoint:
+    timestamp: datetime
+    measurements: List[Measurement]
+
+
+@dataclass
+class MetricHistory:
+    name: str
+    baseUnit: str
+    points: List[MetricHistoryPoint]
+
+
+class MetricsHistory:
+    """Periodically samples all the metrics of the registered providers, keeping the recent samples of each metric.
+
+    Sampling is done by a daemon thread so reading the history never calls the providers. The samples of each metric are
+    kept in a bounded ring buffer, so the oldest samples are dropped once the buffer is full.
+    """
+
+    def __init__(self, metrics_providers: Sequence[MetricsProvider], interval_sec: float, size: int) -> None:
+        """
+        :param metrics_providers: the providers whose metrics are sampled, providers added later are sampled as well
+        :param interval_sec: how often the metrics are sampled
+        :param size: the maximal number of samples kept per metric
+        """
+        self.metrics_providers = metrics_providers
+        self.interval_sec = interval_sec
+        self.size = size
+
+        self._base_units: Dict[str, str] = {}
+        self._samples: Dict[str, Deque[_HistorySample]] = {}
+        self._schedule_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None  # The timer of the next sampling, None if sampling is stopped
+
+    def start(self) -> None:
+        """Starts sampling in the background, unless it was already started"""
+        with self._schedule_lock:
+            if self._timer is None:
+                self._schedule_next_sampling()
+
+    def stop(self) -> None:
+        """Stops sampling in the background, cancelling the next sampling (a sampling that's already running completes
+        without being waited for)"""
+        with self._schedule_lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+
+    def sample(self) -> None:
+        sample_time = time.time()
+        for provider in list(self.metrics_providers):
+            try:
+                for metric_name in provider.get_supported_metric_names():
+                    metric = provider.get_metric(metric_name)
+                    samples = self._samples.get(metric_name)
+                    if samples is None:
+                        samples = self._samples[metric_name] = deque(maxlen=self.size)
+                    self._base_units[metric_name] = metric.baseUnit
+                    samples.append((
+                        sample_time,
+                        tuple((measurement.statistic, measurement.value) for measurement in metric.measurements),
+                    ))
+            except Exception as e:  # pylint: disable=broad-except
+                logging.warning("Failed sampling the metrics of %s, %s (%s)", provider.get_prefix(), e, type(e))
+
+    def get_history(self, metric_name: str, points: Optional[int] = None) -> MetricHistory:
+        """Returns the sampled history of a metric, from the oldest to the newest sample.
+
+        :param metric_name: the name of the metric
+        :param points: if provided and smaller than the number of samples, consecutive samples are merged so this many
+         points are returned. Cumulative statistics (e.g. COUNT) are represented by their latest value, MAX by the
+         maximal value and other statistics by the average
+        :raise KeyError: if the metric is unknown or wasn't sampled yet
+        """
+        samples = self._samples.get(metric_name)
+        if samples is None:
+            raise KeyError(f"Unknown metric {metric_name}")
+
+        # Copying the samples is atomic, so it is safe while the sampling thread is appending
+        history = list(samples)
+        if points is not None and 0 < points < len(history):
+            history = [
+                _merge_samples(history[index * len(history) // points:(index + 1) * len(history) // points])
+                for index in range(points)
+            ]
+
+        return MetricHistory(
+            metric_name,
+            self._base_units[metric_name],
+            [
+                MetricHistoryPoint(
+                    datetime.fromtimestamp(sample_time),
+                    [Measurement(statistic, value) for statistic, value in measurements],
+                )
+                for sample_time, measurements in history
+            ]
+        )
+
+    def _schedule_next_sampling(self) -> None:
+        """Must be called while holding the schedule lock"""
+        self._timer = threading.Timer(self.interval_sec, self._sample_in_background)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _sample_in_background(self) -> None:
+        self.sample()
+
+        # Sampling continues unless it was stopped while sampling, even if it was started again (by another timer)
+        with self._schedule_lock:
+            if self._timer is threading.current_thread():
+                self._schedule_next_sampling()
+
+
+def _merge_samples(samples: List[_HistorySample]) -> _HistorySample:
+    values: Dict[str, List[float]] = {}
+    for _, measurements in samples:
+        for statistic, value in measurements:
+            values.setdefault(statistic, []).append(value)
+
+    merged = []
+    for statistic, statistic_values in values.items():
+        if statistic in _CUMULATIVE_STATISTICS:
+            merged.append((statistic, statistic_values[-1]))
+        elif statistic == "MAX":
+            merged.append((statistic, max(statistic_values)))
+        else:
+            merged.append((statistic, sum(statistic_values) / len(statistic_values)))
+
+    return samples[-1][0], tuple(merged)
@@ -1,7 +1,7 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Tuple
 
 
 @dataclass
@@ -21,6 +21,13 @@ class MetricTag:
     values: List[str]
 
 
+# A raw sample of a metric - the statistic, the tags as (tag, value) pairs and the value
+MetricSample = Tuple[str, Tuple[Tuple[str, str], ...], float]
+
+# The raw samples of a metric along with the metric's name, description and base unit
+MetricSamples = Tuple[str, Optional[str], str, Iterable[MetricSample]]
+
+
 @dataclass
 class Metric:
     name: str
@@ -43,3 +50,15 @@ class MetricsProvider(ABC):
     @abstractmethod
     def get_metric(self, metric_name: str) -> Metric:
         pass
+
+    def iter_samples(self) -> Iterator[MetricSamples]:
+        """Iterates over the raw samples of all the supported metrics, used when rendering all the metrics at once.
+
+        The default implementation gets each metric separately, providers may override it in order to sample all their
+        metrics at once without building a Metric per metric.
+        """
+        for metric_name in self.get_supported_metric_names():
+            metric = self.get_metric(metric_name)
+            yield metric.name, metric.description, metric.baseUnit, [
+                (measurement.statistic, (), measurement.value) for measurement in metric.measurements
+            ]
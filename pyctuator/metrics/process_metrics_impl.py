@@ -0,0 +1,47 @@
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from pyctuator.metrics.metrics_provider import MetricsProvider, Metric, Measurement, MetricSamples
+from pyctuator.metrics.process_sampler import ProcessSampler, ProcessSample
+
+PREFIX = "process."
+
+# The supported metrics - name: (description, base unit, statistic, value getter)
+_METRICS: Dict[str, Tuple[str, str, str, Callable[[ProcessSample], float]]] = {
+    PREFIX + "cpu.usage": (
+        "The recent CPU usage of the process", "ratio", "VALUE", lambda sample: sample.cpu_usage
+    ),
+    PREFIX + "cpu.time": (
+        "The CPU time used by the process", "seconds", "COUNT", lambda sample: sample.cpu_time
+    ),
+    PREFIX + "files.open": (
+        "The number of open file descriptors", "files", "VALUE", lambda sample: sample.open_files
+    ),
+    PREFIX + "uptime": (
+        "The uptime of the process", "seconds", "VALUE", lambda sample: time.time() - sample.create_time
+    ),
+}
+
+
+class ProcessMetricsProvider(MetricsProvider):
+    def __init__(self, process_sampler: Optional[ProcessSampler] = None) -> None:
+        self.process_sampler = process_sampler or ProcessSampler()
+
+    def get_prefix(self) -> str:
+        return PREFIX
+
+    def get_supported_metric_names(self) -> List[str]:
+        return list(_METRICS.keys()) if self.process_sampler.is_supported() else []
+
+    def get_metric(self, metric_name: str) -> Metric:
+        description, base_unit, statistic, get_value = _METRICS[metric_name]
+        sample = self.process_sampler.get_sample()
+        measurements = [Measurement(statistic, get_value(sample))] if sample else []
+        return Metric(metric_name, description, base_unit, measurements, [])
+
+    def iter_samples(self) -> Iterator[MetricSamples]:
+        sample = self.process_sampler.get_sample()
+        if sample:
+            for metric_name, (description, base_unit, statistic, get_value) in _METRICS.items():
+                value = get_value(sample)  # pylint: disable=not-callable
+                yield metric_name, description, base_unit, [(statistic, (), value)]
@@ -0,0 +1,77 @@
+# pylint: disable=import-outside-toplevel
+import importlib.util
+import threading
+import time
+from typing import Any, NamedTuple, Optional
+
+
+class ProcessSample(NamedTuple):
+    memory_info: Any  # psutil's pmem named-tuple, its fields are platform dependent
+    num_threads: int
+    cpu_time: float  # user and system CPU time, in seconds
+    cpu_usage: float  # CPU usage since the previous sample, between 0 and 1 (of all the CPUs)
+    open_files: int  # file descriptors on POSIX, handles on Windows
+    create_time: float  # process creation time, in seconds since the epoch
+
+
+class ProcessSampler:
+    """Samples the process' resource usage for the process related metrics providers.
+
+    All the values are read at once using psutil's `oneshot()` which avoids reading the same /proc files multiple times,
+    and the sample is reused by all the providers until it is older than the staleness window. Therefore, rendering all
+    the memory, thread and process metrics costs a single sample.
+
+    psutil is optional, if it isn't installed no samples are taken and the providers don't report any metrics.
+    """
+
+    def __init__(self, max_staleness_sec: float = 1.0) -> None:
+        """
+        :param max_staleness_sec: the maximal age of a sample before the process is sampled again
+        """
+        self.max_staleness_sec = max_staleness_sec
+        self._lock = threading.Lock()
+        self._sample: Optional[ProcessSample] = None
+        self._sample_time = 0.0
+
+        if importlib.util.find_spec("psutil"):
+            # psutil is optional and must only be imported if it is installed
+            import psutil
+            self.process = psutil.Process()
+            self.cpu_count = psutil.cpu_count() or 1
+        else:
+            self.process = None
+            self.cpu_count = 1
+
+    def is_supported(self) -> bool:
+        return self.process is not None
+
+    def get_sample(self) -> Optional[ProcessSample]:
+        if not self.process:
+            return None
+
+        sample = self._sample
+        if sample is not None and time.monotonic() - self._sample_time < self.max_staleness_sec:
+            return sample
+
+        with self._lock:
+            # Another thread may have taken a sample while this thread was waiting for the lock
+            if self._sample is not None and time.monotonic() - self._sample_time < self.max_staleness_sec:
+                return self._sample
+
+            self._sample = self._take_sample()
+            self._sample_time = time.monotonic()
+            return self._sample
+
+    def _take_sample(self) -> ProcessSample:
+        assert self.process
+        with self.process.oneshot():
+            cpu_times = self.process.cpu_times()
+            return ProcessSample(
+                self.process.memory_info(),
+                self.process.num_threads(),
+                cpu_times.user + cpu_times.system,
+                # cpu_percent compares to the previous call, it is relative to a single CPU so it's normalized to 0-1
+                self.process.cpu_percent() / 100 / self.cpu_count,
+                self.process.num_fds() if hasattr(self.process, "num_fds") else self.process.num_handles(),
+                self.process.create_time(),
+            )
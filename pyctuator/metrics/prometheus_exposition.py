@@ -0,0 +1,101 @@
+import math
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pyctuator.metrics.metrics_provider import MetricsProvider, MetricSample
+
+# Base units that are appended to the metric's name, following Prometheus' naming conventions
+_UNIT_SUFFIXES = {
+    "seconds": "_seconds",
+    "bytes": "_bytes",
+}
+
+# The statistics of timers, rendered as the samples of a single histogram (or summary, if there are no buckets)
+_TIMER_SUFFIXES = {
+    "BUCKET": "_bucket",
+    "COUNT": "_count",
+    "TOTAL_TIME": "_sum",
+}
+
+_INVALID_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_:]")
+_INVALID_LABEL_CHARS = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def render_prometheus_metrics(metrics_providers: Iterable[MetricsProvider]) -> Iterator[str]:
+    """Renders the metrics of all the providers in Prometheus' text exposition format, see
+    https://prometheus.io/docs/instrumenting/exposition_formats/#text-based-format
+
+    The metrics are rendered from the raw samples of the providers, yielding the text of one metric at a time so the
+    response can be streamed.
+    """
+    for provider in metrics_providers:
+        for metric_name, description, base_unit, samples in provider.iter_samples():
+            text = _render_metric(metric_name, description, base_unit, samples)
+            if text:
+                yield text
+
+
+# pylint: disable=too-many-locals
+def _render_metric(
+        metric_name: str,
+        description: Optional[str],
+        base_unit: str,
+        metric_samples: Iterable[MetricSample],
+) -> str:
+    name = _INVALID_NAME_CHARS.sub("_", metric_name) + _UNIT_SUFFIXES.get(base_unit, "")
+    if name[0].isdigit():
+        name = "_" + name
+
+    # Samples of the same family must be grouped together, so they are collected by family before rendering
+    families: Dict[str, Tuple[str, List[str]]] = {}
+    samples = list(metric_samples)
+    is_timer = any(statistic == "TOTAL_TIME" for statistic, _, _ in samples)
+    is_histogram = any(statistic == "BUCKET" for statistic, _, _ in samples)
+    is_single_statistic = len({statistic for statistic, _, _ in samples}) == 1
+
+    for statistic, tags, value in samples:
+        if is_timer and statistic in _TIMER_SUFFIXES:
+            family = name
+            family_type = "histogram" if is_histogram else "summary"
+            sample_name = name + _TIMER_SUFFIXES[statistic]
+        elif statistic == "VALUE" or is_single_statistic:
+            family = sample_name = name
+            family_type = "gauge"
+        else:
+            family = sample_name = name + "_" + statistic.lower()
+            family_type = "gauge"
+
+        families.setdefault(family, (family_type, []))[1].append(
+            f"{sample_name}{_render_labels(tags)} {_render_value(value)}\n"
+        )
+
+    lines: List[str] = []
+    for family, (family_type, family_samples) in families.items():
+        if description:
+            lines.append(f"# HELP {family} {_escape(description)}\n")
+        lines.append(f"# TYPE {family} {family_type}\n")
+        lines.extend(family_samples)
+    return "".join(lines)
+
+
+def _render_labels(tags: Iterable[Tuple[str, str]]) -> str:
+    labels = ",".join(
+        f'{_INVALID_LABEL_CHARS.sub("_", tag)}="{_escape(value, quotes=True)}"'
+        for tag, value in tags
+    )
+    return "{" + labels + "}" if labels else ""
+
+
+def _render_value(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _escape(text: str, quotes: bool = False) -> str:
+    text = text.replace("\\", r"\\").replace("\n", r"\n")
+    return text.replace('"', r'\"') if quotes else text
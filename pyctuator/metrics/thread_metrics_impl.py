@@ -1,28 +1,23 @@
-# pylint: disable=import-outside-toplevel
-import importlib.util
-from typing import List
+from typing import List, Optional
 
 from pyctuator.metrics.metrics_provider import MetricsProvider, Metric, Measurement
+from pyctuator.metrics.process_sampler import ProcessSampler
 
 PREFIX = "thread."
 THREAD_COUNT = PREFIX + "count"
 
 
 class ThreadMetricsProvider(MetricsProvider):
-    def __init__(self) -> None:
-        if importlib.util.find_spec("psutil"):
-            # psutil is optional and must only be imported if it is installed
-            import psutil
-            self.process = psutil.Process()
-        else:
-            self.process = None
+    def __init__(self, process_sampler: Optional[ProcessSampler] = None) -> None:
+        self.process_sampler = process_sampler or ProcessSampler()
 
     def get_prefix(self) -> str:
         return PREFIX
 
     def get_supported_metric_names(self) -> List[str]:
-        return [THREAD_COUNT] if self.process else []
+        return [THREAD_COUNT] if self.process_sampler.is_supported() else []
 
     def get_metric(self, metric_name: str) -> Metric:
-        measurements = [Measurement("COUNT", self.process.num_threads())] if self.process else []
+        sample = self.process_sampler.get_sample()
+        measurements = [Measurement("COUNT", sample.num_threads)] if sample else []
         return Metric(metric_name, None, "Integer", measurements, [])
@@ -4,7 +4,7 @@ import importlib.util
 import logging
 import ssl
 from datetime import datetime, timezone
-from typing import Any, Optional, Dict, Callable
+from typing import Any, Optional, Dict, Callable, Iterable
 
 # A note about imports: this module ensure that only relevant modules are imported.
 # For example, if the webapp is a Flask webapp, we do not want to import FastAPI, and vice versa.
@@ -14,9 +14,16 @@ from pyctuator.auth import Auth
 from pyctuator.endpoints import Endpoints
 from pyctuator.environment.custom_environment_provider import CustomEnvironmentProvider
 from pyctuator.environment.os_env_variables_impl import OsEnvironmentVariableProvider
+from pyctuator.health.cached_health_provider import CachedHealthProvider
+from pyctuator.health.composite_health_provider import CompositeHealthProvider
 from pyctuator.health.diskspace_health_impl import DiskSpaceHealthProvider
+from pyctuator.health.health_checker import HealthChecker, ConcurrentHealthChecker
 from pyctuator.health.health_provider import HealthProvider
+from pyctuator.httptrace.trace_policy import TracePolicy
+from pyctuator.metrics.logfile_metrics_impl import LogfileQueueMetricsProvider
 from pyctuator.metrics.memory_metrics_impl import MemoryMetricsProvider
+from pyctuator.metrics.process_metrics_impl import ProcessMetricsProvider
+from pyctuator.metrics.process_sampler import ProcessSampler
 from pyctuator.metrics.thread_metrics_impl import ThreadMetricsProvider
 from pyctuator.impl.pyctuator_impl import PyctuatorImpl, AppInfo, BuildInfo, GitInfo, GitCommitInfo, AppDetails
 from pyctuator.impl.spring_boot_admin_registration import BootAdminRegistrationHandler
@@ -24,6 +31,17 @@ from pyctuator.impl.spring_boot_admin_registration import BootAdminRegistrationH
 default_logfile_format = '%(asctime)s  %(levelname)-5s %(process)d -- [%(threadName)s] %(module)s: %(message)s'
 
 
+def _stop_health_providers(health_providers: Iterable[HealthProvider]) -> None:
+    """Stops the background work of the health providers, including providers nested in cached and composite ones"""
+    for health_provider in health_providers:
+        if isinstance(health_provider, CachedHealthProvider):
+            health_provider.stop()
+            _stop_health_providers([health_provider.health_provider])
+        elif isinstance(health_provider, CompositeHealthProvider):
+            health_provider.health_checker.stop()
+            _stop_health_providers(health_provider.health_providers)
+
+
 class Pyctuator:
     # pylint: disable=too-many-locals
     def __init__(
@@ -45,6 +63,17 @@ class Pyctuator:
             ssl_context: Optional[ssl.SSLContext] = None,
             customizer: Optional[Callable] = None,
             disabled_endpoints: Endpoints = Endpoints.NONE,
+            health_check_max_workers: int = 0,
+            health_check_timeout_sec: Optional[float] = None,
+            trace_policy: Optional[TracePolicy] = None,
+            httptrace_capacity: int = 100,
+            process_metrics_max_staleness_sec: float = 1.0,
+            metrics_history_interval_sec: Optional[float] = None,
+            metrics_history_size: int = 360,
+            logfile_queue_size: int = 0,
+            logfile_path: Optional[str] = None,
+            thread_dump_max_depth: Optional[int] = None,
+            max_concurrent_profiles: int = 1,
     ) -> None:
         """The entry point for integrating pyctuator with a web-frameworks such as FastAPI and Flask.
 
@@ -87,11 +116,35 @@ class Pyctuator:
          framework specific. For FastAPI, the function receives pyctuator's APIRouter allowing to add "dependencies" and
          anything else that's provided by the router. See fastapi_with_authentication_example_app.py
          :param disabled_endpoints: optional set of endpoints (such as /pyctuator/health) that should be disabled
+        :param health_check_max_workers: if positive, health providers are checked concurrently using a pool of up to
+         this many threads instead of one after the other
+        :param health_check_timeout_sec: when checking health concurrently, providers that don't complete within this
+         many seconds are reported as UNKNOWN with a "timeout" failure rather than delaying the health response
+        :param trace_policy: optional policy for selecting which requests are recorded as HTTP traces, see TracePolicy
+         for sampling and filtering traces by path and status code. By default, all requests are traced
+        :param httptrace_capacity: the number of most recent HTTP traces that are kept in memory
+        :param process_metrics_max_staleness_sec: the memory, thread and process metrics are served from a single sample
+         of the process which is reused for up to this many seconds
+        :param metrics_history_interval_sec: if provided, all the metrics are sampled in the background every this many
+         seconds, and their recent history is available from /pyctuator/metrics/{name}/history
+        :param metrics_history_size: the number of samples kept in the history of each metric
+        :param logfile_queue_size: if positive, log records are queued (up to this many) and appended to the logfile by
+         a background thread rather than by the logging thread, records logged while the queue is full are dropped and
+         counted by the "logfile.queue.dropped" metric
+        :param logfile_path: optional path of a log file (e.g. the file of a RotatingFileHandler) to serve from the
+         logfile endpoint instead of keeping the log messages in memory, logfile_max_size limits the bytes per response
+        :param thread_dump_max_depth: if provided, the thread dump includes only the innermost frames (up to this many)
+         of each thread
+        :param max_concurrent_profiles: the maximal number of profiles (see /pyctuator/profile) that can be taken at
+         once, requests for more profiles are rejected with status 429
         """
 
         self.auto_deregister = auto_deregister
         start_time = datetime.now(timezone.utc)
 
+        self.health_checker = ConcurrentHealthChecker(health_check_max_workers, health_check_timeout_sec) \
+            if health_check_max_workers > 0 else HealthChecker()
+
         # Instantiate an instance of PyctuatorImpl which abstracts the state and logic of the pyctuator
         self.pyctuator_impl = PyctuatorImpl(
             AppInfo(app=AppDetails(name=app_name, description=app_description)),
@@ -100,13 +153,31 @@ class Pyctuator:
             logfile_formatter,
             additional_app_info,
             disabled_endpoints,
+            self.health_checker,
+            trace_policy,
+            httptrace_capacity,
+            metrics_history_interval_sec,
+            metrics_history_size,
+            logfile_queue_size,
+            logfile_path,
+            thread_dump_max_depth,
+            max_concurrent_profiles,
         )
 
         # Register default health/metrics/environment providers
         self.pyctuator_impl.register_environment_provider(OsEnvironmentVariableProvider())
         self.pyctuator_impl.register_health_providers(DiskSpaceHealthProvider(free_disk_space_down_threshold_bytes))
-        self.pyctuator_impl.register_metrics_provider(MemoryMetricsProvider())
-        self.pyctuator_impl.register_metrics_provider(ThreadMetricsProvider())
+        process_sampler = ProcessSampler(process_metrics_max_staleness_sec)
+        self.pyctuator_impl.register_metrics_provider(MemoryMetricsProvider(process_sampler))
+        self.pyctuator_impl.register_metrics_provider(ThreadMetricsProvider(process_sampler))
+        self.pyctuator_impl.register_metrics_provider(ProcessMetricsProvider(process_sampler))
+        self.pyctuator_impl.register_metrics_provider(self.pyctuator_impl.http_requests_metrics)
+        if self.pyctuator_impl.logfile.queue_handler:
+            self.pyctuator_impl.register_metrics_provider(
+                LogfileQueueMetricsProvider(self.pyctuator_impl.logfile.queue_handler)
+            )
+        if self.pyctuator_impl.metrics_history:
+            self.pyctuator_impl.metrics_history.start()
 
         self.boot_admin_registration_handler: Optional[BootAdminRegistrationHandler] = None
 
@@ -119,7 +190,10 @@ class Pyctuator:
         if not root_logger.hasHandlers():
             logging.info("Logging not configured, using logging.basicConfig()")
 
-        root_logger.addHandler(self.pyctuator_impl.logfile.log_messages)
+        logfile_handler = self.pyctuator_impl.logfile.get_handler()
+        if logfile_handler:
+            root_logger.addHandler(logfile_handler)
+            self.pyctuator_impl.logfile.start()
 
         # Find and initialize an integration layer between the web-framework adn pyctuator
         framework_integrations: Dict[str, Callable[[Any, PyctuatorImpl, Optional[Callable], Endpoints], bool]] = {
@@ -159,6 +233,11 @@ class Pyctuator:
                                "(is it properly installed and imported?)")
 
     def stop(self) -> None:
+        self.health_checker.stop()
+        _stop_health_providers(self.pyctuator_impl.health_providers)
+        if self.pyctuator_impl.metrics_history:
+            self.pyctuator_impl.metrics_history.stop()
+        self.pyctuator_impl.logfile.stop()
         if self.boot_admin_registration_handler:
             self.boot_admin_registration_handler.stop()
         self.boot_admin_registration_handler = None
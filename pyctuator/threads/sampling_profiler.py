@@ -0,0 +1,213 @@
+import json
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from types import CodeType, FrameType
+from typing import Dict, List, Optional, Tuple
+
+from pyctuator.threads.thread_dump_provider import ThreadDumpProvider
+
+MAX_PROFILE_SECONDS = 60.0
+DEFAULT_PROFILE_SECONDS = 10.0
+MAX_PROFILE_HZ = 250.0
+DEFAULT_PROFILE_HZ = 100.0
+
+# The maximal number of frames sampled per stack, the outermost frames of deeper stacks aren't sampled
+MAX_PROFILE_STACK_DEPTH = 256
+
+# The maximal share of the time the profiler may spend sampling (while holding the GIL), the sampling rate is lowered
+# if sampling all the threads takes longer than this share of the sampling interval
+MAX_SAMPLING_TIME_SHARE = 0.1
+
+PROFILE_FORMATS = ("folded", "speedscope")
+
+# The id of a sampled thread and the code objects of the sampled stack's frames, from the outermost
+_SampledStack = Tuple[int, Tuple[CodeType, ...]]
+
+
+@dataclass
+class ProfiledFrame:
+    name: str  # The method's name, prefixed by its class name if known
+    file: str
+    line: int  # The first line of the method
+
+
+@dataclass
+class Profile:
+    durationSeconds: float
+    samples: int  # The number of times all the threads were sampled
+    frames: List[ProfiledFrame]
+    # The number of times each stack was sampled, per thread name - stacks are the indices of their frames in `frames`,
+    # from the outermost frame
+    stacks: Dict[str, Dict[Tuple[int, ...], int]]
+
+
+class SamplingProfiler:
+    """Profiles the application by periodically sampling the stacks of all the threads, and counting how many times
+    each stack was sampled.
+
+    The sampling is done by a background thread for the requested duration, the rate and duration of the sampling are
+    limited (see MAX_PROFILE_HZ and MAX_PROFILE_SECONDS) and the rate is lowered if sampling takes too long (see
+    MAX_SAMPLING_TIME_SHARE). Only max_concurrent_profiles profiles may be taken at once.
+    """
+
+    def __init__(self, thread_dump_provider: ThreadDumpProvider, max_concurrent_profiles: int = 1) -> None:
+        """
+        :param thread_dump_provider: resolves the names of the sampled frames, reusing the code details cached for
+         thread dumps
+        :param max_concurrent_profiles: the maximal number of profiles that can be taken at once
+        """
+        self.thread_dump_provider = thread_dump_provider
+        self._profiles = threading.BoundedSemaphore(max_concurrent_profiles)
+
+    def start_profile(self, seconds: Optional[float] = None, hz: Optional[float] = None) -> "Optional[Future[Profile]]":
+        """Starts sampling the threads in the background, returns None if too many profiles are already being taken.
+
+        :param seconds: the duration of the profile, limited to MAX_PROFILE_SECONDS
+        :param hz: the number of times per second the threads are sampled, limited to MAX_PROFILE_HZ
+        """
+        # Released by the profiling thread once the profile is done
+        if not self._profiles.acquire(blocking=False):  # pylint: disable=consider-using-with
+            return None
+
+        profile: "Future[Profile]" = Future()
+        seconds = DEFAULT_PROFILE_SECONDS if seconds is None else max(0.0, min(seconds, MAX_PROFILE_SECONDS))
+        hz = DEFAULT_PROFILE_HZ if hz is None else max(1.0, min(hz, MAX_PROFILE_HZ))
+        threading.Thread(
+            target=self._profile,
+            args=(profile, seconds, 1 / hz),
+            name="pyctuator-profiler",
+            daemon=True,
+        ).start()
+        return profile
+
+    def _profile(self, profile: "Future[Profile]", seconds: float, interval: float) -> None:
+        # The profile's slot is released before its result is set, so another profile can be taken once it's returned
+        try:
+            started = time.monotonic()
+            stack_counts, samples, thread_names = _sample_stacks(started + seconds, interval)
+            result = self._build_profile(stack_counts, samples, thread_names, time.monotonic() - started)
+        except Exception as e:  # pylint: disable=broad-except
+            self._profiles.release()
+            profile.set_exception(e)
+        else:
+            self._profiles.release()
+            profile.set_result(result)
+
+    def _build_profile(
+            self,
+            stack_counts: Dict[_SampledStack, int],
+            samples: int,
+            thread_names: Dict[int, str],
+            duration: float,
+    ) -> Profile:
+        frame_indices: Dict[CodeType, int] = {}
+        frames: List[ProfiledFrame] = []
+        stacks: Dict[str, Dict[Tuple[int, ...], int]] = {}
+        for (thread_id, codes), count in stack_counts.items():
+            stack = []
+            for code in codes:
+                frame_index = frame_indices.get(code)
+                if frame_index is None:
+                    frame_index = frame_indices[code] = len(frames)
+                    frames.append(self._build_frame(code))
+                stack.append(frame_index)
+
+            # Threads having the same name are merged
+            thread_stacks = stacks.setdefault(thread_names[thread_id], {})
+            thread_stacks[tuple(stack)] = thread_stacks.get(tuple(stack), 0) + count
+
+        return Profile(duration, samples, frames, stacks)
+
+    def _build_frame(self, code: CodeType) -> ProfiledFrame:
+        stack_frame = self.thread_dump_provider.build_stack_frame(code, code.co_firstlineno)
+        name = f"{stack_frame.className}.{stack_frame.methodName}" if stack_frame.className else stack_frame.methodName
+        return ProfiledFrame(name, stack_frame.fileName, stack_frame.lineNumber)
+
+
+def render_profile(profile: Profile, profile_format: str) -> str:
+    """Renders the profile in one of the PROFILE_FORMATS:
+    * folded - the collapsed stacks format of flamegraph.pl, a line per stack holding the thread name and the stack's
+      frames separated by semicolons, followed by the number of times the stack was sampled
+    * speedscope - the JSON file format of https://www.speedscope.app, a sampled profile per thread
+    """
+    if profile_format == "folded":
+        return _render_folded(profile)
+    if profile_format == "speedscope":
+        return _render_speedscope(profile)
+    raise ValueError(f"Unknown profile format {profile_format}, expected one of {', '.join(PROFILE_FORMATS)}")
+
+
+def _render_folded(profile: Profile) -> str:
+    labels = [f"{frame.name} ({frame.file}:{frame.line})".replace(";", ":") for frame in profile.frames]
+    lines = []
+    for thread_name, stacks in profile.stacks.items():
+        thread_label = thread_name.replace(";", ":")
+        for stack, count in stacks.items():
+            lines.append(";".join([thread_label, *(labels[frame_index] for frame_index in stack)]) + f" {count}")
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def _render_speedscope(profile: Profile) -> str:
+    interval = profile.durationSeconds / profile.samples if profile.samples else 0
+    profiles = []
+    for thread_name, stacks in profile.stacks.items():
+        weights = [count * interval for count in stacks.values()]
+        profiles.append({
+            "type": "sampled",
+            "name": thread_name,
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": [list(stack) for stack in stacks],
+            "weights": weights,
+        })
+
+    frames = [{"name": frame.name, "file": frame.file, "line": frame.line} for frame in profile.frames]
+    return json.dumps({
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": profiles,
+        "name": "pyctuator profile",
+        "activeProfileIndex": 0,
+        "exporter": "pyctuator",
+    })
+
+
+def _sample_stacks(deadline: float, interval: float) -> Tuple[Dict[_SampledStack, int], int, Dict[int, str]]:
+    """Samples the stacks of all the threads, except the calling thread, until the deadline. Returns the number of times
+    each stack was sampled, the number of samples and the names of the sampled threads"""
+    profiler_thread_id = threading.get_ident()
+    stack_counts: Dict[_SampledStack, int] = {}
+    thread_names: Dict[int, str] = {}
+    samples = 0
+
+    now = time.monotonic()
+    while now < deadline:
+        for thread_id, thread_frame in sys._current_frames().items():  # pylint: disable=protected-access
+            if thread_id == profiler_thread_id:
+                continue
+
+            codes: List[CodeType] = []
+            frame: Optional[FrameType] = thread_frame
+            while frame is not None and len(codes) < MAX_PROFILE_STACK_DEPTH:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            codes.reverse()
+
+            stack = (thread_id, tuple(codes))
+            stack_counts[stack] = stack_counts.get(stack, 0) + 1
+            if thread_id not in thread_names:
+                # The names are collected while sampling as threads may exit before the profile ends
+                thread_names.update((thread.ident, thread.name) for thread in threading.enumerate() if thread.ident)
+                thread_names.setdefault(thread_id, str(thread_id))
+        samples += 1
+
+        sampled = time.monotonic()
+        wait = max(interval - (sampled - now), (sampled - now) * (1 / MAX_SAMPLING_TIME_SHARE - 1))
+        time.sleep(max(0.0, min(wait, deadline - sampled)))
+        now = time.monotonic()
+
+    return stack_counts, samples, thread_names
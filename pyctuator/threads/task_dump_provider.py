@@ -0,0 +1,134 @@
+import asyncio
+import os
+import sys
+import time
+import weakref
+from dataclasses import dataclass
+from datetime import datetime
+from types import CodeType, FrameType
+from typing import Any, Iterator, List, Optional
+
+from pyctuator.threads.thread_dump_provider import StackFrame, ThreadDumpProvider
+
+_ASYNCIO_DIR = os.path.dirname(asyncio.__file__)
+
+
+@dataclass
+class TaskInfo:
+    taskName: str
+    taskState: str
+    coroutineName: str
+    createdAt: Optional[datetime]
+    ageSeconds: Optional[float]
+    creationSite: Optional[StackFrame]
+    stackTrace: List[StackFrame]
+
+
+@dataclass
+class TaskDump:
+    tasks: List[TaskInfo]
+
+
+class _TaskOrigin:
+    """The creation time of a task and the frame that created it, resolved to a stack frame only when it's dumped"""
+
+    __slots__ = ("created", "code", "line_number")
+
+    def __init__(self, created: float, code: CodeType, line_number: int) -> None:
+        self.created = created
+        self.code = code
+        self.line_number = line_number
+
+
+class TaskDumpProvider:
+    """Provides the coroutine stacks of the asyncio tasks of an event loop.
+
+    The creation time and site of tasks are only known for tasks that were created after the loop was tracked (see
+    `track_tasks`) as asyncio doesn't keep them.
+
+    Dumping the tasks must be done by the event loop's thread, as the tasks are only consistent while the loop isn't
+    running them.
+    """
+
+    def __init__(self, thread_dump_provider: ThreadDumpProvider) -> None:
+        """
+        :param thread_dump_provider: builds the tasks' stack traces, so the code details cached for thread dumps are
+         reused (as is its depth limit)
+        """
+        self.thread_dump_provider = thread_dump_provider
+        self._task_origins: "weakref.WeakKeyDictionary[asyncio.Task, _TaskOrigin]" = weakref.WeakKeyDictionary()
+        self._tracked_loops: "weakref.WeakSet[asyncio.AbstractEventLoop]" = weakref.WeakSet()
+
+    def track_tasks(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Installs a task factory on the loop, recording the creation time and site of the loop's new tasks. The loop's
+        existing task factory, if any, still creates the tasks"""
+        if loop in self._tracked_loops:
+            return
+        self._tracked_loops.add(loop)
+
+        create_task = loop.get_task_factory()
+        task_origins = self._task_origins
+
+        def task_factory(loop: asyncio.AbstractEventLoop, coro: Any, **kwargs: Any) -> asyncio.Future:
+            task = create_task(loop, coro, **kwargs) if create_task else asyncio.Task(coro, loop=loop, **kwargs)
+
+            # The task was created by the first frame which isn't of asyncio (e.g. asyncio.create_task)
+            frame: Optional[FrameType] = sys._getframe(1)  # pylint: disable=protected-access
+            while frame is not None and frame.f_code.co_filename.startswith(_ASYNCIO_DIR):
+                frame = frame.f_back
+            if isinstance(task, asyncio.Task) and frame is not None:
+                task_origins[task] = _TaskOrigin(time.time(), frame.f_code, frame.f_lineno)
+            return task
+
+        loop.set_task_factory(task_factory)
+
+    def iter_tasks(self, loop: asyncio.AbstractEventLoop) -> Iterator[TaskInfo]:
+        """Dumps the loop's pending tasks one at a time, must be called by the loop's thread.
+
+        The loop may run between the tasks when they're streamed, so tasks which are done by the time they're reached
+        are skipped rather than dumped with an empty stack.
+        """
+        self.track_tasks(loop)
+        current_task = asyncio.current_task(loop)
+        for task in list(asyncio.all_tasks(loop)):
+            if not task.done():
+                yield self._extract_task_info(task, task is current_task)
+
+    def get_task_dump(self, loop: asyncio.AbstractEventLoop) -> TaskDump:
+        return TaskDump(list(self.iter_tasks(loop)))
+
+    def _extract_task_info(self, task: asyncio.Task, is_current: bool) -> TaskInfo:
+        coro = task.get_coro()
+        origin = self._task_origins.get(task)
+        creation_site = self.thread_dump_provider.build_stack_frame(origin.code, origin.line_number) if origin else None
+        return TaskInfo(
+            taskName=task.get_name(),
+            taskState=_get_task_state(task, is_current),
+            coroutineName=getattr(coro, "__qualname__", type(coro).__name__),
+            createdAt=datetime.fromtimestamp(origin.created) if origin else None,
+            ageSeconds=time.time() - origin.created if origin else None,
+            creationSite=creation_site,
+            stackTrace=self.thread_dump_provider.build_stack_trace(_walk_awaits(coro)),
+        )
+
+
+def _get_task_state(task: asyncio.Task, is_current: bool) -> str:
+    if is_current:
+        return "RUNNING"
+    if sys.version_info >= (3, 11) and task.cancelling():
+        return "CANCELLING"
+    return "PENDING"
+
+
+def _walk_awaits(coro: Any) -> List[FrameType]:
+    """Returns the frames of the coroutine and of the coroutines (or generators) it awaits, from the innermost"""
+    frames: List[FrameType] = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) \
+            or getattr(coro, "ag_await", None)
+    frames.reverse()
+    return frames
@@ -0,0 +1,60 @@
+# pylint: disable=import-outside-toplevel
+import importlib.util
+import os
+from typing import Dict, Optional
+
+_PROC_TASKS_DIR = "/proc/self/task"
+
+
+class ThreadCpuSampler:
+    """Samples the CPU time consumed by each of the process' threads, keyed by the thread's native id (see
+    `threading.Thread.native_id`).
+
+    The CPU times are read using psutil's `threads()` if psutil is installed, otherwise they're read from
+    /proc/self/task on Linux. If neither is available no samples are taken.
+    """
+
+    def __init__(self) -> None:
+        self._clock_ticks: Optional[int] = None
+        if importlib.util.find_spec("psutil"):
+            # psutil is optional and must only be imported if it is installed
+            import psutil
+            self.process = psutil.Process()
+            self._psutil_error = psutil.Error
+        else:
+            self.process = None
+            if os.path.isdir(_PROC_TASKS_DIR):
+                self._clock_ticks = os.sysconf("SC_CLK_TCK")
+
+    def is_supported(self) -> bool:
+        return self.process is not None or self._clock_ticks is not None
+
+    def sample(self) -> Dict[int, float]:
+        """Returns the user and system CPU time, in seconds, consumed by each thread since it started"""
+        if self.process:
+            try:
+                return {thread.id: thread.user_time + thread.system_time for thread in self.process.threads()}
+            except self._psutil_error:
+                # Some platforms require elevated privileges to list the threads of a process
+                return {}
+
+        if self._clock_ticks:
+            return _read_proc_cpu_times(self._clock_ticks)
+
+        return {}
+
+
+def _read_proc_cpu_times(clock_ticks: int) -> Dict[int, float]:
+    cpu_times = {}
+    for task in os.listdir(_PROC_TASKS_DIR):
+        try:
+            with open(os.path.join(_PROC_TASKS_DIR, task, "stat"), "rb") as stat_file:
+                stat = stat_file.read()
+        except OSError:
+            continue  # The thread has exited since the tasks were listed
+
+        # The thread's name is in parentheses and may contain spaces, so the fields are counted from its end - utime and
+        # stime are the 14th and 15th fields, following the 3rd field (the state) which follows the name
+        fields = stat[stat.rindex(b")") + 2:].split()
+        cpu_times[int(task)] = (int(fields[11]) + int(fields[12])) / clock_ticks
+    return cpu_times
@@ -1,9 +1,20 @@
+import asyncio
+import os
 import sys
 import threading
+import time
 from threading import Thread
 from dataclasses import dataclass
-from pathlib import Path
-from typing import List, Dict, Any, Optional
+from types import CodeType, FrameType
+from itertools import islice
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator
+
+from pyctuator.threads.thread_cpu_sampler import ThreadCpuSampler
+
+# The maximal number of seconds the CPU usage of threads is sampled for, when looking for hot threads
+MAX_HOT_THREADS_INTERVAL_SEC = 10.0
+DEFAULT_HOT_THREADS_INTERVAL_SEC = 0.5
+DEFAULT_HOT_THREADS_LIMIT = 3
 
 
 @dataclass
@@ -15,13 +26,16 @@ class StackFrame:
     nativeMethod: bool
 
 
+# pylint: disable=too-many-instance-attributes
 @dataclass
 class ThreadInfo:
     threadName: str
     threadId: Optional[int]
+    nativeThreadId: Optional[int]
     daemon: bool
     suspended: bool
     threadState: str
+    cpuTimeSeconds: Optional[float]  # The CPU time consumed by the thread since it started, if it can be sampled
     stackTrace: List[StackFrame]
 
 
@@ -30,53 +44,208 @@ class ThreadDump:
     threads: List[ThreadInfo]
 
 
+@dataclass
+class HotThreadInfo:
+    threadName: str
+    threadId: Optional[int]
+    nativeThreadId: Optional[int]
+    threadState: str
+    cpuTimeSeconds: float  # The CPU time consumed by the thread during the interval
+    cpuUsage: float  # The share of a single CPU used by the thread during the interval, between 0 and 1
+    stackTrace: List[StackFrame]
+
+
+@dataclass
+class HotThreads:
+    intervalSeconds: float
+    threads: List[HotThreadInfo]
+
+
+# The method name, file name and class name (if it can be determined from the code alone) of a code object, and the
+# state of a thread whose innermost frame runs the code if it's one of the known blocking primitives
+_CodeSummary = Tuple[str, str, Optional[str], Optional[str]]
+
+# Since Python 3.11 the class of a method can be determined from its code's qualified name
+_HAS_QUALIFIED_NAMES = sys.version_info >= (3, 11)
+
+# The standard library's functions that block, by file name and method name. Functions implemented in C (e.g. sleep or
+# a socket's recv) have no frame of their own, so a thread blocked in them can't be recognized by its innermost frame
+_STDLIB_DIR = os.path.dirname(threading.__file__)
+_BLOCKING_STATES = {
+    **{("threading.py", name): "WAITING" for name in ("wait", "acquire", "join", "_wait_for_tstate_lock")},
+    ("selectors.py", "select"): "BLOCKED",
+    **{("socket.py", name): "BLOCKED" for name in ("accept", "readinto", "create_connection")},
+    **{("ssl.py", name): "BLOCKED" for name in ("read", "recv", "recv_into", "do_handshake")},
+    **{("subprocess.py", name): "BLOCKED" for name in ("_try_wait", "_communicate")},
+}
+
+
 class ThreadDumpProvider:
+    """Provides the stack traces of all the threads.
+
+    The details of each frame that depend only on its code (i.e. the method, file and class names) are cached per code
+    object, so dumping many threads with deep stacks mostly costs walking the frames.
+
+    The state of each thread is determined by its innermost frame - a thread waiting for a lock, a condition, an event,
+    a queue or another thread is WAITING, and a thread waiting for I/O (e.g. in a selector, or reading from a socket) is
+    BLOCKED. Any other thread is RUNNABLE, though its CPU time may tell it's actually idle (see `get_hot_threads`).
+    """
+
+    # The maximal number of code objects whose summary is cached, the cache is cleared when it's exceeded
+    max_cached_code_summaries = 10000
+
+    def __init__(self, max_depth: Optional[int] = None) -> None:
+        """
+        :param max_depth: if provided, only the innermost max_depth frames of each thread are dumped
+        """
+        self.max_depth = max_depth
+        self.cpu_sampler = ThreadCpuSampler()
+        self._code_summaries: Dict[CodeType, _CodeSummary] = {}
 
     # pylint: disable=protected-access
     def get_thread_dump(self) -> ThreadDump:
+        cpu_times = self.cpu_sampler.sample()
         frames: Dict[Any, Any] = sys._current_frames()
         return ThreadDump([
-            self._extract_thread_info(frames, thread)
+            self._extract_thread_info(frames, cpu_times, thread)
             for thread in threading.enumerate()
         ])
 
-    def _extract_thread_info(self, frames: Dict[Any, Any], thread: Thread) -> ThreadInfo:
+    def get_hot_threads(self, interval: Optional[float] = None, limit: Optional[int] = None) -> HotThreads:
+        """Samples the CPU time of the threads twice, and returns the threads that consumed the most CPU time in between
+        along with their stack traces (as of the second sample). Blocks the calling thread for the interval.
+
+        :param interval: the number of seconds between the samples, limited to MAX_HOT_THREADS_INTERVAL_SEC
+        :param limit: the maximal number of threads returned
+        """
+        cpu_times = self.cpu_sampler.sample()
+        started = time.monotonic()
+        time.sleep(self._get_hot_threads_interval(interval))
+        return self._rank_hot_threads(cpu_times, time.monotonic() - started, limit)
+
+    async def get_hot_threads_async(self, interval: Optional[float] = None, limit: Optional[int] = None) -> HotThreads:
+        """Same as `get_hot_threads`, but waits for the interval without blocking the event loop"""
+        cpu_times = self.cpu_sampler.sample()
+        started = time.monotonic()
+        await asyncio.sleep(self._get_hot_threads_interval(interval))
+        return self._rank_hot_threads(cpu_times, time.monotonic() - started, limit)
+
+    def _rank_hot_threads(self, cpu_times: Dict[int, float], interval: float, limit: Optional[int]) -> HotThreads:
+        hot_threads = []
+        for thread_info in self.get_thread_dump().threads:
+            if thread_info.nativeThreadId not in cpu_times or thread_info.cpuTimeSeconds is None:
+                continue  # The thread started during the interval, or its CPU time can't be sampled
+
+            cpu_time = max(0.0, thread_info.cpuTimeSeconds - cpu_times[thread_info.nativeThreadId])
+            thread_state = thread_info.threadState
+            if thread_state == "RUNNABLE" and cpu_time == 0 and thread_info.threadId != threading.get_ident():
+                # The thread isn't in a known blocking primitive but didn't run, e.g. it sleeps or blocks in native code
+                thread_state = "TIMED_WAITING"
+
+            hot_threads.append(HotThreadInfo(
+                threadName=thread_info.threadName,
+                threadId=thread_info.threadId,
+                nativeThreadId=thread_info.nativeThreadId,
+                threadState=thread_state,
+                cpuTimeSeconds=cpu_time,
+                cpuUsage=min(1.0, cpu_time / interval) if interval > 0 else 0.0,
+                stackTrace=thread_info.stackTrace,
+            ))
+
+        hot_threads.sort(key=lambda hot_thread: hot_thread.cpuTimeSeconds, reverse=True)
+        return HotThreads(interval, hot_threads[:DEFAULT_HOT_THREADS_LIMIT if limit is None else max(0, limit)])
+
+    def _extract_thread_info(self, frames: Dict[Any, Any], cpu_times: Dict[int, float], thread: Thread) -> ThreadInfo:
+        frame = frames.get(thread.ident)
         return ThreadInfo(
             threadName=thread.name,
             threadId=thread.ident,
+            nativeThreadId=thread.native_id,
             daemon=thread.daemon,
             suspended=not thread.is_alive(),
-            threadState=self._calc_thread_state(thread),
-            stackTrace=self._build_thread_stack_trace(thread, frames),
+            threadState=self._calc_thread_state(thread, frame),
+            cpuTimeSeconds=cpu_times.get(thread.native_id) if thread.native_id is not None else None,
+            stackTrace=self.build_stack_trace(_walk_back(frame)),
         )
 
-    def _build_thread_stack_trace(self, thread: Thread, frames: Dict[Any, Any]) -> List[StackFrame]:
-
-        def guess_class_name() -> Optional[str]:
-            """
-            Tries to find a class name if one exists.
-            Fails if the frame is not in a class, or if the method does not call itself "self"
-            Does not support static and class methods.
-            """
-            try:
-                return str(frame.f_locals["self"].__class__.__name__)
-            except KeyError:
-                return None
-
-        stack_frames = []
-        frame = frames[thread.ident] if thread.ident in frames else None
-        while frame is not None:
-            stack_frames.append(StackFrame(
-                methodName=frame.f_code.co_name,
-                fileName=Path(frame.f_code.co_filename).name,
-                lineNumber=frame.f_lineno,
-                className=guess_class_name(),
-                nativeMethod=False
-            ))
-            frame = frame.f_back  # move one frame back
-        return stack_frames
+    def build_stack_trace(self, frames: Iterable[FrameType]) -> List[StackFrame]:
+        """Builds the stack trace of the frames, which are ordered from the innermost frame, limited to max_depth
+        frames"""
+        if len(self._code_summaries) > self.max_cached_code_summaries:
+            self._code_summaries.clear()
+
+        return [
+            self.build_stack_frame(frame.f_code, frame.f_lineno, frame)
+            for frame in (frames if self.max_depth is None else islice(frames, self.max_depth))
+        ]
+
+    def build_stack_frame(self, code: CodeType, line_number: int, frame: Optional[FrameType] = None) -> StackFrame:
+        """Builds the stack frame of a line in the code, the frame (if provided) is used to guess the class name before
+        Python 3.11"""
+        method_name, file_name, class_name, _ = self._get_code_summary(code)
+
+        return StackFrame(
+            methodName=method_name,
+            fileName=file_name,
+            lineNumber=line_number,
+            className=class_name if class_name or _HAS_QUALIFIED_NAMES or not frame else _guess_class_name(frame),
+            nativeMethod=False
+        )
 
-    def _calc_thread_state(self, thread: threading.Thread) -> str:
+    def _get_code_summary(self, code: CodeType) -> _CodeSummary:
+        code_summary = self._code_summaries.get(code)
+        if code_summary is None:
+            code_summary = self._code_summaries[code] = _summarize_code(code)
+        return code_summary
+
+    def _calc_thread_state(self, thread: threading.Thread, frame: Optional[FrameType]) -> str:
         if thread.ident and thread.ident < 0:
             return "NEW"
+        if frame is not None:
+            blocking_state = self._get_code_summary(frame.f_code)[3]
+            if blocking_state:
+                return blocking_state
         return "RUNNABLE"
+
+    def _get_hot_threads_interval(self, interval: Optional[float]) -> float:
+        if interval is None:
+            return DEFAULT_HOT_THREADS_INTERVAL_SEC
+        return max(0.0, min(interval, MAX_HOT_THREADS_INTERVAL_SEC))
+
+
+def _walk_back(frame: Optional[FrameType]) -> Iterator[FrameType]:
+    while frame is not None:
+        yield frame
+        frame = frame.f_back  # move one frame back
+
+
+def _summarize_code(code: CodeType) -> _CodeSummary:
+    # The qualified name (Python 3.11+) of a method includes its class, e.g. "Class.method", unlike the name of a
+    # function defined in another function, e.g. "function.<locals>.inner"
+    class_name = None
+    if sys.version_info >= (3, 11):
+        names = code.co_qualname.split(".")
+        if len(names) > 1 and names[-2] != "<locals>":
+            class_name = names[-2]
+
+    file_name = os.path.basename(code.co_filename)
+    blocking_state = None
+    if os.path.dirname(code.co_filename) == _STDLIB_DIR:
+        blocking_state = _BLOCKING_STATES.get((file_name, code.co_name))
+
+    return code.co_name, file_name, class_name, blocking_state
+
+
+def _guess_class_name(frame: FrameType) -> Optional[str]:
+    """
+    Tries to find the class name of methods whose first argument is "self", before Python 3.11.
+    The frame's locals are only accessed if the code has a "self" argument, as accessing them copies them into a dict.
+    Does not support static and class methods.
+    """
+    code = frame.f_code
+    if code.co_argcount == 0 or code.co_varnames[0] != "self":
+        return None
+    try:
+        return str(frame.f_locals["self"].__class__.__name__)
+    except KeyError:
+        return None
@@ -34,6 +34,7 @@ class AiohttpPyctuatorServer(PyctuatorServer):
             metadata=self.metadata,
             additional_app_info=self.additional_app_info,
             disabled_endpoints=disabled_endpoints,
+            metrics_history_interval_sec=0.1,
         )
 
         @self.routes.get("/logfile_test_repeater")
@@ -42,6 +43,10 @@ class AiohttpPyctuatorServer(PyctuatorServer):
             logging.error(repeated_string)
             return web.Response(text=repeated_string)
 
+        @self.routes.get("/raising_test_url")
+        async def get_raising_test_url(_: web.Request) -> web.Response:
+            raise RuntimeError("Raised by a test handler")
+
         @self.routes.get("/httptrace_test_url")
         async def get_httptrace_test_url(request: web.Request) -> web.Response:
             # Sleep if requested to sleep - used for asserting httptraces timing
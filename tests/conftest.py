@@ -43,6 +43,7 @@ class RegisteredEndpoints:
     threads: Optional[str]
     logfile: Optional[str]
     httptrace: Optional[str]
+    prometheus: Optional[str]
 
 
 @dataclass
@@ -63,6 +64,7 @@ endpoint_href_path = {
     Endpoints.THREAD_DUMP: "threaddump",
     Endpoints.LOGFILE: "logfile",
     Endpoints.HTTP_TRACE: "httptrace",
+    Endpoints.PROMETHEUS: "prometheus",
 }
 
 
@@ -175,6 +177,7 @@ def registered_endpoints(registration_tracker: RegistrationTrackerFixture) -> Re
         threads=link_href(Endpoints.THREAD_DUMP),
         logfile=link_href(Endpoints.LOGFILE),
         httptrace=link_href(Endpoints.HTTP_TRACE),
+        prometheus=link_href(Endpoints.PROMETHEUS),
     )
 
 
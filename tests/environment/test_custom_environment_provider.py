@@ -35,3 +35,15 @@ def test_custom_environment_provider() -> None:
         "d.g.h": PropertyValue(value=123),
         "d.g.i": PropertyValue(value="abcde"),
     }
+
+
+def test_deeply_nested_environment_flattened() -> None:
+    env: Dict = {"leaf": 0}
+    for depth in range(1, 200):
+        env = {f"k{depth}": env, f"v{depth}": depth}
+
+    provider = CustomEnvironmentProvider("custom", lambda: env)
+    properties = provider.get_properties_source(lambda mapping: mapping).properties
+    assert len(properties) == 200
+    assert properties["k199.v198"] == PropertyValue(value=198)
+    assert properties[".".join(f"k{depth}" for depth in range(199, 0, -1)) + ".leaf"] == PropertyValue(value=0)
@@ -0,0 +1,94 @@
+import os
+from typing import Callable, Dict
+
+from _pytest.monkeypatch import MonkeyPatch
+
+from pyctuator.environment.custom_environment_provider import CustomEnvironmentProvider
+from pyctuator.environment.environment_cache import EnvironmentCache
+from pyctuator.environment.environment_provider import EnvironmentProvider, PropertiesSource, PropertyValue
+from pyctuator.environment.os_env_variables_impl import OsEnvironmentVariableProvider
+from pyctuator.environment.scrubber import SecretScrubber
+
+
+class UncachedEnvironmentProvider(EnvironmentProvider):
+    def __init__(self) -> None:
+        self.value = "a"
+
+    def get_properties_source(self, secret_scrubber: Callable[[Dict], Dict]) -> PropertiesSource:
+        return PropertiesSource("uncached", {"key": PropertyValue(self.value)})
+
+
+def test_unchanged_properties_source_reused() -> None:
+    env = {"a": "1", "b": {"password": "p"}}
+    provider = CustomEnvironmentProvider("custom", lambda: env)
+    cache = EnvironmentCache()
+    scrubber = SecretScrubber().scrub_secrets
+
+    environment, etag = cache.get_environment([provider], scrubber)
+    assert environment.propertySources[0].properties == {
+        "a": PropertyValue("1"),
+        "b.password": PropertyValue("******"),
+    }
+
+    cached_environment, cached_etag = cache.get_environment([provider], scrubber)
+    assert cached_environment.propertySources[0] is environment.propertySources[0]
+    assert cached_etag == etag
+
+    env["a"] = "2"
+    changed_environment, changed_etag = cache.get_environment([provider], scrubber)
+    assert changed_environment.propertySources[0].properties["a"] == PropertyValue("2")
+    assert changed_etag != etag
+
+
+def test_changed_secret_scrubber_rebuilds_properties_source() -> None:
+    provider = CustomEnvironmentProvider("custom", lambda: {"a": "1"})
+    cache = EnvironmentCache()
+
+    environment, etag = cache.get_environment([provider], SecretScrubber().scrub_secrets)
+    assert environment.propertySources[0].properties == {"a": PropertyValue("1")}
+
+    environment, scrubbed_etag = cache.get_environment([provider], lambda mapping: {key: "x" for key in mapping})
+    assert environment.propertySources[0].properties == {"a": PropertyValue("x")}
+    assert scrubbed_etag != etag
+
+
+def test_os_environment_changes_detected(monkeypatch: MonkeyPatch) -> None:
+    cache = EnvironmentCache()
+    providers = [OsEnvironmentVariableProvider()]
+    scrubber = SecretScrubber().scrub_secrets
+
+    _, etag = cache.get_environment(providers, scrubber)
+    assert cache.get_environment(providers, scrubber)[1] == etag
+
+    monkeypatch.setenv("PYCTUATOR_ENVIRONMENT_CACHE_TEST", "value")
+    environment, changed_etag = cache.get_environment(providers, scrubber)
+    assert changed_etag != etag
+    assert environment.propertySources[0].properties["PYCTUATOR_ENVIRONMENT_CACHE_TEST"] == PropertyValue("value")
+    assert len(environment.propertySources[0].properties) == len(os.environ)
+
+
+def test_uncached_provider_etag_changes_only_when_properties_change() -> None:
+    provider = UncachedEnvironmentProvider()
+    cache = EnvironmentCache()
+    scrubber = SecretScrubber().scrub_secrets
+
+    _, etag = cache.get_environment([provider], scrubber)
+    assert cache.get_environment([provider], scrubber)[1] == etag
+
+    provider.value = "b"
+    assert cache.get_environment([provider], scrubber)[1] != etag
+
+
+def test_registered_providers_change_etag() -> None:
+    cache = EnvironmentCache()
+    scrubber = SecretScrubber().scrub_secrets
+    providers = [CustomEnvironmentProvider("first", lambda: {"a": 1})]
+
+    _, etag = cache.get_environment(providers, scrubber)
+
+    providers.append(CustomEnvironmentProvider("second", lambda: {"b": 2}))
+    environment, changed_etag = cache.get_environment(providers, scrubber)
+    assert [source.name for source in environment.propertySources] == ["first", "second"]
+    assert changed_etag != etag
+
+    assert EnvironmentCache().get_environment(providers, scrubber)[1] != changed_etag
@@ -37,6 +37,7 @@ class FastApiPyctuatorServer(PyctuatorServer):
             metadata=self.metadata,
             additional_app_info=self.additional_app_info,
             disabled_endpoints=disabled_endpoints,
+            metrics_history_interval_sec=0.1,
         )
 
         @self.app.get("/logfile_test_repeater", tags=["pyctuator"])
@@ -48,6 +49,11 @@ class FastApiPyctuatorServer(PyctuatorServer):
         self.server = CustomServer(config=Config(app=self.app, port=self.port, lifespan="off", log_level="info"))
         self.thread = threading.Thread(target=self.server.run)
 
+        @self.app.get("/raising_test_url")
+        # pylint: disable=unused-variable
+        def get_raising_test_url() -> None:
+            raise RuntimeError("Raised by a test handler")
+
         @self.app.get("/httptrace_test_url")
         # pylint: disable=unused-variable
         def get_httptrace_test_url(request: Request, sleep_sec: Optional[int] = None) -> Response:
@@ -38,6 +38,7 @@ class FlaskPyctuatorServer(PyctuatorServer):
             metadata=self.metadata,
             additional_app_info=self.additional_app_info,
             disabled_endpoints=disabled_endpoints,
+            metrics_history_interval_sec=0.1,
         )
 
         @self.app.route("/logfile_test_repeater")
@@ -47,6 +48,11 @@ class FlaskPyctuatorServer(PyctuatorServer):
             logging.error(repeated_string)
             return repeated_string
 
+        @self.app.route("/raising_test_url")
+        # pylint: disable=unused-variable
+        def get_raising_test_url() -> str:
+            raise RuntimeError("Raised by a test handler")
+
         @self.app.route("/httptrace_test_url", methods=["GET"])
         # pylint: disable=unused-variable
         def get_httptrace_test_url() -> Response:
@@ -0,0 +1,78 @@
+import threading
+import time
+from dataclasses import dataclass
+
+from pyctuator.health.cached_health_provider import CachedHealthProvider
+from pyctuator.health.health_provider import HealthProvider, HealthStatus, Status, HealthDetails
+
+
+@dataclass
+class CountingHealthDetails(HealthDetails):
+    count: int
+
+
+class CountingHealthProvider(HealthProvider):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.count = 0
+
+    def is_supported(self) -> bool:
+        return True
+
+    def get_name(self) -> str:
+        return "counting"
+
+    def get_health(self) -> HealthStatus:
+        self.count += 1
+        return HealthStatus(Status.UP, CountingHealthDetails(self.count))
+
+
+def test_cached_health_is_reused_until_expired() -> None:
+    health_provider = CountingHealthProvider()
+    cached_health_provider = CachedHealthProvider(health_provider, ttl_sec=0.3)
+    assert cached_health_provider.get_name() == "counting"
+
+    first = cached_health_provider.get_health()
+    assert first.details == CountingHealthDetails(1)
+    assert first.cacheAgeMillis < 100
+
+    time.sleep(0.1)
+    second = cached_health_provider.get_health()
+    assert second.details == CountingHealthDetails(1)
+    assert second.cacheAgeMillis >= 100
+
+    time.sleep(0.3)
+    assert cached_health_provider.get_health().details == CountingHealthDetails(2)
+    assert health_provider.count == 2
+
+
+def test_cached_health_background_refresh() -> None:
+    health_provider = CountingHealthProvider()
+    cached_health_provider = CachedHealthProvider(health_provider, ttl_sec=0.1, background_refresh=True)
+    try:
+        time.sleep(0.35)
+        assert health_provider.count >= 2
+
+        # Requests are served from the cache and never check the wrapped provider themselves
+        count = health_provider.count
+        health = cached_health_provider.get_health()
+        assert isinstance(health.details, CountingHealthDetails)
+        assert health.details.count in (count, count + 1)
+    finally:
+        cached_health_provider.stop()
+
+
+def test_cached_health_background_refresh_stopped() -> None:
+    threads_before = set(threading.enumerate())
+    health_provider = CountingHealthProvider()
+    cached_health_provider = CachedHealthProvider(health_provider, ttl_sec=0.1, background_refresh=True)
+    time.sleep(0.15)
+    cached_health_provider.stop()
+
+    # The pending refresh is cancelled, so its thread ends right away rather than once the TTL expires
+    count = health_provider.count
+    time.sleep(0.05)
+    assert not [thread for thread in threading.enumerate() if thread not in threads_before]
+    time.sleep(0.2)
+    assert health_provider.count == count
@@ -1,5 +1,10 @@
+import threading
+import time
 from dataclasses import dataclass
 
+import pytest
+
+from pyctuator.health.cached_health_provider import CachedHealthProvider
 from pyctuator.health.composite_health_provider import CompositeHealthProvider, CompositeHealthStatus
 from pyctuator.health.health_provider import HealthProvider, HealthStatus, Status, HealthDetails
 
@@ -73,3 +78,25 @@ def test_composite_health_provider_one_down() -> None:
             "hp2": HealthStatus(Status.DOWN, CustomHealthDetails("d2")),
         }
     )
+
+
+def test_nested_cached_health_providers_stopped_with_pyctuator() -> None:
+    flask = pytest.importorskip("flask")
+    from pyctuator.pyctuator import Pyctuator  # pylint: disable=import-outside-toplevel
+
+    pyctuator = Pyctuator(
+        flask.Flask("test"), "test", "http://localhost:5000", "http://localhost:5000/pyctuator", None
+    )
+    threads_before = set(threading.enumerate())
+
+    cached_health_provider = CachedHealthProvider(
+        CustomHealthProvider("nested", HealthStatus(Status.UP, CustomHealthDetails("nested"))),
+        ttl_sec=0.1,
+        background_refresh=True,
+    )
+    pyctuator.register_health_provider(CompositeHealthProvider("composite", cached_health_provider))
+    pyctuator.stop()
+
+    # The pending refresh of the nested provider is cancelled, so its thread ends right away
+    time.sleep(0.05)
+    assert not [thread for thread in threading.enumerate() if thread not in threads_before]
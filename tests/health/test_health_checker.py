@@ -0,0 +1,95 @@
+import threading
+import time
+from dataclasses import dataclass
+
+from pyctuator.health.composite_health_provider import CompositeHealthProvider
+from pyctuator.health.health_checker import ConcurrentHealthChecker, HealthChecker, HealthCheckTimeoutDetails
+from pyctuator.health.health_provider import HealthProvider, HealthStatus, Status, HealthDetails
+
+
+@dataclass
+class CustomHealthDetails(HealthDetails):
+    details: str
+
+
+class SlowHealthProvider(HealthProvider):
+
+    def __init__(self, name: str, delay_sec: float) -> None:
+        super().__init__()
+        self.name = name
+        self.delay_sec = delay_sec
+        self.calls = 0
+
+    def is_supported(self) -> bool:
+        return True
+
+    def get_name(self) -> str:
+        return self.name
+
+    def get_health(self) -> HealthStatus:
+        self.calls += 1
+        time.sleep(self.delay_sec)
+        return HealthStatus(Status.UP, CustomHealthDetails(threading.current_thread().name))
+
+
+def test_sequential_health_checker() -> None:
+    statuses = HealthChecker().check([SlowHealthProvider("hp1", 0), SlowHealthProvider("hp2", 0)])
+    assert set(statuses.keys()) == {"hp1", "hp2"}
+    assert all(status.details == CustomHealthDetails(threading.current_thread().name) for status in statuses.values())
+
+
+def test_concurrent_health_checker_runs_providers_in_parallel() -> None:
+    providers = [SlowHealthProvider(f"hp{i}", 0.5) for i in range(4)]
+
+    start = time.time()
+    statuses = ConcurrentHealthChecker(max_workers=4).check(providers)
+    assert time.time() - start < 1.5
+
+    assert {name: status.status for name, status in statuses.items()} == {f"hp{i}": Status.UP for i in range(4)}
+
+
+def test_concurrent_health_checker_timeout() -> None:
+    slow_provider = SlowHealthProvider("slow", 2)
+    health_checker = ConcurrentHealthChecker(max_workers=2, timeout_sec=0.2)
+
+    start = time.time()
+    statuses = health_checker.check([SlowHealthProvider("fast", 0), slow_provider])
+    assert time.time() - start < 1
+
+    assert statuses["fast"].status == Status.UP
+    assert statuses["slow"].status == Status.UNKNOWN
+    assert isinstance(statuses["slow"].details, HealthCheckTimeoutDetails)
+    assert "timeout" in statuses["slow"].details.failure
+
+    # The slow provider is still busy, so it shouldn't be called again
+    statuses = health_checker.check([slow_provider])
+    assert statuses["slow"].status == Status.UNKNOWN
+    assert slow_provider.calls == 1
+
+
+def test_concurrent_health_checker_stop() -> None:
+    running_provider = SlowHealthProvider("running", 0.3)
+    queued_provider = SlowHealthProvider("queued", 0)
+    health_checker = ConcurrentHealthChecker(max_workers=1, timeout_sec=0.1)
+
+    statuses = health_checker.check([running_provider, queued_provider])
+    assert statuses["queued"].status == Status.UNKNOWN
+
+    # The check that didn't start yet is cancelled, the running check completes
+    health_checker.stop()
+    time.sleep(0.5)
+    assert running_provider.calls == 1
+    assert queued_provider.calls == 0
+
+
+def test_composite_health_provider_with_concurrent_health_checker() -> None:
+    health_provider = CompositeHealthProvider(
+        "comp",
+        SlowHealthProvider("hp1", 0),
+        SlowHealthProvider("hp2", 2),
+        health_checker=ConcurrentHealthChecker(max_workers=2, timeout_sec=0.2),
+    )
+
+    health = health_provider.get_health()
+    assert health.status == Status.UP
+    assert health.details["hp2"].status == Status.UNKNOWN
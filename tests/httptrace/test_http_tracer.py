@@ -0,0 +1,64 @@
+from datetime import datetime
+
+import pytest
+
+from pyctuator.httptrace.http_tracer import HttpTracer
+
+
+def test_traces_are_scrubbed_and_normalized_when_read() -> None:
+    http_tracer = HttpTracer()
+    timestamp = datetime(2021, 1, 2, 3, 4, 5).timestamp()
+    http_tracer.record(
+        timestamp,
+        "GET",
+        "http://localhost/a",
+        ((b"host", b"localhost"), (b"authorization", b"Bearer 123")),
+        200,
+        (("Set-Cookie", "A=B"), ("Set-Cookie", "C=D"), ("Content-Type", "text/html")),
+        5,
+    )
+
+    traces = http_tracer.get_httptrace().traces
+    assert len(traces) == 1
+
+    trace = traces[0]
+    assert trace.timestamp == datetime(2021, 1, 2, 3, 4, 5)
+    assert trace.request.method == "GET"
+    assert trace.request.uri == "http://localhost/a"
+    assert trace.request.headers == {"host": ["localhost"], "authorization": ["******"]}
+    assert trace.response.status == 200
+    assert trace.response.headers == {"Set-Cookie": ["******", "******"], "Content-Type": ["text/html"]}
+    assert trace.timeTaken == 5
+
+
+def test_traces_are_bounded() -> None:
+    http_tracer = HttpTracer()
+    for i in range(150):
+        http_tracer.record(float(i), "GET", f"http://localhost/{i}", (), 200, (), 0)
+
+    traces = http_tracer.get_httptrace().traces
+    assert len(traces) == 100
+    assert traces[0].request.uri == "http://localhost/50"
+    assert traces[-1].request.uri == "http://localhost/149"
+
+
+def test_header_pairs_given_as_lists() -> None:
+    # ASGI allows each raw header to be a [name, value] list
+    http_tracer = HttpTracer()
+    http_tracer.record(0, "GET", "http://localhost/a", [[b"a", b"b"]], 200, [[b"c", b"d"]], 5)
+
+    trace = http_tracer.get_httptrace().traces[0]
+    assert trace.request.headers == {"a": ["b"]}
+    assert trace.response.headers == {"c": ["d"]}
+
+
+def test_failure_to_record_is_logged(caplog: pytest.LogCaptureFixture) -> None:
+    http_tracer = HttpTracer(capacity=1)
+    http_tracer.record(0, "GET", "http://localhost/a", (), 200, (), 5)
+    http_tracer.record(0, "GET", "http://localhost/b", (), 200, [(b"a", {})], 5)  # type: ignore[list-item]
+    assert "Failed recording the trace of GET http://localhost/b" in caplog.text
+
+    # The buffer is left intact
+    assert [trace.request.uri for trace in http_tracer.get_httptrace().traces] == ["http://localhost/a"]
+    http_tracer.record(0, "GET", "http://localhost/c", (), 200, (), 5)
+    assert [trace.request.uri for trace in http_tracer.get_httptrace().traces] == ["http://localhost/c"]
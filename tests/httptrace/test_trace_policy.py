@@ -0,0 +1,46 @@
+import pytest
+
+from pyctuator.httptrace.trace_policy import TracePolicy
+
+
+def test_default_policy_traces_everything() -> None:
+    trace_policy = TracePolicy()
+    assert trace_policy.should_trace_request("/pyctuator/health")
+    assert trace_policy.should_trace_request("/")
+    assert trace_policy.should_trace_response(500)
+
+
+def test_include_and_exclude_paths() -> None:
+    trace_policy = TracePolicy(
+        include_paths=["/api/", "/pyctuator"],
+        exclude_paths=["/pyctuator/health", r"/api/.*/ping$"],
+    )
+    assert trace_policy.should_trace_request("/api/users")
+    assert trace_policy.should_trace_request("/pyctuator/env")
+    assert not trace_policy.should_trace_request("/pyctuator/health")
+    assert not trace_policy.should_trace_request("/api/users/ping")
+    assert not trace_policy.should_trace_request("/static/index.html")
+
+
+def test_empty_include_and_exclude_paths() -> None:
+    trace_policy = TracePolicy(include_paths=[], exclude_paths=[])
+    assert trace_policy.should_trace_request("/api/users")
+    assert trace_policy.should_trace_request("/")
+
+
+def test_status_codes() -> None:
+    trace_policy = TracePolicy(status_codes=range(400, 600))
+    assert trace_policy.should_trace_request("/")
+    assert not trace_policy.should_trace_response(200)
+    assert trace_policy.should_trace_response(404)
+    assert trace_policy.should_trace_response(503)
+
+
+def test_sampling_rate() -> None:
+    assert not any(TracePolicy(sampling_rate=0).should_trace_request("/") for _ in range(100))
+
+    sampled = sum(TracePolicy(sampling_rate=0.5).should_trace_request("/") for _ in range(10000))
+    assert 4000 < sampled < 6000
+
+    with pytest.raises(ValueError):
+        TracePolicy(sampling_rate=1.5)
@@ -0,0 +1,70 @@
+from pyctuator.httptrace.trace_ring_buffer import TraceRingBuffer, InternTable
+
+
+def test_intern_table_reuses_released_ids() -> None:
+    intern_table: InternTable[str] = InternTable()
+    a_id = intern_table.acquire("a")
+    assert intern_table.acquire("a") == a_id
+    b_id = intern_table.acquire("b")
+    assert len(intern_table) == 2
+
+    intern_table.release(a_id)
+    assert intern_table.get(a_id) == "a"
+    intern_table.release(a_id)
+    assert len(intern_table) == 1
+
+    assert intern_table.acquire("c") == a_id
+    assert intern_table.get(a_id) == "c"
+    assert intern_table.get(b_id) == "b"
+
+
+def test_ring_buffer_keeps_newest_traces() -> None:
+    ring_buffer = TraceRingBuffer(3)
+    assert not list(ring_buffer)
+
+    headers = (("content-type", "text/html"),)
+    for i in range(5):
+        ring_buffer.append(float(i), "GET", f"/{i % 2}", (("x-id", str(i)),), 200 + i, headers, i * 10)
+
+    assert len(ring_buffer) == 3
+    assert list(ring_buffer) == [
+        (2.0, "GET", "/0", (("x-id", "2"),), 202, headers, 20),
+        (3.0, "GET", "/1", (("x-id", "3"),), 203, headers, 30),
+        (4.0, "GET", "/0", (("x-id", "4"),), 204, headers, 40),
+    ]
+
+    # Values of overwritten traces are no longer interned
+    # pylint: disable=protected-access
+    assert len(ring_buffer._interned_uris) == 2
+    # Header pairs are interned one by one - the shared content-type and the x-id of each of the 3 traces
+    assert len(ring_buffer._interned_headers) == 4
+
+
+def test_header_pairs_shared_by_traces_are_interned_once() -> None:
+    ring_buffer = TraceRingBuffer(10)
+    for i in range(10):
+        ring_buffer.append(
+            float(i), "GET", "/", (("accept", "*/*"), ("x-id", str(i))), 200, (("date", str(i)),), 10
+        )
+
+    assert [trace[3] for trace in ring_buffer] == [(("accept", "*/*"), ("x-id", str(i))) for i in range(10)]
+    assert [trace[5] for trace in ring_buffer] == [(("date", str(i)),) for i in range(10)]
+
+    # pylint: disable=protected-access
+    assert len(ring_buffer._interned_headers) == 21
+
+
+def test_traces_overwritten_while_iterating_are_skipped() -> None:
+    ring_buffer = TraceRingBuffer(1000)
+    for i in range(1000):
+        ring_buffer.append(float(i), "GET", "/", (), 200, (), 0)
+
+    traces = iter(ring_buffer)
+    assert next(traces)[0] == 0.0
+
+    for i in range(1000, 1500):
+        ring_buffer.append(float(i), "GET", "/", (), 200, (), 0)
+
+    # The first chunk of traces was already read, the following chunks skip the overwritten traces
+    timestamps = [trace[0] for trace in traces]
+    assert timestamps == [float(i) for i in [*range(1, 256), *range(500, 1000)]]
@@ -0,0 +1,122 @@
+# pylint: disable=protected-access
+import logging
+import logging.handlers
+import os
+import threading
+from pathlib import Path
+
+from pyctuator.logfile.log_file_reader import LogFileReader, _OpenLogFile
+from pyctuator.logfile.logfile import PyctuatorLogfile  # type: ignore
+
+
+def test_missing_file(tmp_path: Path) -> None:
+    log_file_reader = LogFileReader(str(tmp_path / "missing.log"))
+    assert log_file_reader.read() == (b"", 0)
+    assert log_file_reader.get_end() == 0
+
+
+def test_read_ranges(tmp_path: Path) -> None:
+    path = tmp_path / "app.log"
+    path.write_bytes(b"0123456789" * 10)
+
+    logfile = PyctuatorLogfile(30, "%(message)s", path=str(path))
+    assert logfile.get_handler() is None
+
+    # Without a range, the last max_size bytes are returned
+    assert logfile.get_tail() == b"0123456789" * 3
+
+    assert logfile.get_logfile("bytes=-15") == (b"56789" + b"0123456789", 85, 100)
+    assert logfile.get_logfile("bytes=5-12") == (b"5678901", 5, 12)
+
+    # At most max_size bytes are returned per request
+    assert logfile.get_logfile("bytes=10-") == (b"0123456789" * 3, 10, 40)
+
+    # Bytes appended to the file are read by following requests
+    with path.open("ab") as file:
+        file.write(b"abc")
+    assert logfile.get_logfile("bytes=100-") == (b"abc", 100, 103)
+
+
+def test_read_across_rotation(tmp_path: Path) -> None:
+    path = tmp_path / "app.log"
+    handler = logging.handlers.RotatingFileHandler(path, maxBytes=100, backupCount=2)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+
+    def log(message: str) -> None:
+        handler.handle(logging.LogRecord("test record", logging.WARNING, "", 0, message, (), None))
+
+    log_file_reader = LogFileReader(str(path))
+    for i in range(9):
+        log(f"message {i:02}")  # 11 bytes per message
+    assert log_file_reader.read() == ("".join(f"message {i:02}\n" for i in range(9)).encode(), 0)
+
+    # The handler rolls over before a message would exceed maxBytes, the following messages are in the new file
+    log("message 09")
+    log("message 10")
+    assert log_file_reader.get_offset() == 0
+    assert log_file_reader.get_end() == 121
+
+    # Reading from a position in the rotated file returns the rest of the rotated file
+    assert log_file_reader.read(88) == (b"message 08\n", 88)
+    assert log_file_reader.read(99) == (b"message 09\nmessage 10\n", 99)
+
+    # Once rotated again, the oldest file is no longer available
+    for i in range(11, 20):
+        log(f"message {i:02}")
+    assert log_file_reader.get_offset() == 99
+    assert log_file_reader.get_end() == 220
+    assert log_file_reader.read(0, 121) == (b"message 09\nmessage 10\n", 99)
+
+    handler.close()
+    log_file_reader.close()
+
+
+def test_read_after_truncation(tmp_path: Path) -> None:
+    path = tmp_path / "app.log"
+    path.write_bytes(b"0123456789")
+
+    log_file_reader = LogFileReader(str(path))
+    assert log_file_reader.get_end() == 10
+
+    with path.open("r+b") as file:
+        file.truncate(0)
+        file.write(b"abc")
+        file.flush()
+        os.fsync(file.fileno())
+
+    assert log_file_reader.read() == (b"abc", 10)
+    log_file_reader.close()
+
+
+def test_read_truncated_file(tmp_path: Path) -> None:
+    # A file that was truncated after its size was checked, the range to read is beyond its end
+    path = tmp_path / "app.log"
+    path.write_bytes(b"")
+    log_file = _OpenLogFile(str(path), 0)
+    assert log_file.read(0, 10) == b""
+    log_file.file.close()
+
+
+def test_log_file_closed_when_stopped(tmp_path: Path) -> None:
+    path = tmp_path / "app.log"
+    path.write_bytes(b"0123456789")
+
+    logfile = PyctuatorLogfile(30, "%(message)s", path=str(path))
+    assert logfile.get_tail() == b"0123456789"
+    assert logfile.log_file
+    open_file = logfile.log_file._current
+    assert open_file
+
+    logfile.stop()
+    assert open_file.file.closed
+
+
+def test_tail_log_file(tmp_path: Path) -> None:
+    path = tmp_path / "app.log"
+    path.write_bytes(b"old message\n")
+    logfile = PyctuatorLogfile(1000, "%(message)s", path=str(path))
+
+    # There's no notification when the file is written, so it's polled while waiting
+    timer = threading.Timer(0.1, lambda: path.write_bytes(b"old message\nnew message\n"))
+    timer.start()
+    assert logfile.tail_log(timeout=10) == (b"new message\n", 12, 24)
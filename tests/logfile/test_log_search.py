@@ -0,0 +1,144 @@
+import logging
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import List, Tuple
+
+import pytest
+
+from pyctuator.logfile.log_file_reader import LogFileReader
+from pyctuator.logfile.log_search import LogSearchQuery, search_log_lines, search_log_records
+from pyctuator.logfile.logfile import PyctuatorLogfile  # type: ignore
+
+
+def emit(logfile: PyctuatorLogfile, logger: str, level: int, msg: str, created: float) -> None:
+    record = logging.LogRecord(logger, level, "", 0, msg, (), None)
+    record.created = created
+    logfile.log_messages.emit(record)
+
+
+@pytest.fixture
+def logfile() -> PyctuatorLogfile:
+    logfile = PyctuatorLogfile(1000, "%(levelname)s %(name)s %(message)s")
+    emit(logfile, "app", logging.INFO, "Started", 1000)
+    emit(logfile, "app.db", logging.WARNING, "Slow query", 1001)
+    emit(logfile, "application", logging.ERROR, "Failed", 1002)
+    emit(logfile, "app.db", logging.ERROR, "Connection lost", 1003)
+    return logfile
+
+
+def test_search_all(logfile: PyctuatorLogfile) -> None:
+    result = logfile.search(LogSearchQuery())
+    assert [match.message for match in result.matches] == [
+        "INFO app Started",
+        "WARNING app.db Slow query",
+        "ERROR application Failed",
+        "ERROR app.db Connection lost",
+    ]
+    assert not result.truncated
+
+    match = result.matches[1]
+    assert (match.start, match.end) == (17, 43)
+    assert (match.level, match.logger, match.timestamp) == ("WARNING", "app.db", datetime.fromtimestamp(1001))
+    assert logfile.log_messages.get_range(match.start, match.end) == b"WARNING app.db Slow query\n"
+
+
+def test_search_filters(logfile: PyctuatorLogfile) -> None:
+    def search(**params: str) -> list:
+        return [match.message for match in logfile.search(LogSearchQuery.parse(params)).matches]
+
+    assert search(level="warn") == [
+        "WARNING app.db Slow query", "ERROR application Failed", "ERROR app.db Connection lost"
+    ]
+    assert search(logger="app") == ["INFO app Started", "WARNING app.db Slow query", "ERROR app.db Connection lost"]
+    assert search(level="ERROR", logger="app") == ["ERROR app.db Connection lost"]
+    assert search(
+        since=datetime.fromtimestamp(1001).isoformat(),
+        until=datetime.fromtimestamp(1002).isoformat(),
+    ) == ["WARNING app.db Slow query", "ERROR application Failed"]
+    assert search(regex="lost|Started") == ["INFO app Started", "ERROR app.db Connection lost"]
+
+
+def test_search_limit(logfile: PyctuatorLogfile) -> None:
+    result = logfile.search(LogSearchQuery(limit=2))
+    assert [match.message for match in result.matches] == ["ERROR application Failed", "ERROR app.db Connection lost"]
+    assert result.truncated
+
+
+def test_search_stops_at_limit(logfile: PyctuatorLogfile) -> None:
+    reads: List[Tuple[int, int]] = []
+
+    def read(start: int, end: int) -> Tuple[bytes, int]:
+        reads.append((start, end))
+        return logfile.log_messages.read(start, end)
+
+    # Once the limit is reached, older records aren't read even though they might match
+    result = search_log_records(logfile.log_messages.get_index(), LogSearchQuery(limit=1), read)
+    assert [match.message for match in result.matches] == ["ERROR app.db Connection lost"]
+    assert result.truncated
+    assert len(reads) == 1
+
+    result = search_log_records(logfile.log_messages.get_index(), LogSearchQuery(level=logging.ERROR, limit=2), read)
+    assert len(result.matches) == 2
+    assert not result.truncated
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 16, 1000])
+def test_search_log_file(tmp_path: Path, chunk_size: int) -> None:
+    path = tmp_path / "app.log"
+    path.write_bytes(b"first error\nok\n\nsecond error\nlast error")
+    reader = LogFileReader(str(path))
+
+    def search(query: LogSearchQuery) -> List[Tuple[int, int, str]]:
+        result = search_log_lines(query, reader.read, reader.get_offset(), reader.get_end(), chunk_size)
+        return [(match.start, match.end, match.message) for match in result.matches]
+
+    assert search(LogSearchQuery(regex=re.compile("error"))) == [
+        (0, 12, "first error"), (16, 29, "second error"), (29, 39, "last error")
+    ]
+    assert search(LogSearchQuery()) == [
+        (0, 12, "first error"), (12, 15, "ok"), (15, 16, ""), (16, 29, "second error"), (29, 39, "last error")
+    ]
+
+    result = search_log_lines(LogSearchQuery(regex=re.compile("^o"), limit=1), reader.read, 0, 39, chunk_size)
+    assert [match.message for match in result.matches] == ["ok"]
+    assert not result.truncated
+
+    result = search_log_lines(LogSearchQuery(regex=re.compile("error"), limit=2), reader.read, 0, 39, chunk_size)
+    assert [match.message for match in result.matches] == ["second error", "last error"]
+    assert result.truncated
+    reader.close()
+
+
+def test_search_log_file_by_metadata(tmp_path: Path) -> None:
+    path = tmp_path / "app.log"
+    path.write_bytes(b"WARNING app Slow query\n")
+    logfile = PyctuatorLogfile(1000, "%(message)s", path=str(path))
+
+    assert [match.message for match in logfile.search(LogSearchQuery.parse({"regex": "Slow"})).matches] == [
+        "WARNING app Slow query"
+    ]
+    with pytest.raises(ValueError):
+        logfile.search(LogSearchQuery.parse({"level": "WARN"}))
+    logfile.stop()
+
+
+def test_overwritten_records_are_not_found() -> None:
+    logfile = PyctuatorLogfile(100, "%(message)s")
+    for i in range(10):
+        emit(logfile, "app", logging.INFO, f"message {i:02}" + "." * 10, 1000 + i)
+
+    # Each record is 21 bytes, so 4 records are fully kept while another is partially overwritten
+    assert [match.message[:10] for match in logfile.search(LogSearchQuery()).matches] == [
+        "message 06", "message 07", "message 08", "message 09"
+    ]
+    assert len(logfile.log_messages.get_index()) == 4
+
+
+def test_invalid_query() -> None:
+    with pytest.raises(ValueError):
+        LogSearchQuery.parse({"level": "LOUD"})
+    with pytest.raises(ValueError):
+        LogSearchQuery.parse({"regex": "("})
+    with pytest.raises(ValueError):
+        LogSearchQuery.parse({"since": "yesterday"})
@@ -1,7 +1,11 @@
 # pylint: disable=protected-access
+import asyncio
 import logging
+import threading
+import time
+from typing import List
 
-from pyctuator.logfile.logfile import PyctuatorLogfile  # type: ignore
+from pyctuator.logfile.logfile import PyctuatorLogfile, _AsyncAppendListener  # type: ignore
 from pyctuator.pyctuator import default_logfile_format
 
 test_buffer_size = 1000
@@ -10,7 +14,7 @@ test_buffer_size = 1000
 def test_empty_response() -> None:
     logfile = PyctuatorLogfile(test_buffer_size, default_logfile_format)
     log, start, end = logfile.get_logfile(f"bytes=-{2 * test_buffer_size}")
-    assert log == ""
+    assert log == b""
     assert start == 0
     assert end == 0
 
@@ -39,7 +43,7 @@ def test_buffer_overflow() -> None:
     logfile.log_messages.emit(record)
 
     log, start, end = logfile.get_logfile(f"bytes=-{2 * test_buffer_size}")
-    assert log.count("0123456789") == 4  # Implicitly Added newlines "break" a single string appearance
+    assert log.count(b"0123456789") == 4  # Implicitly Added newlines "break" a single string appearance
     assert start == logfile.get_log_buffer_offset()
     assert end == start + len(log)
 
@@ -56,6 +60,178 @@ def test_forgotten_records() -> None:
     logfile.log_messages.emit(record)
 
     log, start, end = logfile.get_logfile(f"bytes=-{2 * test_buffer_size}")
-    assert log.count("ABCDEFGHIJ") == 0
+    assert log.count(b"ABCDEFGHIJ") == 0
     assert start == logfile.get_log_buffer_offset()
     assert end == start + len(log)
+
+
+def test_buffer_wraps_around_utf8_bytes() -> None:
+    logfile = PyctuatorLogfile(test_buffer_size, "%(message)s")
+
+    for i in range(100):
+        record = logging.LogRecord("test record", logging.WARNING, "", 0, f"שלום {i:03}", (), None)
+        logfile.log_messages.emit(record)
+
+    # Each message is 13 bytes (Hebrew letters are encoded to 2 bytes each), the last 1000 bytes are kept
+    assert logfile.get_log_buffer_offset() == 1300 - test_buffer_size
+
+    log, start, end = logfile.get_logfile(f"bytes=-{2 * test_buffer_size}")
+    assert (start, end) == (300, 1300)
+    assert len(log) == test_buffer_size
+    assert log.endswith("שלום 098\nשלום 099\n".encode("utf-8"))
+
+    # Continue from a previous position, as SBA does when polling for new messages
+    log, start, end = logfile.get_logfile("bytes=1274-")
+    assert log.decode("utf-8") == "שלום 098\nשלום 099\n"
+    assert (start, end) == (1274, 1300)
+
+    # Positions that were already overwritten are skipped
+    log, start, end = logfile.get_logfile("bytes=0-320")
+    assert (start, end) == (300, 320)
+    assert log == logfile.log_messages.get_range(300, 320)
+
+
+def test_message_larger_than_buffer() -> None:
+    logfile = PyctuatorLogfile(test_buffer_size, "%(message)s")
+
+    msg = "0123456789" * 150
+    record = logging.LogRecord("test record", logging.WARNING, "", 0, msg, (), None)
+    logfile.log_messages.emit(record)
+
+    assert logfile.get_log_buffer_offset() == len(msg) + 1 - test_buffer_size
+    assert logfile.log_messages.get_range() == (msg + "\n").encode("utf-8")[-test_buffer_size:]
+
+
+def test_queued_records() -> None:
+    logfile = PyctuatorLogfile(test_buffer_size, "%(threadName)s %(message)s", queue_size=10)
+    handler = logfile.queue_handler
+    assert handler
+    assert logfile.get_handler() is handler
+
+    logfile.start()
+    for i in range(5):
+        handler.handle(logging.LogRecord("test record", logging.WARNING, "", 0, "message %d", (i,), None))
+    logfile.stop()
+
+    # The records are formatted by the listener, but the record's attributes are of the logging thread
+    log = logfile.log_messages.get_range().decode("utf-8")
+    assert log == "".join(f"MainThread message {i}\n" for i in range(5))
+    assert handler.dropped == 0
+
+
+def test_queued_records_dropped_when_queue_is_full() -> None:
+    logfile = PyctuatorLogfile(test_buffer_size, "%(message)s", queue_size=3)
+    handler = logfile.queue_handler
+    assert handler
+
+    # The listener isn't started, so the queue fills up
+    for i in range(5):
+        handler.handle(logging.LogRecord("test record", logging.WARNING, "", 0, f"message {i}", (), None))
+    assert handler.dropped == 2
+
+    logfile.start()
+    logfile.stop()
+    assert logfile.log_messages.get_range() == b"message 0\nmessage 1\nmessage 2\n"
+
+
+def emit_later(logfile: PyctuatorLogfile, msg: str, delay: float = 0.1) -> None:
+    record = logging.LogRecord("test record", logging.WARNING, "", 0, msg, (), None)
+    threading.Timer(delay, logfile.log_messages.handle, (record,)).start()
+
+
+def test_tail_waits_for_new_messages() -> None:
+    logfile = PyctuatorLogfile(test_buffer_size, "%(message)s")
+    logfile.log_messages.emit(logging.LogRecord("test record", logging.WARNING, "", 0, "old message", (), None))
+
+    emit_later(logfile, "new message")
+    start_time = time.monotonic()
+    assert logfile.tail_log(timeout=10) == (b"new message\n", 12, 24)
+    assert time.monotonic() - start_time < 5
+
+    # Messages past the offset are returned without waiting
+    assert logfile.tail_log(0, timeout=10) == (b"old message\nnew message\n", 0, 24)
+
+
+def test_tail_times_out() -> None:
+    logfile = PyctuatorLogfile(test_buffer_size, "%(message)s")
+    logfile.log_messages.emit(logging.LogRecord("test record", logging.WARNING, "", 0, "old message", (), None))
+
+    # An offset from before a restart is past the end of the log, so only new messages are waited for
+    assert logfile.tail_log(1000, timeout=0.1) == (b"", 12, 12)
+    assert not logfile.log_messages._append_listeners
+
+
+def test_tail_async() -> None:
+    logfile = PyctuatorLogfile(test_buffer_size, "%(message)s")
+
+    async def tail() -> None:
+        emit_later(logfile, "new message")
+        assert await logfile.tail_log_async(timeout=10) == (b"new message\n", 0, 12)
+        assert await logfile.tail_log_async(timeout=0.1) == (b"", 12, 12)
+
+    asyncio.run(tail())
+    assert not logfile.log_messages._append_listeners
+
+
+def test_log_events() -> None:
+    logfile = PyctuatorLogfile(test_buffer_size, "%(message)s")
+    logfile.log_messages.emit(logging.LogRecord("test record", logging.WARNING, "", 0, "first\nmessage", (), None))
+
+    async def stream() -> List[str]:
+        log_events = logfile.iter_log_events(0)
+        try:
+            events = [await log_events.__anext__()]
+            emit_later(logfile, "second message")
+            events.append(await log_events.__anext__())
+            return events
+        finally:
+            await log_events.aclose()
+
+    assert asyncio.run(stream()) == [
+        "id: 14\ndata: first\ndata: message\n\n",
+        "id: 29\ndata: second message\n\n",
+    ]
+    assert not logfile.log_messages._append_listeners
+
+
+def test_append_listeners_called_without_lock() -> None:
+    logfile = PyctuatorLogfile(test_buffer_size, "%(message)s")
+    log_messages = logfile.log_messages
+    lock_acquired: List[bool] = []
+
+    def try_lock() -> None:
+        assert log_messages.lock
+        lock_acquired.append(log_messages.lock.acquire(timeout=1))  # pylint: disable=consider-using-with
+        log_messages.lock.release()
+
+    def listener() -> None:
+        # The lock is reentrant, so it's acquired by another thread to tell if it's held by the logging thread
+        thread = threading.Thread(target=try_lock)
+        thread.start()
+        thread.join()
+
+    log_messages.add_append_listener(listener)
+    log_messages.handle(logging.LogRecord("test record", logging.WARNING, "", 0, "message", (), None))
+    assert lock_acquired == [True]
+
+
+def test_async_wake_ups_coalesced() -> None:
+    logfile = PyctuatorLogfile(test_buffer_size, "%(message)s")
+    wake_ups: List[int] = []
+
+    async def wait_for_messages() -> None:
+        with _AsyncAppendListener(logfile.log_messages, asyncio.get_running_loop()) as appended:
+            wake_up = appended._wake_up
+
+            def count_wake_up() -> None:
+                wake_ups.append(1)
+                wake_up()
+
+            appended._wake_up = count_wake_up  # type: ignore
+            for i in range(100):
+                logfile.log_messages.handle(logging.LogRecord("test record", logging.WARNING, "", 0, i, (), None))
+            await appended.wait(10)
+
+    # A single wake-up is scheduled no matter how many messages were appended meanwhile
+    asyncio.run(wait_for_messages())
+    assert wake_ups == [1]
@@ -0,0 +1,96 @@
+import tracemalloc
+from typing import Generator
+
+import pytest
+
+from pyctuator.memory.allocation_tracer import AllocationTracer, MAX_SNAPSHOTS
+from pyctuator.metrics.memory_metrics_impl import MemoryMetricsProvider, TRACEMALLOC_CURRENT, TRACEMALLOC_PEAK
+
+
+class Allocator:
+    def __init__(self) -> None:
+        self.blocks: list = []
+
+    def allocate(self, count: int) -> None:
+        self.blocks.extend(bytearray(1000) for _ in range(count))
+
+
+@pytest.fixture
+def tracer() -> Generator[AllocationTracer, None, None]:
+    tracer = AllocationTracer()
+    yield tracer
+    tracer.stop()
+
+
+def test_allocations(tracer: AllocationTracer) -> None:
+    assert tracer.get_allocations() is None
+    assert tracer.take_snapshot() is None
+
+    status = tracer.start(5)
+    assert (status.tracing, status.tracebackFrames) == (True, 5)
+
+    allocator = Allocator()
+    allocator.allocate(1000)
+
+    allocations = tracer.get_allocations("lineno", 1)
+    assert allocations
+    assert allocations.totalBytes >= 1000 * 1000
+    site = allocations.sites[0]
+    assert site.traceback[0].fileName == __file__
+    assert site.sizeBytes >= 1000 * 1000
+    assert site.count >= 1000
+    assert site.sizeDiffBytes is None
+
+    allocations = tracer.get_allocations("traceback", 1)
+    assert allocations
+    assert len(allocations.sites[0].traceback) > 1
+
+    with pytest.raises(ValueError):
+        tracer.get_allocations("module")
+
+    status = tracer.stop()
+    assert (status.tracing, status.currentBytes) == (False, 0)
+
+
+def test_compare_to_snapshot(tracer: AllocationTracer) -> None:
+    tracer.start()
+    allocator = Allocator()
+    allocator.allocate(100)
+    snapshot_id = tracer.take_snapshot()
+    assert snapshot_id
+    allocator.allocate(500)
+
+    allocations = tracer.get_allocations("filename", 1, snapshot_id)
+    assert allocations
+    assert allocations.snapshot == snapshot_id
+    site = allocations.sites[0]
+    assert site.traceback[0].fileName == __file__
+    assert site.sizeDiffBytes and 500 * 1000 <= site.sizeDiffBytes < site.sizeBytes
+    assert site.countDiff and site.countDiff >= 500
+
+    # Only the most recent snapshots are kept
+    snapshot_ids = [tracer.take_snapshot() for _ in range(MAX_SNAPSHOTS)]
+    assert tracer.get_status().snapshots == snapshot_ids
+    with pytest.raises(ValueError):
+        tracer.get_allocations(snapshot_id=snapshot_id)
+
+
+def test_tracemalloc_metrics(tracer: AllocationTracer) -> None:
+    provider = MemoryMetricsProvider()
+    metric_names = provider.get_supported_metric_names()
+    assert {TRACEMALLOC_CURRENT, TRACEMALLOC_PEAK} <= set(metric_names)
+    assert not provider.get_metric(TRACEMALLOC_PEAK).measurements
+    assert TRACEMALLOC_CURRENT not in [name for name, _, _, _ in provider.iter_samples()]
+
+    # The names don't depend on whether tracemalloc is tracing, even if it's started without the tracer
+    tracemalloc.start()
+    try:
+        assert provider.get_supported_metric_names() == metric_names
+    finally:
+        tracemalloc.stop()
+
+    tracer.start()
+    assert provider.get_supported_metric_names() == metric_names
+    Allocator().allocate(100)
+    assert provider.get_metric(TRACEMALLOC_PEAK).measurements[0].value >= 100 * 1000
+    assert TRACEMALLOC_CURRENT in [name for name, _, _, _ in provider.iter_samples()]
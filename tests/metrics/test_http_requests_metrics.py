@@ -0,0 +1,46 @@
+import threading
+
+from pyctuator.metrics.http_requests_metrics_impl import HttpRequestsMetricsProvider, HISTOGRAM_BUCKETS
+
+
+def test_http_requests_metric() -> None:
+    provider = HttpRequestsMetricsProvider()
+    provider.record("GET", "/users/{user_id}", 200, 0.1)
+    provider.record("GET", "/users/{user_id}", 200, 0.3)
+    provider.record("POST", "/users", 500, 2)
+    provider.record("GET", None, 404, 0.001)
+
+    metric = provider.get_metric("http.server.requests")
+    assert metric.baseUnit == "seconds"
+    assert {m.statistic: m.value for m in metric.measurements} == {"COUNT": 4, "TOTAL_TIME": 2.401, "MAX": 2}
+    assert {tag.tag: tag.values for tag in metric.availableTags} == {
+        "method": ["GET", "POST"],
+        "uri": ["/users", "/users/{user_id}", "NOT_FOUND"],
+        "status": ["200", "404", "500"],
+        "outcome": ["CLIENT_ERROR", "SERVER_ERROR", "SUCCESS"],
+    }
+
+    timers = dict(provider.iter_timers())
+    timer = timers[("GET", "/users/{user_id}", "200", "SUCCESS")]
+    assert timer.count == 2
+    assert timer.buckets[HISTOGRAM_BUCKETS.index(0.1)] == 1
+    assert timer.buckets[HISTOGRAM_BUCKETS.index(0.5)] == 1
+    assert sum(timer.buckets) == 2
+
+
+def test_http_requests_metric_merges_threads() -> None:
+    provider = HttpRequestsMetricsProvider()
+
+    def record_requests() -> None:
+        for _ in range(100):
+            provider.record("GET", "/", 200, 0.01)
+
+    threads = [threading.Thread(target=record_requests) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    record_requests()
+
+    timers = dict(provider.iter_timers())
+    assert timers[("GET", "/", "200", "SUCCESS")].count == 900
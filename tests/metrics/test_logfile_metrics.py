@@ -0,0 +1,16 @@
+import logging
+
+from pyctuator.logfile.logfile import PyctuatorLogfile  # type: ignore
+from pyctuator.metrics.logfile_metrics_impl import LogfileQueueMetricsProvider
+
+
+def test_logfile_queue_metrics() -> None:
+    logfile = PyctuatorLogfile(1000, "%(message)s", queue_size=2)
+    assert logfile.queue_handler
+    provider = LogfileQueueMetricsProvider(logfile.queue_handler)
+
+    for i in range(3):
+        logfile.queue_handler.handle(logging.LogRecord("test record", logging.WARNING, "", 0, f"message {i}", (), None))
+
+    assert provider.get_metric("logfile.queue.dropped").measurements[0].value == 1
+    assert provider.get_metric("logfile.queue.size").measurements[0].value == 2
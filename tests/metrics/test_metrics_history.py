@@ -0,0 +1,89 @@
+import threading
+import time
+from typing import List
+
+import pytest
+
+from pyctuator.metrics.metrics_history import MetricsHistory
+from pyctuator.metrics.metrics_provider import MetricsProvider, Metric, Measurement
+
+
+class SteppingMetricsProvider(MetricsProvider):
+    def __init__(self) -> None:
+        self.step = 0
+        self.metric_calls = 0
+
+    def get_prefix(self) -> str:
+        return "stepping."
+
+    def get_supported_metric_names(self) -> List[str]:
+        return ["stepping.value"]
+
+    def get_metric(self, metric_name: str) -> Metric:
+        self.step += 1
+        self.metric_calls += 1
+        return Metric(metric_name, None, "Integer", [
+            Measurement("VALUE", self.step),
+            Measurement("COUNT", self.step * 10),
+            Measurement("MAX", self.step % 3),
+        ], [])
+
+
+def test_metrics_history() -> None:
+    provider = SteppingMetricsProvider()
+    metrics_history = MetricsHistory([provider], 10, 4)
+
+    with pytest.raises(KeyError):
+        metrics_history.get_history("stepping.value")
+
+    for _ in range(6):
+        metrics_history.sample()
+    assert provider.metric_calls == 6
+
+    # Only the latest samples are kept, reading them doesn't call the provider
+    history = metrics_history.get_history("stepping.value")
+    assert history.baseUnit == "Integer"
+    assert [point.measurements[0].value for point in history.points] == [3, 4, 5, 6]
+    assert history.points[0].timestamp <= history.points[-1].timestamp
+    assert provider.metric_calls == 6
+
+
+def test_metrics_history_downsampling() -> None:
+    provider = SteppingMetricsProvider()
+    metrics_history = MetricsHistory([provider], 10, 100)
+    for _ in range(6):
+        metrics_history.sample()
+
+    history = metrics_history.get_history("stepping.value", points=2)
+    assert [
+        {measurement.statistic: measurement.value for measurement in point.measurements}
+        for point in history.points
+    ] == [
+        {"VALUE": 2, "COUNT": 30, "MAX": 2},
+        {"VALUE": 5, "COUNT": 60, "MAX": 2},
+    ]
+
+    assert len(metrics_history.get_history("stepping.value", points=10).points) == 6
+
+
+def test_metrics_history_background_sampling() -> None:
+    threads_before = set(threading.enumerate())
+    provider = SteppingMetricsProvider()
+    metrics_history = MetricsHistory([provider], 0.1, 100)
+
+    # Starting an already started history doesn't start another sampling chain
+    metrics_history.start()
+    metrics_history.start()
+    time.sleep(0.35)
+    assert 2 <= provider.metric_calls <= 3
+
+    # Stopping cancels the next sampling, so its thread ends right away
+    metrics_history.stop()
+    metric_calls = provider.metric_calls
+    time.sleep(0.05)
+    assert not [thread for thread in threading.enumerate() if thread not in threads_before]
+
+    metrics_history.start()
+    time.sleep(0.15)
+    metrics_history.stop()
+    assert provider.metric_calls == metric_calls + 1
@@ -0,0 +1,73 @@
+from typing import List
+
+import pytest
+
+from pyctuator.endpoints import Endpoints
+from pyctuator.impl.pyctuator_impl import PyctuatorImpl, AppInfo, AppDetails
+from pyctuator.metrics.metrics_provider import MetricsProvider, Metric, Measurement
+from pyctuator.pyctuator import default_logfile_format
+
+
+class CountingMetricsProvider(MetricsProvider):
+    def __init__(self, prefix: str, names: List[str]) -> None:
+        self.prefix = prefix
+        self.names = names
+        self.names_calls = 0
+        self.metric_calls = 0
+
+    def get_prefix(self) -> str:
+        return self.prefix
+
+    def get_supported_metric_names(self) -> List[str]:
+        self.names_calls += 1
+        return [self.prefix + name for name in self.names]
+
+    def get_metric(self, metric_name: str) -> Metric:
+        self.metric_calls += 1
+        return Metric(metric_name, None, "Integer", [Measurement("VALUE", 1)], [])
+
+
+@pytest.fixture
+def pyctuator_impl() -> PyctuatorImpl:
+    return PyctuatorImpl(
+        AppInfo(app=AppDetails(name="appy")),
+        "http://appy/pyctuator",
+        10,
+        default_logfile_format,
+        None,
+        Endpoints.NONE,
+    )
+
+
+def test_metrics_index(pyctuator_impl: PyctuatorImpl) -> None:
+    kuki = CountingMetricsProvider("kuki.", ["a", "b"])
+    puki = CountingMetricsProvider("puki.", ["a"])
+    pyctuator_impl.register_metrics_provider(kuki)
+    pyctuator_impl.register_metrics_provider(puki)
+
+    assert pyctuator_impl.get_metric_names().names == ["kuki.a", "kuki.b", "puki.a"]
+    assert pyctuator_impl.get_metric_measurement("puki.a").name == "puki.a"
+    assert pyctuator_impl.get_metric_measurement("kuki.b").name == "kuki.b"
+    assert pyctuator_impl.get_metric_names().names == ["kuki.a", "kuki.b", "puki.a"]
+    assert (kuki.names_calls, kuki.metric_calls, puki.names_calls, puki.metric_calls) == (1, 1, 1, 1)
+
+    # Unknown metrics are rejected without calling the providers, even if they match a provider's prefix
+    with pytest.raises(KeyError):
+        pyctuator_impl.get_metric_measurement("kuki.c")
+    assert kuki.metric_calls == 1
+
+
+def test_metrics_index_invalidation(pyctuator_impl: PyctuatorImpl) -> None:
+    kuki = CountingMetricsProvider("kuki.", ["a"])
+    pyctuator_impl.register_metrics_provider(kuki)
+    assert pyctuator_impl.get_metric_names().names == ["kuki.a"]
+
+    kuki.names.append("b")
+    assert pyctuator_impl.get_metric_names().names == ["kuki.a"]
+
+    pyctuator_impl.invalidate_metrics_index()
+    assert pyctuator_impl.get_metric_names().names == ["kuki.a", "kuki.b"]
+    assert pyctuator_impl.get_metric_measurement("kuki.b").name == "kuki.b"
+
+    pyctuator_impl.register_metrics_provider(CountingMetricsProvider("puki.", ["a"]))
+    assert pyctuator_impl.get_metric_names().names == ["kuki.a", "kuki.b", "puki.a"]
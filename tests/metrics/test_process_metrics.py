@@ -0,0 +1,54 @@
+import time
+
+import pytest
+
+from pyctuator.metrics.memory_metrics_impl import MemoryMetricsProvider
+from pyctuator.metrics.process_metrics_impl import ProcessMetricsProvider
+from pyctuator.metrics.process_sampler import ProcessSampler, ProcessSample
+from pyctuator.metrics.thread_metrics_impl import ThreadMetricsProvider
+
+
+class CountingProcessSampler(ProcessSampler):
+    samples_taken = 0
+
+    def _take_sample(self) -> ProcessSample:
+        self.samples_taken += 1
+        return super()._take_sample()
+
+
+def test_process_metrics_share_sample() -> None:
+    pytest.importorskip("psutil")
+
+    process_sampler = CountingProcessSampler(max_staleness_sec=60)
+    providers = [
+        MemoryMetricsProvider(process_sampler),
+        ThreadMetricsProvider(process_sampler),
+        ProcessMetricsProvider(process_sampler),
+    ]
+
+    metrics = {
+        metric_name: provider.get_metric(metric_name)
+        for provider in providers
+        for metric_name in provider.get_supported_metric_names()
+    }
+    assert process_sampler.samples_taken == 1
+
+    assert metrics["memory.rss"].measurements[0].value > 10000
+    assert metrics["thread.count"].measurements[0].value >= 1
+    assert metrics["process.files.open"].measurements[0].value > 0
+    assert 0 < metrics["process.uptime"].measurements[0].value < 24 * 60 * 60
+    assert metrics["process.cpu.time"].measurements[0].value > 0
+    assert 0 <= metrics["process.cpu.usage"].measurements[0].value <= 1
+
+
+def test_process_sample_staleness() -> None:
+    pytest.importorskip("psutil")
+
+    process_sampler = CountingProcessSampler(max_staleness_sec=0.05)
+    sample = process_sampler.get_sample()
+    assert process_sampler.get_sample() is sample
+    assert process_sampler.samples_taken == 1
+
+    time.sleep(0.1)
+    assert process_sampler.get_sample() is not sample
+    assert process_sampler.samples_taken == 2
@@ -0,0 +1,51 @@
+from typing import List
+
+from pyctuator.metrics.http_requests_metrics_impl import HttpRequestsMetricsProvider
+from pyctuator.metrics.metrics_provider import MetricsProvider, Metric, Measurement
+from pyctuator.metrics.prometheus_exposition import render_prometheus_metrics
+
+
+class SomeMetricsProvider(MetricsProvider):
+    def get_prefix(self) -> str:
+        return "some."
+
+    def get_supported_metric_names(self) -> List[str]:
+        return ["some.value", "some.counts"]
+
+    def get_metric(self, metric_name: str) -> Metric:
+        if metric_name == "some.value":
+            return Metric(metric_name, 'Some "value"\nwith a description', "bytes", [Measurement("VALUE", 1.5)], [])
+        return Metric(metric_name, None, "Integer", [Measurement("COUNT", 3), Measurement("MAX", 2)], [])
+
+
+def test_render_provider_metrics() -> None:
+    assert "".join(render_prometheus_metrics([SomeMetricsProvider()])) == (
+        '# HELP some_value_bytes Some "value"\\nwith a description\n'
+        "# TYPE some_value_bytes gauge\n"
+        "some_value_bytes 1.5\n"
+        "# TYPE some_counts_count gauge\n"
+        "some_counts_count 3\n"
+        "# TYPE some_counts_max gauge\n"
+        "some_counts_max 2\n"
+    )
+
+
+def test_render_http_requests_histogram() -> None:
+    provider = HttpRequestsMetricsProvider()
+    provider.record("GET", '/say/"{what}"', 200, 0.02)
+    provider.record("GET", '/say/"{what}"', 200, 20)
+
+    lines = "".join(render_prometheus_metrics([provider])).splitlines()
+    tags = 'method="GET",uri="/say/\\"{what}\\"",status="200",outcome="SUCCESS"'
+    assert lines[:2] == [
+        "# HELP http_server_requests_seconds Duration of HTTP server request handling",
+        "# TYPE http_server_requests_seconds histogram",
+    ]
+    assert f'http_server_requests_seconds_bucket{{{tags},le="0.01"}} 0' in lines
+    assert f'http_server_requests_seconds_bucket{{{tags},le="0.025"}} 1' in lines
+    assert f'http_server_requests_seconds_bucket{{{tags},le="10.0"}} 1' in lines
+    assert f'http_server_requests_seconds_bucket{{{tags},le="+Inf"}} 2' in lines
+    assert f"http_server_requests_seconds_count{{{tags}}} 2" in lines
+    assert f"http_server_requests_seconds_sum{{{tags}}} 20.02" in lines
+    assert "# TYPE http_server_requests_seconds_max gauge" in lines
+    assert f"http_server_requests_seconds_max{{{tags}}} 20" in lines
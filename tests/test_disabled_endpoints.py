@@ -13,9 +13,15 @@ from tests.flask_test_server import FlaskPyctuatorServer
 from tests.tornado_test_server import TornadoPyctuatorServer
 
 
+# The paths of endpoints that SBA doesn't know of, so they aren't linked to in the registration
+unlinked_endpoint_paths = {
+    Endpoints.TASK_DUMP: "taskdump",
+}
+
+
 @pytest.fixture(
     params=[
-        Endpoints.THREAD_DUMP | Endpoints.HTTP_TRACE,
+        Endpoints.THREAD_DUMP | Endpoints.HTTP_TRACE | Endpoints.TASK_DUMP,
         Endpoints.LOGGERS,
         Endpoints.ENV,
         Endpoints.LOGFILE | Endpoints.METRICS | Endpoints.HEALTH,
@@ -46,7 +52,8 @@ def test_disabled_endpoints_not_shown(
         disabled_endpoints: Endpoints,
         registered_endpoints: RegisteredEndpoints,
 ) -> None:
-    for endpoint in Endpoints:
+    # Only the endpoints known to SBA are linked to in the registration
+    for endpoint in endpoint_href_path:
         logging.info("Testing that endpoint %s isn't shown in registered endpoints", endpoint)
 
         registered_endpoint = {
@@ -58,6 +65,7 @@ def test_disabled_endpoints_not_shown(
             Endpoints.THREAD_DUMP: registered_endpoints.threads,
             Endpoints.LOGFILE: registered_endpoints.logfile,
             Endpoints.HTTP_TRACE: registered_endpoints.httptrace,
+            Endpoints.PROMETHEUS: registered_endpoints.prometheus,
         }.get(endpoint)
 
         if endpoint in disabled_endpoints:
@@ -71,9 +79,9 @@ def test_disabled_endpoints_not_found(
         disabled_endpoints: Endpoints,
         registered_endpoints: RegisteredEndpoints,
 ) -> None:
-    for endpoint in Endpoints:
-        if endpoint != Endpoints.NONE and endpoint in disabled_endpoints:
-            endpoint_url = f"{registered_endpoints.pyctuator}/{endpoint_href_path.get(endpoint)}"
+    for endpoint, path in {**endpoint_href_path, **unlinked_endpoint_paths}.items():
+        if endpoint in disabled_endpoints:
+            endpoint_url = f"{registered_endpoints.pyctuator}/{path}"
             logging.info("Testing that disabled-endpoint %s cannot be accessed via %s", endpoint, endpoint_url)
             response = requests.get(endpoint_url, timeout=REQUEST_TIMEOUT)
             assert response.status_code in (HTTPStatus.NOT_FOUND, HTTPStatus.METHOD_NOT_ALLOWED)
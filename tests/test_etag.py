@@ -0,0 +1,11 @@
+from pyctuator.impl.etag import is_etag_matched
+
+
+def test_is_etag_matched() -> None:
+    assert is_etag_matched("\"a-1\"", "\"a-1\"")
+    assert is_etag_matched("\"b-2\", \"a-1\"", "\"a-1\"")
+    assert is_etag_matched("W/\"a-1\"", "\"a-1\"")
+    assert is_etag_matched("*", "\"a-1\"")
+    assert not is_etag_matched(None, "\"a-1\"")
+    assert not is_etag_matched("", "\"a-1\"")
+    assert not is_etag_matched("\"a-2\"", "\"a-1\"")
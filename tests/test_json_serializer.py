@@ -0,0 +1,119 @@
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from enum import Enum
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, List, Optional
+
+import pytest
+
+from pyctuator.impl.json_serializer import dumps, stream_list, _stdlib_dumps
+
+
+class Color(Enum):
+    RED = "red"
+
+
+@dataclass
+class Inner:
+    name: str
+    time: datetime
+    day: date
+
+
+@dataclass
+class Outer:
+    inners: List[Inner]
+    color: Color
+    counts: Dict[int, int]
+    properties: Any
+    tags: Any
+    extra: Optional[str] = None
+    _hidden: str = field(default="hidden")
+
+
+OUTER = Outer(
+    inners=[
+        Inner("a", datetime(2021, 2, 3, 4, 5, 6, 7000), date(2021, 2, 3)),
+        Inner("b", datetime(2021, 2, 3, 4, 5, 6, tzinfo=timezone.utc), date(2021, 2, 4)),
+    ],
+    color=Color.RED,
+    counts={1: 2},
+    properties=MappingProxyType({"key": "value"}),
+    tags={"tag"},
+)
+
+EXPECTED = {
+    "inners": [
+        {"name": "a", "time": "2021-02-03T04:05:06.007000", "day": "2021-02-03"},
+        {"name": "b", "time": "2021-02-03T04:05:06+00:00", "day": "2021-02-04"},
+    ],
+    "color": "red",
+    "counts": {"1": 2},
+    "properties": {"key": "value"},
+    "tags": ["tag"],
+    "extra": None,
+}
+
+
+@pytest.mark.parametrize("serialize", [dumps, _stdlib_dumps])
+def test_dumps(serialize: Any) -> None:
+    serialized = serialize(OUTER)
+    assert isinstance(serialized, bytes)
+    assert json.loads(serialized) == EXPECTED
+
+
+def test_orjson_and_stdlib_output_identical() -> None:
+    pytest.importorskip("orjson")
+    assert dumps(OUTER) == _stdlib_dumps(OUTER)
+    assert dumps({"text": "ünïcödé"}) == _stdlib_dumps({"text": "ünïcödé"})
+
+
+@pytest.mark.parametrize("serialize", [dumps, _stdlib_dumps])
+def test_unserializable_value(serialize: Any) -> None:
+    with pytest.raises(TypeError):
+        serialize({"value": object()})
+
+
+@pytest.mark.parametrize("serialize", [dumps, _stdlib_dumps])
+def test_underscored_fields_omitted(serialize: Any) -> None:
+    @dataclass
+    class Links:
+        _links: Dict[str, str]
+
+    assert json.loads(serialize(Links({"self": "http://localhost"}))) == {}
+
+
+def test_host_json_provider_untouched() -> None:
+    flask = pytest.importorskip("flask")
+    from pyctuator.pyctuator import Pyctuator  # pylint: disable=import-outside-toplevel
+
+    app = flask.Flask("test")
+    json_provider = app.json
+    Pyctuator(app, "test", "http://localhost:5000", "http://localhost:5000/pyctuator", None)
+    assert app.json is json_provider
+
+
+@pytest.mark.parametrize("count", [0, 1, 3, 4, 7])
+def test_stream_list(count: int) -> None:
+    inners = OUTER.inners * count
+    chunks = list(stream_list("inners", inners, items_per_chunk=2))
+
+    # The opening, a chunk per (up to) 2 items and the closing
+    assert len(chunks) == 2 + (count * 2 + 1) // 2
+    assert json.loads(b"".join(chunks)) == json.loads(dumps({"inners": inners}))
+
+
+def test_stream_list_is_lazy() -> None:
+    consumed: List[int] = []
+
+    def items() -> Iterator[int]:
+        for item in range(10):
+            consumed.append(item)
+            yield item
+
+    chunks = stream_list("items", items(), items_per_chunk=4)
+    assert next(chunks) == b'{"items":['
+    assert not consumed
+    assert next(chunks) == b"0,1,2,3"
+    assert consumed == [0, 1, 2, 3]
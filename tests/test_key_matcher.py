@@ -0,0 +1,54 @@
+import re
+
+from pyctuator.key_matcher import KeyMatcher
+
+
+def test_first_matching_pattern() -> None:
+    matcher = KeyMatcher({
+        "secret": re.compile(".*secret.*", re.IGNORECASE),
+        "url": re.compile(".*url.*", re.IGNORECASE),
+        "exact": re.compile("^exact$"),
+    })
+
+    assert matcher.match_all(["SECRET_URL", "db.url", "exact", "EXACT", "other", "exactly"]) == [
+        "secret", "url", "exact", None, None, None
+    ]
+
+
+def test_patterns_that_cannot_be_combined() -> None:
+    # The back-reference of the first pattern refers to its own group, which is renumbered once combined
+    matcher = KeyMatcher({
+        "repeated": re.compile(r"(\w)\1"),
+        "verbose": re.compile("abc  # a comment", re.VERBOSE),
+    })
+    assert matcher.match_all(["aab", "abc", "abab"]) == ["repeated", "verbose", None]
+
+    matcher = KeyMatcher({"verbose": re.compile("abc  # a comment", re.VERBOSE), "other": re.compile("other")})
+    assert matcher.match_all(["abc", "other", "abc  # a comment"]) == ["verbose", "other", "verbose"]
+
+
+def test_ascii_flag_kept_when_combined() -> None:
+    matcher = KeyMatcher({"ascii": re.compile(r"\w+$", re.ASCII), "other": re.compile(".*")})
+    assert matcher.match_all(["key", "clé"]) == ["ascii", "other"]
+
+
+def test_matches_are_memoized() -> None:
+    matched_keys = []
+
+    class RecordingPattern:
+        # Records the keys it's matched against, its back-reference keeps it from being combined with other patterns
+        pattern = r"\1"
+        flags = 0
+        groups = 0
+
+        def match(self, key: str) -> bool:
+            matched_keys.append(key)
+            return key.startswith("a")
+
+    matcher = KeyMatcher({"a": RecordingPattern()}, max_cached_keys=2)  # type: ignore
+    assert matcher.match_all(["a", "b", "a", "b"]) == ["a", None, "a", None]
+    assert matched_keys == ["a", "b"]
+
+    # Once the cache is full, the least recently used keys are matched again
+    assert matcher.match_all(["c", "a"]) == [None, "a"]
+    assert matched_keys == ["a", "b", "c", "a"]
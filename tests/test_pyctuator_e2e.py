@@ -3,6 +3,7 @@ import json
 import logging
 import os
 import random
+import threading
 import time
 from dataclasses import dataclass, asdict, fields
 from datetime import datetime, timedelta
@@ -14,7 +15,9 @@ import requests
 from _pytest.monkeypatch import MonkeyPatch
 from requests import Response
 
-from pyctuator.impl import SBA_V2_CONTENT_TYPE
+from pyctuator.health.health_provider import HealthProvider, HealthStatus, Status, HealthDetails
+from pyctuator.impl import SBA_V2_CONTENT_TYPE, PROMETHEUS_CONTENT_TYPE, EVENT_STREAM_CONTENT_TYPE, \
+    PLAIN_TEXT_CONTENT_TYPE
 from tests.aiohttp_test_server import AiohttpPyctuatorServer
 from tests.conftest import RegisteredEndpoints, PyctuatorServer, RegistrationRequest, RegistrationTrackerFixture
 from tests.fast_api_test_server import FastApiPyctuatorServer
@@ -46,8 +49,11 @@ def test_response_content_type(
         registered_endpoints: RegisteredEndpoints,
         registration_tracker: RegistrationTrackerFixture
 ) -> None:
-    # Issue requests to all actuator endpoints and verify the correct content-type is returned
-    actuator_endpoint_names = [field.name for field in fields(RegisteredEndpoints) if field.name != "root"]
+    # Issue requests to all actuator endpoints and verify the correct content-type is returned, except for Prometheus
+    # which has its own content-type
+    actuator_endpoint_names = [
+        field.name for field in fields(RegisteredEndpoints) if field.name not in ("root", "prometheus")
+    ]
     for actuator_endpoint in actuator_endpoint_names:
         actuator_endpoint_url = asdict(registered_endpoints)[actuator_endpoint]
         logging.info("Testing content type of %s (%s)", actuator_endpoint, actuator_endpoint_url)
@@ -73,7 +79,9 @@ def test_response_content_type(
 
         logging.info("Testing httptraces content-type header for request %s, got %s", request_uri, content_type_header)
 
-        if request_uri.find("/pyctuator") > 0:
+        if request_uri.endswith("/pyctuator/prometheus"):
+            assert all(SBA_V2_CONTENT_TYPE not in ct for ct in content_type_header)
+        elif request_uri.find("/pyctuator") > 0:
             assert any(SBA_V2_CONTENT_TYPE in ct for ct in content_type_header)
         else:
             assert all(SBA_V2_CONTENT_TYPE not in ct for ct in content_type_header)
@@ -102,6 +110,29 @@ def test_env_endpoint(registered_endpoints: RegisteredEndpoints) -> None:
     assert response.json()["app"] is not None
 
 
+@pytest.mark.usefixtures("boot_admin_server", "pyctuator_server")
+def test_env_endpoint_etag(registered_endpoints: RegisteredEndpoints, monkeypatch: MonkeyPatch) -> None:
+    response = requests.get(registered_endpoints.env, timeout=REQUEST_TIMEOUT)
+    assert response.status_code == HTTPStatus.OK
+    etag = response.headers["ETag"]
+
+    # Loading the environment again using the ETag should find that it wasn't modified
+    response = requests.get(registered_endpoints.env, headers={"If-None-Match": etag}, timeout=REQUEST_TIMEOUT)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers["ETag"] == etag
+    assert not response.content
+
+    # Once the environment changes, it should be returned with a new ETag
+    monkeypatch.setenv("PYCTUATOR_ETAG_TEST", "changed")
+    response = requests.get(registered_endpoints.env, headers={"If-None-Match": etag}, timeout=REQUEST_TIMEOUT)
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["ETag"] != etag
+    system_properties = [
+        source for source in response.json()["propertySources"] if source["name"] == "systemEnvironment"
+    ]
+    assert system_properties[0]["properties"]["PYCTUATOR_ETAG_TEST"]["value"] == "changed"
+
+
 @pytest.mark.usefixtures("boot_admin_server", "pyctuator_server")
 def test_info_endpoint(registered_endpoints: RegisteredEndpoints, pyctuator_server: PyctuatorServer) -> None:
     response = requests.get(registered_endpoints.info, timeout=REQUEST_TIMEOUT)
@@ -156,6 +187,47 @@ def test_diskspace_no_psutil(registered_endpoints: RegisteredEndpoints) -> None:
     assert "diskSpace" not in response.json()["details"]
 
 
+@pytest.mark.usefixtures("boot_admin_server")
+def test_slow_health_check_does_not_block_server(
+        registered_endpoints: RegisteredEndpoints,
+        pyctuator_server: PyctuatorServer,
+) -> None:
+    health_check_started = threading.Event()
+    health_check_released = threading.Event()
+
+    class BlockingHealthProvider(HealthProvider):
+        def is_supported(self) -> bool:
+            return True
+
+        def get_name(self) -> str:
+            return "blocking"
+
+        def get_health(self) -> HealthStatus:
+            health_check_started.set()
+            health_check_released.wait(REQUEST_TIMEOUT)
+            return HealthStatus(Status.UP, HealthDetails())
+
+    pyctuator_server.pyctuator.register_health_provider(BlockingHealthProvider())
+
+    health_responses: List[Response] = []
+    health_request = threading.Thread(
+        target=lambda: health_responses.append(requests.get(registered_endpoints.health, timeout=REQUEST_TIMEOUT))
+    )
+    health_request.start()
+    try:
+        assert health_check_started.wait(REQUEST_TIMEOUT)
+
+        # Other requests are served while the health check is blocked
+        response = requests.get(registered_endpoints.info, timeout=2)
+        assert response.status_code == HTTPStatus.OK
+    finally:
+        health_check_released.set()
+        health_request.join()
+
+    assert health_responses[0].status_code == HTTPStatus.OK
+    assert health_responses[0].json()["details"]["blocking"]["status"] == "UP"
+
+
 @pytest.mark.usefixtures("boot_admin_server", "pyctuator_server")
 def test_metrics_endpoint(registered_endpoints: RegisteredEndpoints) -> None:
     # Skip this test if psutil isn't installed
@@ -166,6 +238,7 @@ def test_metrics_endpoint(registered_endpoints: RegisteredEndpoints) -> None:
     metric_names = response.json()["names"]
     assert "memory.rss" in metric_names
     assert "thread.count" in metric_names
+    assert "process.uptime" in metric_names
 
     response = requests.get(f"{registered_endpoints.metrics}/memory.rss", timeout=REQUEST_TIMEOUT)
     assert response.status_code == HTTPStatus.OK
@@ -182,6 +255,103 @@ def test_metrics_endpoint(registered_endpoints: RegisteredEndpoints) -> None:
     assert metric_json["measurements"][0]["value"] > 4
 
 
+@pytest.mark.usefixtures("boot_admin_server", "pyctuator_server")
+def test_unknown_metric(registered_endpoints: RegisteredEndpoints) -> None:
+    response = requests.get(f"{registered_endpoints.metrics}/no.such.metric", timeout=REQUEST_TIMEOUT)
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+    # The tracemalloc metrics are known even when tracemalloc isn't tracing
+    response = requests.get(f"{registered_endpoints.metrics}/memory.tracemalloc.peak", timeout=REQUEST_TIMEOUT)
+    assert response.status_code == HTTPStatus.OK
+
+
+@pytest.mark.usefixtures("boot_admin_server", "pyctuator_server")
+def test_http_server_requests_metric(registered_endpoints: RegisteredEndpoints) -> None:
+    requests.get(registered_endpoints.root + "httptrace_test_url", timeout=REQUEST_TIMEOUT)
+
+    response = requests.get(registered_endpoints.metrics, timeout=REQUEST_TIMEOUT)
+    assert "http.server.requests" in response.json()["names"]
+
+    response = requests.get(f"{registered_endpoints.metrics}/http.server.requests", timeout=REQUEST_TIMEOUT)
+    assert response.status_code == HTTPStatus.OK
+    metric_json = response.json()
+    measurements = {measurement["statistic"]: measurement["value"] for measurement in metric_json["measurements"]}
+    assert measurements["COUNT"] > 0
+    assert measurements["TOTAL_TIME"] > 0
+
+    tags = {tag["tag"]: tag["values"] for tag in metric_json["availableTags"]}
+    assert "GET" in tags["method"]
+    assert "SUCCESS" in tags["outcome"]
+    assert "/httptrace_test_url" in tags["uri"]
+
+
+@pytest.mark.usefixtures("boot_admin_server", "pyctuator_server")
+def test_raising_request_recorded(registered_endpoints: RegisteredEndpoints) -> None:
+    response = requests.get(registered_endpoints.root + "raising_test_url", timeout=REQUEST_TIMEOUT)
+    assert response.status_code == HTTPStatus.INTERNAL_SERVER_ERROR
+
+    response = requests.get(f"{registered_endpoints.metrics}/http.server.requests", timeout=REQUEST_TIMEOUT)
+    tags = {tag["tag"]: tag["values"] for tag in response.json()["availableTags"]}
+    assert "/raising_test_url" in tags["uri"]
+    assert "500" in tags["status"]
+    assert "SERVER_ERROR" in tags["outcome"]
+
+    traces = requests.get(registered_endpoints.httptrace, timeout=REQUEST_TIMEOUT).json()["traces"]
+    trace = next(trace for trace in traces if trace["request"]["uri"].endswith("raising_test_url"))
+    assert trace["response"]["status"] == HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@pytest.mark.usefixtures("boot_admin_server", "pyctuator_server")
+def test_metric_history_endpoint(registered_endpoints: RegisteredEndpoints) -> None:
+    # The test servers sample the metrics every 100ms, wait for a few samples
+    time.sleep(0.5)
+
+    response = requests.get(f"{registered_endpoints.metrics}/http.server.requests/history", timeout=REQUEST_TIMEOUT)
+    assert response.status_code == HTTPStatus.OK
+    history_json = response.json()
+    assert history_json["name"] == "http.server.requests"
+    assert history_json["baseUnit"] == "seconds"
+    assert len(history_json["points"]) > 1
+    statistics = {measurement["statistic"] for measurement in history_json["points"][-1]["measurements"]}
+    assert statistics == {"COUNT", "TOTAL_TIME", "MAX"}
+
+    response = requests.get(
+        f"{registered_endpoints.metrics}/http.server.requests/history",
+        params={"points": 1},
+        timeout=REQUEST_TIMEOUT,
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert len(response.json()["points"]) == 1
+
+    response = requests.get(
+        f"{registered_endpoints.metrics}/http.server.requests/history",
+        params={"points": "many"},
+        timeout=REQUEST_TIMEOUT,
+    )
+    assert response.status_code in (HTTPStatus.BAD_REQUEST, HTTPStatus.UNPROCESSABLE_ENTITY)
+
+    response = requests.get(f"{registered_endpoints.metrics}/no.such.metric/history", timeout=REQUEST_TIMEOUT)
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.usefixtures("boot_admin_server", "pyctuator_server")
+def test_prometheus_endpoint(registered_endpoints: RegisteredEndpoints) -> None:
+    requests.get(registered_endpoints.root + "httptrace_test_url", timeout=REQUEST_TIMEOUT)
+
+    assert registered_endpoints.prometheus
+    response = requests.get(registered_endpoints.prometheus, timeout=REQUEST_TIMEOUT)
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["Content-Type"] == PROMETHEUS_CONTENT_TYPE
+
+    lines = response.text.splitlines()
+    assert "# TYPE http_server_requests_seconds histogram" in lines
+    assert any(
+        line.startswith("http_server_requests_seconds_count{method=\"GET\",uri=\"/httptrace_test_url\"")
+        for line in lines
+    )
+    assert any(line.startswith('http_server_requests_seconds_bucket{') and 'le="+Inf"' in line for line in lines)
+
+
 @pytest.mark.usefixtures("boot_admin_server", "pyctuator_server")
 def test_recurring_registration_and_deregistration(
         registration_tracker: RegistrationTrackerFixture,
@@ -229,6 +399,131 @@ def test_threads_endpoint(registered_endpoints: RegisteredEndpoints) -> None:
     assert len(current_test_stack_entry) == 1
 
 
+@pytest.mark.usefixtures("boot_admin_server", "pyctuator_server")
+def test_hot_threads_endpoint(registered_endpoints: RegisteredEndpoints) -> None:
+    stop = threading.Event()
+
+    def spin() -> None:
+        while not stop.is_set():
+            pass
+
+    spinner = threading.Thread(target=spin, name="spinner", daemon=True)
+    spinner.start()
+    try:
+        response = requests.get(
+            registered_endpoints.threads + "/hot", params={"interval": 0.3, "limit": 2}, timeout=REQUEST_TIMEOUT
+        )
+    finally:
+        stop.set()
+        spinner.join()
+
+    assert response.status_code == HTTPStatus.OK
+    hot_threads = response.json()
+    assert hot_threads["intervalSeconds"] >= 0.3
+    assert len(hot_threads["threads"]) == 2
+    hottest_thread = hot_threads["threads"][0]
+    assert hottest_thread["threadName"] == "spinner"
+    assert hottest_thread["threadState"] == "RUNNABLE"
+    assert hottest_thread["cpuTimeSeconds"] > 0
+    assert 0 < hottest_thread["cpuUsage"] <= 1
+
+    response = requests.get(registered_endpoints.threads + "/hot", params={"limit": "2.5"}, timeout=REQUEST_TIMEOUT)
+    assert response.status_code in (HTTPStatus.BAD_REQUEST, HTTPStatus.UNPROCESSABLE_ENTITY)
+
+
+@pytest.mark.usefixtures("boot_admin_server", "pyctuator_server")
+def test_profile_endpoint(registered_endpoints: RegisteredEndpoints) -> None:
+    profile_url = registered_endpoints.pyctuator + "/profile"
+    response = requests.get(profile_url, params={"seconds": 0.2, "hz": 50}, timeout=REQUEST_TIMEOUT)
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["Content-Type"] == PLAIN_TEXT_CONTENT_TYPE
+    main_thread_stacks = [line for line in response.text.splitlines() if line.startswith("MainThread;")]
+    assert any("test_profile_endpoint (test_pyctuator_e2e.py:" in stack for stack in main_thread_stacks)
+
+    response = requests.get(
+        profile_url, params={"seconds": 0.2, "hz": 50, "format": "speedscope"}, timeout=REQUEST_TIMEOUT
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["Content-Type"] == SBA_V2_CONTENT_TYPE
+    speedscope = response.json()
+    assert speedscope["shared"]["frames"]
+    assert "MainThread" in [profile["name"] for profile in speedscope["profiles"]]
+
+    response = requests.get(profile_url, params={"format": "pstats"}, timeout=REQUEST_TIMEOUT)
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    response = requests.get(profile_url, params={"seconds": "a while"}, timeout=REQUEST_TIMEOUT)
+    assert response.status_code in (HTTPStatus.BAD_REQUEST, HTTPStatus.UNPROCESSABLE_ENTITY)
+
+
+@pytest.mark.usefixtures("boot_admin_server", "pyctuator_server")
+def test_tracemalloc_endpoints(registered_endpoints: RegisteredEndpoints) -> None:
+    tracemalloc_url = registered_endpoints.pyctuator + "/tracemalloc"
+    response = requests.get(tracemalloc_url + "/allocations", timeout=REQUEST_TIMEOUT)
+    assert response.status_code == HTTPStatus.CONFLICT
+
+    response = requests.post(tracemalloc_url + "/start", params={"frames": 3}, timeout=REQUEST_TIMEOUT)
+    try:
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()["tracing"]
+        assert response.json()["tracebackFrames"] == 3
+
+        response = requests.post(tracemalloc_url + "/snapshots", timeout=REQUEST_TIMEOUT)
+        assert response.status_code == HTTPStatus.OK
+        snapshot_id = response.json()["id"]
+
+        blocks = [bytearray(1000) for _ in range(2000)]
+        response = requests.get(
+            tracemalloc_url + "/allocations", params={"limit": 5, "snapshot": snapshot_id}, timeout=REQUEST_TIMEOUT
+        )
+        assert response.status_code == HTTPStatus.OK
+        allocations = response.json()
+        assert allocations["snapshot"] == snapshot_id
+        assert any(
+            site["traceback"][0]["fileName"] == __file__ and site["sizeDiffBytes"] >= len(blocks) * 1000
+            for site in allocations["sites"]
+        )
+
+        response = requests.get(tracemalloc_url + "/allocations", params={"group_by": "x"}, timeout=REQUEST_TIMEOUT)
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+        response = requests.get(tracemalloc_url + "/allocations", params={"snapshot": "x"}, timeout=REQUEST_TIMEOUT)
+        assert response.status_code in (HTTPStatus.BAD_REQUEST, HTTPStatus.UNPROCESSABLE_ENTITY)
+
+        response = requests.get(f"{registered_endpoints.metrics}/memory.tracemalloc.peak", timeout=REQUEST_TIMEOUT)
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()["measurements"][0]["value"] >= len(blocks) * 1000
+    finally:
+        response = requests.post(tracemalloc_url + "/stop", timeout=REQUEST_TIMEOUT)
+    assert response.status_code == HTTPStatus.OK
+    assert not response.json()["tracing"]
+
+    response = requests.get(tracemalloc_url, timeout=REQUEST_TIMEOUT)
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["snapshots"] == []
+
+    response = requests.get(f"{registered_endpoints.metrics}/memory.tracemalloc.peak", timeout=REQUEST_TIMEOUT)
+    assert response.json()["measurements"] == []
+
+
+@pytest.mark.usefixtures("boot_admin_server", "pyctuator_server")
+def test_task_dump_endpoint(registered_endpoints: RegisteredEndpoints, pyctuator_server: PyctuatorServer) -> None:
+    response = requests.get(registered_endpoints.pyctuator + "/taskdump", timeout=REQUEST_TIMEOUT)
+    if isinstance(pyctuator_server, FlaskPyctuatorServer):
+        # Flask applications don't run an event loop
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        return
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers.get("Content-Type", response.headers.get("content-type")) == SBA_V2_CONTENT_TYPE
+    tasks = response.json()["tasks"]
+    assert any(task["taskState"] == "RUNNING" for task in tasks)
+    for task in tasks:
+        assert task["taskName"]
+        assert task["coroutineName"]
+        assert isinstance(task["stackTrace"], list)
+
+
 @pytest.mark.usefixtures("boot_admin_server", "pyctuator_server")
 def test_loggers_endpoint(registered_endpoints: RegisteredEndpoints) -> None:
     response = requests.get(registered_endpoints.loggers, timeout=REQUEST_TIMEOUT)
@@ -271,6 +566,40 @@ def test_loggers_endpoint(registered_endpoints: RegisteredEndpoints) -> None:
         assert json.loads(response.content)["configuredLevel"] == random_log_level
 
 
+@pytest.mark.usefixtures("boot_admin_server", "pyctuator_server")
+def test_conditional_requests(registered_endpoints: RegisteredEndpoints) -> None:
+    for url in [registered_endpoints.pyctuator, registered_endpoints.info, registered_endpoints.metrics]:
+        response = requests.get(url, timeout=REQUEST_TIMEOUT)
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()
+        etag = response.headers["ETag"]
+
+        response = requests.get(url, headers={"If-None-Match": etag}, timeout=REQUEST_TIMEOUT)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        assert response.headers["ETag"] == etag
+
+    logger_name = "pyctuator.test.conditional_requests"
+    logging.getLogger(logger_name).setLevel(logging.INFO)
+    response = requests.get(registered_endpoints.loggers, timeout=REQUEST_TIMEOUT)
+    assert response.json()["loggers"][logger_name]["configuredLevel"] == "INFO"
+    etag = response.headers["ETag"]
+
+    response = requests.get(registered_endpoints.loggers, headers={"If-None-Match": etag}, timeout=REQUEST_TIMEOUT)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+    # Changing a logger's level should change the loggers' ETag
+    response = requests.post(
+        f"{registered_endpoints.loggers}/{logger_name}",
+        data=json.dumps({"configuredLevel": "ERROR"}),
+        timeout=REQUEST_TIMEOUT,
+    )
+    assert response.status_code == HTTPStatus.OK
+    response = requests.get(registered_endpoints.loggers, headers={"If-None-Match": etag}, timeout=REQUEST_TIMEOUT)
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["ETag"] != etag
+    assert response.json()["loggers"][logger_name]["configuredLevel"] == "ERROR"
+
+
 @pytest.mark.usefixtures("boot_admin_server", "pyctuator_server")
 def test_logfile_endpoint(registered_endpoints: RegisteredEndpoints) -> None:
     thirsty_str = "These pretzels are making me thirsty"
@@ -290,6 +619,100 @@ def test_logfile_endpoint(registered_endpoints: RegisteredEndpoints) -> None:
     assert response.status_code == HTTPStatus.PARTIAL_CONTENT
 
 
+@pytest.mark.usefixtures("boot_admin_server", "pyctuator_server")
+def test_logfile_search_endpoint(registered_endpoints: RegisteredEndpoints) -> None:
+    thirsty_str = "These pretzels are making me thirsty"
+    requests.get(
+        registered_endpoints.root + "logfile_test_repeater",
+        params={"repeated_string": thirsty_str},
+        timeout=REQUEST_TIMEOUT,
+    )
+
+    response = requests.get(
+        registered_endpoints.logfile + "/search",
+        params={"level": "ERROR", "regex": "pretzels"},
+        timeout=REQUEST_TIMEOUT,
+    )
+    assert response.status_code == HTTPStatus.OK
+    matches = response.json()["matches"]
+    assert matches
+    assert all(match["level"] == "ERROR" and thirsty_str in match["message"] for match in matches)
+
+    # Verify the match's range can be requested from the logfile endpoint
+    response = requests.get(
+        registered_endpoints.logfile,
+        headers={"Range": f"bytes={matches[-1]['start']}-{matches[-1]['end']}"},
+        timeout=REQUEST_TIMEOUT,
+    )
+    assert thirsty_str in response.text
+
+    response = requests.get(registered_endpoints.logfile + "/search", params={"regex": "("}, timeout=REQUEST_TIMEOUT)
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.usefixtures("boot_admin_server", "pyctuator_server")
+def test_logfile_tail_endpoint(registered_endpoints: RegisteredEndpoints) -> None:
+    response = requests.get(registered_endpoints.logfile, headers={"Range": "bytes=-1"}, timeout=REQUEST_TIMEOUT)
+    offset = int(response.headers["Content-Range"].rsplit("/", 1)[1])
+
+    # Log a message while the tail request is waiting for new log messages
+    thirsty_str = "These pretzels are making me thirsty"
+    threading.Timer(0.5, requests.get, (registered_endpoints.root + "logfile_test_repeater",), {
+        "params": {"repeated_string": thirsty_str},
+        "timeout": REQUEST_TIMEOUT,
+    }).start()
+
+    # The Flask test server handles a single request at a time, so the message is only logged once the tail times out.
+    # Other servers may return earlier, as they log the requests
+    tail = b""
+    deadline = time.time() + REQUEST_TIMEOUT
+    while time.time() < deadline:
+        response = requests.get(
+            registered_endpoints.logfile + "/tail",
+            params={"offset": offset, "timeout": 2},
+            timeout=REQUEST_TIMEOUT,
+        )
+        assert response.status_code == HTTPStatus.PARTIAL_CONTENT
+        tail += response.content
+        offset = int(response.headers["Content-Range"].rsplit("/", 1)[1])
+        if thirsty_str.encode() in tail:
+            break
+    assert thirsty_str.encode() in tail
+
+    response = requests.get(
+        registered_endpoints.logfile + "/tail",
+        params={"offset": offset, "timeout": "soon"},
+        timeout=REQUEST_TIMEOUT,
+    )
+    assert response.status_code in (HTTPStatus.BAD_REQUEST, HTTPStatus.UNPROCESSABLE_ENTITY)
+
+
+@pytest.mark.usefixtures("boot_admin_server", "pyctuator_server")
+def test_logfile_stream_endpoint(registered_endpoints: RegisteredEndpoints, pyctuator_server: PyctuatorServer) -> None:
+    if isinstance(pyctuator_server, FlaskPyctuatorServer):
+        pytest.skip("Log events are streamed by the async frameworks only")
+
+    thirsty_str = "These pretzels are making me thirsty"
+    requests.get(
+        registered_endpoints.root + "logfile_test_repeater",
+        params={"repeated_string": thirsty_str},
+        timeout=REQUEST_TIMEOUT,
+    )
+
+    with requests.get(
+            registered_endpoints.logfile + "/stream",
+            params={"offset": 0},
+            stream=True,
+            timeout=REQUEST_TIMEOUT,
+    ) as response:
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers["Content-Type"] == EVENT_STREAM_CONTENT_TYPE
+
+        lines = response.iter_lines(decode_unicode=True)
+        assert next(lines).startswith("id: ")
+        assert any(line.startswith("data: ") and thirsty_str in line for line in lines)
+
+
 @pytest.mark.usefixtures("boot_admin_server", "pyctuator_server")
 def test_traces_endpoint(registered_endpoints: RegisteredEndpoints) -> None:
     response = requests.get(registered_endpoints.httptrace, timeout=REQUEST_TIMEOUT)
@@ -311,7 +734,8 @@ def test_traces_endpoint(registered_endpoints: RegisteredEndpoints) -> None:
 
     # Assert header appears on httptrace url
     assert user_header == trace["response"]["headers"]["resp-data"][0]
-    assert int(response.headers.get("Content-Length", -1)) > 0
+    # The traces are streamed, so the response has a body but not necessarily a Content-Length
+    assert len(response.content) > 0
 
     # Assert Response Secret is scrubbed
     assert trace["response"]["headers"]["response-secret"][0] == "******"
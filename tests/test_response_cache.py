@@ -0,0 +1,119 @@
+import json
+import logging
+from datetime import datetime
+from typing import Dict, List
+
+import pytest
+
+from pyctuator.endpoints import Endpoints
+from pyctuator.environment.custom_environment_provider import CustomEnvironmentProvider
+from pyctuator.impl.pyctuator_impl import PyctuatorImpl, AppInfo, AppDetails, BuildInfo, GitInfo, GitCommitInfo
+from pyctuator.impl.pyctuator_router import PyctuatorRouter
+from pyctuator.impl.response_cache import ResponseCache
+from pyctuator.pyctuator import default_logfile_format
+
+
+class TestRouter(PyctuatorRouter):
+    __test__ = False
+
+
+@pytest.fixture
+def router() -> TestRouter:
+    return TestRouter(None, PyctuatorImpl(
+        AppInfo(app=AppDetails(name="appy")),
+        "http://appy/pyctuator",
+        10,
+        default_logfile_format,
+        None,
+        Endpoints.NONE,
+    ))
+
+
+def test_response_cache() -> None:
+    cache = ResponseCache()
+    builds: List[Dict] = []
+
+    def build() -> Dict:
+        builds.append({"build": len(builds)})
+        return builds[-1]
+
+    response = cache.get_response("/info", build)
+    assert json.loads(response.body) == {"build": 0}
+    assert cache.get_response("/info", build) is response
+    assert len(builds) == 1
+
+    cache.invalidate("/info")
+    rebuilt_response = cache.get_response("/info", build)
+    assert json.loads(rebuilt_response.body) == {"build": 1}
+    assert rebuilt_response.etag != response.etag
+
+    # A response is cached per version
+    assert cache.get_response("/info", build, version=1) is not rebuilt_response
+    assert cache.get_response("/info", build, version=1) is cache.get_response("/info", build, version=1)
+    assert len(builds) == 3
+
+
+def test_response_cache_invalidated_while_building() -> None:
+    cache = ResponseCache()
+
+    def build() -> str:
+        cache.invalidate("/info")
+        return "stale"
+
+    response = cache.get_response("/info", build)
+    assert cache.get_response("/info", lambda: "fresh").body == b"\"fresh\""
+    assert response.body == b"\"stale\""
+
+
+def test_same_body_same_etag() -> None:
+    assert ResponseCache().get_response("", lambda: {"a": 1}).etag == \
+           ResponseCache().get_response("", lambda: {"a": 1}).etag
+
+
+def test_info_invalidated(router: TestRouter) -> None:
+    etag = router.get_cached_response("/info").etag
+
+    router.pyctuator_impl.set_git_info(GitInfo(GitCommitInfo(datetime(2020, 1, 1), "abcdef")))
+    response = router.get_cached_response("/info")
+    assert json.loads(response.body)["git"]["commit"]["id"] == "abcdef"
+    assert response.etag != etag
+
+    router.pyctuator_impl.set_build_info(BuildInfo(version="1.2.3"))
+    assert json.loads(router.get_cached_response("/info").body)["build"]["version"] == "1.2.3"
+
+
+def test_loggers_invalidated(router: TestRouter) -> None:
+    logger = logging.getLogger("pyctuator.test.response_cache")
+    logger.setLevel(logging.INFO)
+    router.get_cached_response("/loggers")
+    response = router.get_cached_response("/loggers")
+    assert router.get_cached_response("/loggers") is response
+
+    router.pyctuator_impl.set_logger_level(logger.name, "DEBUG")
+    response = router.get_cached_response("/loggers")
+    assert json.loads(response.body)["loggers"][logger.name]["configuredLevel"] == "DEBUG"
+
+    # Loggers changed without pyctuator are also noticed
+    logger.setLevel(logging.ERROR)
+    response = router.get_cached_response("/loggers")
+    assert json.loads(response.body)["loggers"][logger.name]["configuredLevel"] == "ERROR"
+
+
+def test_root_logger_changes_loggers_version(router: TestRouter) -> None:
+    root_level = logging.root.level
+    try:
+        version = router.pyctuator_impl.logging.get_loggers_version()
+        logging.root.setLevel(logging.CRITICAL if root_level != logging.CRITICAL else logging.DEBUG)
+        assert router.pyctuator_impl.logging.get_loggers_version() != version
+    finally:
+        logging.root.setLevel(root_level)
+
+
+def test_env_invalidated(router: TestRouter) -> None:
+    assert json.loads(router.get_cached_response("/env").body)["propertySources"] == []
+    response = router.get_cached_response("/env")
+    assert router.get_cached_response("/env") is response
+
+    router.pyctuator_impl.register_environment_provider(CustomEnvironmentProvider("custom", lambda: {"a": 1}))
+    property_sources = json.loads(router.get_cached_response("/env").body)["propertySources"]
+    assert property_sources == [{"name": "custom", "properties": {"a": {"value": 1, "origin": None}}}]
@@ -0,0 +1,54 @@
+import json
+import threading
+
+from pyctuator.threads.sampling_profiler import SamplingProfiler, render_profile
+from pyctuator.threads.thread_dump_provider import ThreadDumpProvider
+
+
+class Spinner:
+    def __init__(self) -> None:
+        self.stop = threading.Event()
+
+    def spin(self) -> None:
+        while not self.stop.is_set():
+            pass
+
+
+def test_profile() -> None:
+    profiler = SamplingProfiler(ThreadDumpProvider())
+    spinner = Spinner()
+    thread = threading.Thread(target=spinner.spin, name="spinner")
+    thread.start()
+    try:
+        profile_future = profiler.start_profile(0.3, 100)
+        assert profile_future
+        # Only a single profile can be taken at once by default
+        assert profiler.start_profile(0.3, 100) is None
+        profile = profile_future.result()
+    finally:
+        spinner.stop.set()
+        thread.join()
+
+    assert profile.samples > 0
+    assert profile.durationSeconds >= 0.3
+    assert sum(profile.stacks["spinner"].values()) == profile.samples
+    assert "pyctuator-profiler" not in profile.stacks
+
+    # Each line of the folded stacks is a stack, from the thread's name to the innermost frame, and its count
+    folded_stacks = [line.rsplit(" ", 1) for line in render_profile(profile, "folded").splitlines()]
+    spinner_stacks = [stack.split(";") for stack, _ in folded_stacks if stack.startswith("spinner;")]
+    assert all(stack[1].startswith("Thread._bootstrap (threading.py:") for stack in spinner_stacks)
+    assert all(any(frame.startswith("Spinner.spin (test_sampling_profiler.py:") for frame in stack)
+               for stack in spinner_stacks)
+    assert sum(int(count) for stack, count in folded_stacks if stack.startswith("spinner;")) == profile.samples
+
+    speedscope = json.loads(render_profile(profile, "speedscope"))
+    frame_names = [frame["name"] for frame in speedscope["shared"]["frames"]]
+    spinner_profile = next(thread for thread in speedscope["profiles"] if thread["name"] == "spinner")
+    assert spinner_profile["type"] == "sampled"
+    assert len(spinner_profile["samples"]) == len(spinner_profile["weights"])
+    assert any(frame_names[sample[-1]] == "Spinner.spin" for sample in spinner_profile["samples"])
+
+    # Once the profile is done, another profile can be taken
+    next_profile = profiler.start_profile(0, 100)
+    assert next_profile and next_profile.result().samples == 0
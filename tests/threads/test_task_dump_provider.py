@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+from pyctuator.impl.json_serializer import stream_list
+from pyctuator.threads.task_dump_provider import TaskDumpProvider
+from pyctuator.threads.thread_dump_provider import ThreadDumpProvider
+
+
+class Waiter:
+    def __init__(self) -> None:
+        self.event = asyncio.Event()
+
+    async def wait(self) -> None:
+        await self.event.wait()
+
+
+def test_task_dump() -> None:
+    provider = TaskDumpProvider(ThreadDumpProvider())
+
+    async def dump() -> None:
+        loop = asyncio.get_running_loop()
+        untracked = asyncio.create_task(Waiter().wait(), name="untracked")
+        provider.track_tasks(loop)
+        waiter = Waiter()
+        tracked = asyncio.create_task(waiter.wait(), name="tracked")
+        await asyncio.sleep(0)
+
+        task_infos = {task_info.taskName: task_info for task_info in provider.get_task_dump(loop).tasks}
+        waiter.event.set()
+        await tracked
+        untracked.cancel()
+
+        assert task_infos["untracked"].createdAt is None
+        assert task_infos["untracked"].creationSite is None
+
+        task_info = task_infos["tracked"]
+        assert task_info.taskState == "PENDING"
+        assert task_info.coroutineName == "Waiter.wait"
+        assert task_info.ageSeconds is not None and task_info.ageSeconds >= 0
+        assert task_info.creationSite
+        assert (task_info.creationSite.methodName, task_info.creationSite.fileName) == (
+            "dump", "test_task_dump_provider.py"
+        )
+
+        # The stack trace follows the awaited coroutines, from the innermost
+        assert [(frame.methodName, frame.className) for frame in task_info.stackTrace[-2:]] == [
+            ("wait", "Event"), ("wait", "Waiter")
+        ]
+
+        current_task = next(task for task in task_infos.values() if task.taskState == "RUNNING")
+        assert current_task.stackTrace[0].methodName == "dump"
+
+    asyncio.run(dump())
+
+
+def test_done_tasks_skipped() -> None:
+    provider = TaskDumpProvider(ThreadDumpProvider())
+
+    async def dump() -> None:
+        waiters = [Waiter() for _ in range(3)]
+        tasks = [asyncio.create_task(waiter.wait(), name=f"waiter-{index}") for index, waiter in enumerate(waiters)]
+        await asyncio.sleep(0)
+        task_names = {task.get_name() for task in asyncio.all_tasks()}
+
+        # The tasks are listed when the iteration starts, one of them is done before it's reached
+        task_infos = provider.iter_tasks(asyncio.get_running_loop())
+        first_task_name = next(task_infos).taskName
+        done_index = next(index for index, task in enumerate(tasks) if task.get_name() != first_task_name)
+        waiters[done_index].event.set()
+        await tasks[done_index]
+
+        dumped_task_names = [first_task_name, *[task_info.taskName for task_info in task_infos]]
+        assert sorted(dumped_task_names) == sorted(task_names - {tasks[done_index].get_name()})
+
+        for waiter in waiters:
+            waiter.event.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(dump())
+
+
+def test_stream_task_dump() -> None:
+    provider = TaskDumpProvider(ThreadDumpProvider())
+
+    async def dump() -> bytes:
+        events = [asyncio.Event() for _ in range(250)]
+        tasks = [asyncio.create_task(event.wait()) for event in events]
+        await asyncio.sleep(0)
+
+        chunks = list(stream_list("tasks", provider.iter_tasks(asyncio.get_running_loop())))
+        for event in events:
+            event.set()
+        await asyncio.gather(*tasks)
+
+        # The opening, 3 chunks of tasks and the closing
+        assert len(chunks) == 5
+        return b"".join(chunks)
+
+    task_dump = json.loads(asyncio.run(dump()))
+    assert len(task_dump["tasks"]) == 251
@@ -0,0 +1,157 @@
+# pylint: disable=protected-access
+import json
+import selectors
+import socket
+import threading
+import time
+from typing import List
+
+import pytest
+
+from pyctuator.endpoints import Endpoints
+from pyctuator.impl.pyctuator_impl import AppInfo, AppDetails, PyctuatorImpl
+from pyctuator.pyctuator import default_logfile_format
+from pyctuator.threads.thread_dump_provider import ThreadDumpProvider, StackFrame
+
+
+class Sleeper:
+    def __init__(self, depth: int) -> None:
+        self.depth = depth
+        self.started = threading.Event()
+        self.stop = threading.Event()
+
+    def sleep(self) -> None:
+        def recurse(depth: int) -> None:
+            if depth > 0:
+                recurse(depth - 1)
+            else:
+                self.started.set()
+                self.stop.wait()
+
+        recurse(self.depth)
+
+
+def dump_sleeper(provider: ThreadDumpProvider, depth: int) -> List[StackFrame]:
+    sleeper = Sleeper(depth)
+    thread = threading.Thread(target=sleeper.sleep, name="sleeper")
+    thread.start()
+    try:
+        sleeper.started.wait()
+        thread_dump = provider.get_thread_dump()
+    finally:
+        sleeper.stop.set()
+        thread.join()
+
+    return next(thread_info for thread_info in thread_dump.threads if thread_info.threadName == "sleeper").stackTrace
+
+
+def test_stack_trace() -> None:
+    stack_trace = dump_sleeper(ThreadDumpProvider(), 3)
+
+    # The innermost frames are of threading.Event.wait, followed by the sleeper's frames
+    sleeper_frames = [frame for frame in stack_trace if frame.fileName == "test_thread_dump_provider.py"]
+    assert [(frame.methodName, frame.className) for frame in sleeper_frames] == [
+        ("recurse", None), ("recurse", None), ("recurse", None), ("recurse", None), ("sleep", "Sleeper"),
+    ]
+    assert stack_trace[0].className == "Condition"
+    assert stack_trace[-1].methodName == "_bootstrap"
+
+
+def test_streamed_thread_dump_is_a_snapshot() -> None:
+    pyctuator_impl = PyctuatorImpl(
+        AppInfo(app=AppDetails(name="appy")),
+        "http://appy/pyctuator",
+        10,
+        default_logfile_format,
+        None,
+        Endpoints.NONE,
+    )
+
+    sleeper = Sleeper(3)
+    thread = threading.Thread(target=sleeper.sleep, name="sleeper")
+    thread.start()
+    try:
+        sleeper.started.wait()
+        chunks = pyctuator_impl.stream_thread_dump()
+    finally:
+        sleeper.stop.set()
+        thread.join()
+
+    # The sleeper's stack trace was extracted before it stopped sleeping, even though the dump is serialized after
+    thread_dump = json.loads(b"".join(chunks))
+    sleeper_info = next(thread_info for thread_info in thread_dump["threads"] if thread_info["threadName"] == "sleeper")
+    assert "recurse" in [frame["methodName"] for frame in sleeper_info["stackTrace"]]
+
+
+def test_max_depth() -> None:
+    provider = ThreadDumpProvider(max_depth=5)
+    stack_trace = dump_sleeper(provider, 100)
+    assert len(stack_trace) == 5
+
+    # The details of the frames' code are cached, and reused by following dumps
+    code_summaries = dict(provider._code_summaries)
+    assert code_summaries
+    assert stack_trace == dump_sleeper(provider, 100)
+    assert provider._code_summaries == code_summaries
+
+
+def test_thread_states() -> None:
+    provider = ThreadDumpProvider()
+    sleeper = Sleeper(0)
+    waiter = threading.Thread(target=sleeper.sleep, name="waiter")
+    reader, writer = socket.socketpair()
+    selector = selectors.DefaultSelector()
+    selector.register(reader, selectors.EVENT_READ)
+    selecting = threading.Thread(target=selector.select, name="selecting")
+    waiter.start()
+    selecting.start()
+    try:
+        sleeper.started.wait()
+        time.sleep(0.1)
+        threads = {thread_info.threadName: thread_info for thread_info in provider.get_thread_dump().threads}
+    finally:
+        sleeper.stop.set()
+        writer.send(b"done")
+        waiter.join()
+        selecting.join()
+        selector.close()
+        reader.close()
+        writer.close()
+
+    assert threads["waiter"].threadState == "WAITING"
+    assert threads["selecting"].threadState == "BLOCKED"
+    assert threads[threading.current_thread().name].threadState == "RUNNABLE"
+    assert threads["waiter"].nativeThreadId == waiter.native_id
+    if provider.cpu_sampler.is_supported():
+        assert threads["waiter"].cpuTimeSeconds is not None
+
+
+def test_hot_threads() -> None:
+    provider = ThreadDumpProvider()
+    if not provider.cpu_sampler.is_supported():
+        pytest.skip("The CPU time of threads can't be sampled on this platform")
+
+    stop = threading.Event()
+
+    def spin() -> None:
+        while not stop.is_set():
+            pass
+
+    sleeper = threading.Thread(target=time.sleep, args=(1,), name="sleeper")
+    spinner = threading.Thread(target=spin, name="spinner")
+    sleeper.start()
+    spinner.start()
+    try:
+        hot_threads = provider.get_hot_threads(0.2, len(threading.enumerate()) + 2)
+    finally:
+        stop.set()
+        spinner.join()
+        sleeper.join()
+
+    assert hot_threads.intervalSeconds >= 0.2
+    assert hot_threads.threads[0].threadName == "spinner"
+    assert hot_threads.threads[0].cpuTimeSeconds > 0
+
+    # The sleeper isn't in a known blocking primitive, but it didn't use the CPU
+    sleeping_thread = next(thread for thread in hot_threads.threads if thread.threadName == "sleeper")
+    assert (sleeping_thread.threadState, sleeping_thread.cpuTimeSeconds) == ("TIMED_WAITING", 0)
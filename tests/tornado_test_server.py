@@ -44,10 +44,16 @@ class TornadoPyctuatorServer(PyctuatorServer):
                     "response-secret", "my password")
                 self.write("my content")
 
+        # pylint: disable=abstract-method
+        class GetRaisingTestUrl(RequestHandler):
+            def get(self) -> None:
+                raise RuntimeError("Raised by a test handler")
+
         self.app = Application(
             [
                 ("/logfile_test_repeater", LogfileTestRepeater),
-                ("/httptrace_test_url", GetHttptraceTestUrl)
+                ("/httptrace_test_url", GetHttptraceTestUrl),
+                ("/raising_test_url", GetRaisingTestUrl),
             ],
             debug=False
         )
@@ -63,6 +69,7 @@ class TornadoPyctuatorServer(PyctuatorServer):
             metadata=self.metadata,
             additional_app_info=self.additional_app_info,
             disabled_endpoints=disabled_endpoints,
+            metrics_history_interval_sec=0.1,
         )
 
         self.io_loop: Optional[ioloop.IOLoop] = None